@@ -5,33 +5,156 @@
 """
 import os
 import time
+import heapq
+import asyncio
 import argparse
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import requests
+from urllib.parse import urljoin, urlparse
 
 from utils.logger import crawler_logger as logger
 from utils.http import HttpClient
+from utils.http_cache import HttpCache
+from utils.retry import CircuitOpenError
 from utils.storage import DataStorage
+from utils.frontier import CrawlFrontier
+from utils.crawl_state import SqliteCrawlState
+from utils.shared_frontier import SharedFrontier, SharedFrontierAdapter
+from utils.scheduler import PolitenessScheduler
+from utils.fingerprint import FingerprintSet
+from utils.extract import extract_page
+from utils.archive import HtmlArchive
+from utils.metrics import MetricsExporter, parse_time, items_total, queue_depth
 
 class BasicCrawler:
-    """基本爬虫类，使用requests和BeautifulSoup爬取网页"""
+    """基本爬虫类，使用requests爬取网页，使用lxml（或BeautifulSoup）解析页面"""
     
-    def __init__(self, base_url, delay=1, max_pages=10):
+    def __init__(self, base_url, delay=1, max_pages=10, concurrency=8, per_host_limit=2,
+                 max_depth=None, max_frontier_size=None, state_db="crawler/data/crawl_state.db",
+                 burst=1, respect_robots=True, schedule_window=100, bloom=False, parser="lxml",
+                 cache_ttl=None, archive_dir=None, frontier_db=None, frontier_queue="default", max_deferrals=3):
         """
         初始化爬虫
         
         Args:
             base_url (str): 基础URL
-            delay (float, optional): 请求间隔时间（秒），默认为1秒
+            delay (float, optional): 同一主机的请求间隔时间（秒），默认为1秒
             max_pages (int, optional): 最大爬取页数，默认为10页
+            concurrency (int, optional): 异步模式下的最大并发请求数，默认为8
+            per_host_limit (int, optional): 异步模式下同一主机的最大并发请求数，默认为2
+            max_depth (int, optional): 最大爬取深度，起始URL深度为0，默认为None（不限制）
+            max_frontier_size (int, optional): 待爬取队列的最大长度，默认为None（不限制）
+            state_db (str, optional): 可恢复任务的状态数据库路径，默认为'crawler/data/crawl_state.db'
+            burst (int, optional): 同一主机允许的突发请求数，默认为1
+            respect_robots (bool, optional): 是否遵守robots.txt中的Crawl-delay，默认为True
+            schedule_window (int, optional): 从待爬取队列取出、交给调度器按主机排队的URL数量上限，默认为100
+            bloom (bool, optional): 内存去重集合是否使用布隆过滤器（内存固定，存在少量误判），默认为False
+            parser (str, optional): 页面解析方式，'lxml'为一次遍历的快速提取，'bs4'为BeautifulSoup，默认为'lxml'
+            cache_ttl (float, optional): 启用HTTP缓存并设置缓存新鲜时间（秒），0表示每次都发送条件请求，
+                默认为None（不使用缓存）
+            archive_dir (str, optional): 原始HTML归档目录，指定后保存抓取到的页面，之后可用reparse重新解析，
+                默认为None（不归档）
+            frontier_db (str, optional): 共享待爬取队列的数据库路径，指定后多个爬虫进程从同一个队列领取URL，
+                互不重复，默认为None（使用本进程的队列）
+            frontier_queue (str, optional): 共享待爬取队列的名称，默认为'default'
+            max_deferrals (int, optional): 主机熔断时同一URL最多推迟的次数，超过后放弃该URL，默认为3
         """
         self.base_url = base_url
         self.delay = delay
         self.max_pages = max_pages
-        self.http_client = HttpClient(timeout=10, retry_times=3)
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.max_depth = max_depth
+        self.max_frontier_size = max_frontier_size
+        self.state_db = state_db
+        self.frontier_db = frontier_db
+        self.frontier_queue = frontier_queue
+        self.schedule_window = schedule_window
+        self.max_deferrals = max_deferrals
+        self.scheduler = PolitenessScheduler(rate=1.0 / delay if delay > 0 else None, burst=burst,
+                                             respect_robots=respect_robots)
+        cache = HttpCache(ttl=cache_ttl) if cache_ttl is not None else None
+        self.http_client = HttpClient(timeout=10, retry_times=3, pool_size=concurrency, cache=cache)
+        self.archive = HtmlArchive(archive_dir) if archive_dir else None
         self.storage = DataStorage()
-        self.visited_urls = set()
+        self.bloom = bloom
+        self.parser = parser
+        # 已访问URL以规范化URL的指纹保存，查询参数顺序、片段、默认端口等不同写法视为同一页面
+        self.visited_urls = self._new_fingerprint_set()
+        self.record_count = 0
+    
+    def fetch_page(self, url):
+        """
+        获取页面HTML
+        
+        Args:
+            url (str): 页面URL
+            
+        Returns:
+            str: 页面HTML
+            
+        Raises:
+            CircuitOpenError: 主机熔断中
+            RequestException: 请求失败（已按重试策略重试）
+        """
+        response = self.http_client.get(url)
+        
+        # 归档原始响应（缓存命中的响应已归档过）
+        if self.archive is not None and not getattr(response, 'from_cache', False):
+            self.archive.store(url, response.content, status=response.status_code,
+                               content_type=response.headers.get('Content-Type'), encoding=response.encoding)
+        return response.text
+    
+    def extract_page(self, url, html):
+        """
+        从HTML中提取标题、内容和链接
+        
+        Args:
+            url (str): 页面URL
+            html (str): 页面HTML
+            
+        Returns:
+            tuple: (页面标题, 页面内容, 页面链接列表)
+        """
+        if self.parser == "bs4":
+            return self._extract_page_bs4(url, html)
+        
+        # 一次遍历提取标题、段落和链接（链接按<base href>解析），只保留同域名的链接
+        title, content, links = extract_page(html, url)
+        return title, content, [link for link in links if link.startswith(self.base_url)]
+    
+    def _extract_page_bs4(self, url, html):
+        """
+        使用BeautifulSoup从HTML中提取标题、内容和链接
+        
+        Args:
+            url (str): 页面URL
+            html (str): 页面HTML
+            
+        Returns:
+            tuple: (页面标题, 页面内容, 页面链接列表)
+        """
+        # 解析HTML
+        soup = BeautifulSoup(html, 'lxml')
+        
+        # 获取页面标题
+        title = soup.title.text.strip() if soup.title else "无标题"
+        
+        # 获取页面内容（这里简单获取所有段落文本）
+        content = "\n".join([p.text.strip() for p in soup.find_all('p')])
+        
+        # 获取页面链接
+        links = []
+        for a in soup.find_all('a', href=True):
+            href = a['href']
+            # 将相对URL转换为绝对URL
+            abs_url = urljoin(url, href)
+            # 只保留同域名的链接
+            if abs_url.startswith(self.base_url):
+                links.append(abs_url)
+        
+        return title, content, links
     
     def parse_page(self, url):
         """
@@ -42,90 +165,371 @@ class BasicCrawler:
             
         Returns:
             tuple: (页面标题, 页面内容, 页面链接列表)
+            
+        Raises:
+            CircuitOpenError: 主机熔断中，URL应推迟爬取
         """
         try:
-            # 发送请求
-            try:
-                response = self.http_client.get(url)
-            except Exception as e:
-                logger.error(f"HTTP请求失败，尝试使用requests库: {str(e)}")
-                response = requests.get(url, timeout=10)
+            html = self.fetch_page(url)
+            with parse_time.time(callback='parse_page'):
+                return self.extract_page(url, html)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"解析页面失败: {url}, 错误: {str(e)}")
+            return None, None, []
+    
+    def _defer_delay(self, url, deferrals):
+        """
+        主机熔断时计算URL推迟爬取的时间
+        
+        Args:
+            url (str): 页面URL
+            deferrals (Counter): 各URL已推迟的次数
             
-            # 解析HTML
-            soup = BeautifulSoup(response.text, 'lxml')
+        Returns:
+            float: 推迟的时间（秒），推迟次数超过max_deferrals时返回None（放弃该URL）
+        """
+        deferrals[url] += 1
+        if deferrals[url] > self.max_deferrals:
+            logger.error(f"主机熔断，已推迟 {self.max_deferrals} 次，放弃爬取: {url}")
+            return None
+        host = urlparse(url).netloc
+        delay = max(self.http_client.circuit_breaker.retry_in(host), 1.0)
+        logger.warning(f"主机 {host} 熔断中，{delay:.1f} 秒后重新爬取: {url}")
+        return delay
+    
+    def _make_record(self, url, title, content):
+        """
+        生成一条爬取记录
+        
+        Args:
+            url (str): 页面URL
+            title (str): 页面标题
+            content (str): 页面内容
             
-            # 获取页面标题
-            title = soup.title.text.strip() if soup.title else "无标题"
+        Returns:
+            dict: 爬取记录
+        """
+        return {
+            "url": url,
+            "title": title,
+            "content_preview": content[:200] + "..." if len(content) > 200 else content,
+            "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def _new_fingerprint_set(self):
+        """
+        创建URL指纹集合
+        
+        Returns:
+            FingerprintSet: URL指纹集合
+        """
+        if self.bloom:
+            return FingerprintSet(bloom=True, capacity=max(self.max_pages * 100, 100000))
+        return FingerprintSet()
+    
+    def _new_frontier(self):
+        """
+        创建待爬取队列，并加入起始URL
+        
+        Returns:
+            CrawlFrontier: 待爬取队列
+        """
+        frontier = CrawlFrontier(max_depth=self.max_depth, max_size=self.max_frontier_size,
+                                 seen=self._new_fingerprint_set())
+        frontier.push(self.base_url, depth=0)
+        return frontier
+    
+    def _open_state(self, job_id):
+        """
+        打开爬取状态
+        
+        Args:
+            job_id (str): 任务ID，为None时使用内存中的队列和已访问集合
             
-            # 获取页面内容（这里简单获取所有段落文本）
-            content = "\n".join([p.text.strip() for p in soup.find_all('p')])
+        Returns:
+            tuple: (爬取状态或None, 待爬取队列, 已访问URL集合)
+        """
+        if self.frontier_db is not None:
+            # 共享队列本身保存在SQLite中，已访问集合只记录本进程爬取过的页面
+            shared = SharedFrontier(self.frontier_db, queue=self.frontier_queue)
+            frontier = SharedFrontierAdapter(shared, max_depth=self.max_depth)
+            # 多个进程使用相同的起始URL时只会入队一次
+            frontier.push(self.base_url, depth=0)
+            logger.info(f"使用共享待爬取队列: {self.frontier_db} (队列: {self.frontier_queue}, "
+                        f"待领取 {shared.pending_count()} 个URL)")
+            return None, frontier, self.visited_urls
+        
+        if job_id is None:
+            return None, self._new_frontier(), self.visited_urls
+        
+        state = SqliteCrawlState(job_id, base_url=self.base_url, db_path=self.state_db,
+                                 max_depth=self.max_depth, max_frontier_size=self.max_frontier_size)
+        # 恢复任务时起始URL已入队过，不会重复加入
+        state.frontier.push(self.base_url, depth=0)
+        return state, state.frontier, state.visited
+    
+    def _close_state(self, state, data):
+        """
+        关闭爬取状态，返回全部爬取记录
+        
+        Args:
+            state (SqliteCrawlState): 爬取状态，为None时直接返回data
+            data (list): 内存中的爬取记录
             
-            # 获取页面链接
-            links = []
-            for a in soup.find_all('a', href=True):
-                href = a['href']
-                # 将相对URL转换为绝对URL
-                abs_url = urljoin(url, href)
-                # 只保留同域名的链接
-                if abs_url.startswith(self.base_url):
-                    links.append(abs_url)
+        Returns:
+            list: 爬取的数据列表
+        """
+        if state is None:
+            return data
+        try:
+            return list(state.iter_records())
+        finally:
+            state.close()
+    
+    def _close_frontier(self, frontier):
+        """
+        关闭共享待爬取队列，本进程领取但未处理的URL放回队列供其他进程领取
+        
+        Args:
+            frontier: 待爬取队列
+        """
+        if isinstance(frontier, SharedFrontierAdapter):
+            frontier.close()
+            frontier.frontier.close()
+    
+    def iter_crawl(self, job_id=None):
+        """
+        开始爬取，每解析完一个页面就产出一条记录
+        
+        Args:
+            job_id (str, optional): 任务ID，指定时爬取状态保存到SQLite，再次使用相同ID时从中断处继续，
+                并先产出之前已保存的记录，默认为None（状态只保存在内存中）
+        
+        Yields:
+            dict: 爬取记录
+        """
+        logger.info(f"开始爬取: {self.base_url}")
+        
+        # 初始化待爬取队列
+        state, frontier, visited = self._open_state(job_id)
+        self.record_count = 0
+        try:
+            # 恢复任务时先产出之前已保存的记录
+            if state is not None and state.resumed:
+                for record in state.iter_records():
+                    self.record_count += 1
+                    yield record
             
-            return title, content, links
-        except Exception as e:
-            logger.error(f"解析页面失败: {url}, 错误: {str(e)}")
-            return None, None, []
+            # 开始爬取（恢复任务时已爬取的页面计入总数）
+            page_count = len(visited) if state else 0
+            scheduler = self.scheduler
+            scheduler.clear()
+            deferrals = Counter()
+            while (frontier or scheduler) and page_count < self.max_pages:
+                # 从待爬取队列补充调度器，已经访问过的URL直接跳过
+                while frontier and len(scheduler) < self.schedule_window:
+                    url, depth = frontier.pop()
+                    if url in visited:
+                        frontier.done(url)
+                    else:
+                        scheduler.add(url, depth)
+                if not scheduler:
+                    break
+                queue_depth.set(len(frontier) + len(scheduler), spider='basic')
+                
+                # 获取下一个主机已就绪的URL（调度器按主机限速，必要时等待）
+                url, depth = scheduler.next()
+                
+                logger.info(f"爬取页面 ({page_count+1}/{self.max_pages}): {url}")
+                
+                # 解析页面，主机熔断中时推迟该URL，不标记为已访问
+                try:
+                    title, content, links = self.parse_page(url)
+                except CircuitOpenError:
+                    delay = self._defer_delay(url, deferrals)
+                    if delay is not None:
+                        scheduler.defer(url, depth, delay=delay)
+                        continue
+                    title, content, links = None, None, []
+                
+                # 如果解析成功，保存数据
+                record = None
+                if title is not None:
+                    record = self._make_record(url, title, content)
+                    if state is not None:
+                        state.add_record(record)
+                    
+                    # 将新链接添加到队列
+                    for link in links:
+                        if link not in visited:
+                            frontier.push(link, depth=depth + 1)
+                
+                # 标记为已访问
+                visited.add(url)
+                frontier.done(url)
+                page_count += 1
+                
+                if record is not None:
+                    self.record_count += 1
+                    items_total.inc(spider='basic')
+                    yield record
+        finally:
+            if state is not None:
+                state.close()
+            self._close_frontier(frontier)
+            if self.archive is not None:
+                self.archive.commit()
+        
+        logger.info(f"爬取完成，共爬取 {self.record_count} 个页面")
     
-    def crawl(self):
+    def crawl(self, job_id=None):
         """
         开始爬取
         
+        Args:
+            job_id (str, optional): 任务ID，含义与iter_crawl()相同，默认为None
+        
         Returns:
             list: 爬取的数据列表
         """
-        logger.info(f"开始爬取: {self.base_url}")
+        return list(self.iter_crawl(job_id=job_id))
+    
+    async def crawl_async(self, job_id=None):
+        """
+        使用asyncio并发爬取
+        
+        请求在线程池中执行，同时最多有concurrency个请求在进行；
+        同一主机最多per_host_limit个并发请求，请求频率由调度器的令牌桶限制。
+        使用共享待爬取队列时，队列操作（SQLite）在单独的线程中执行，等待其他进程时使用asyncio.sleep()，不阻塞事件循环。
+        
+        Args:
+            job_id (str, optional): 任务ID，含义与crawl()相同，默认为None
+        
+        Returns:
+            list: 爬取的数据列表，记录格式与crawl()相同
+        """
+        logger.info(f"开始异步爬取: {self.base_url} (并发数: {self.concurrency}, 单主机并发数: {self.per_host_limit})")
+        
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
         
         # 初始化数据列表和待爬取队列
         data = []
-        queue = [self.base_url]
+        state, frontier, visited = self._open_state(job_id)
+        emit = state.add_record if state else data.append
+        page_count = len(visited) if state else 0
+        in_flight = 0
+        wakeup = asyncio.Event()
+        # 共享队列的操作在同一个线程中依次执行（适配器不是线程安全的）
+        shared = isinstance(frontier, SharedFrontierAdapter)
+        frontier_executor = ThreadPoolExecutor(max_workers=1) if shared else None
+        # 主机熔断而推迟的URL，按可以重新爬取的时间排序
+        deferred = []
+        deferrals = Counter()
         
-        # 开始爬取
-        page_count = 0
-        while queue and page_count < self.max_pages:
-            # 获取下一个URL
-            url = queue.pop(0)
-            
-            # 如果已经访问过，跳过
-            if url in self.visited_urls:
-                continue
-            
-            logger.info(f"爬取页面 ({page_count+1}/{self.max_pages}): {url}")
-            
-            # 解析页面
-            title, content, links = self.parse_page(url)
-            
-            # 如果解析成功，保存数据
-            if title is not None:
-                data.append({
-                    "url": url,
-                    "title": title,
-                    "content_preview": content[:200] + "..." if len(content) > 200 else content,
-                    "crawl_time": time.strftime("%Y-%m-%d %H:%M:%S")
-                })
+        # 每个主机的并发限制
+        host_semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+        
+        async def wait_for_host(url):
+            """等待直到该主机允许发起下一个请求"""
+            # 首次遇到主机时调度器会读取robots.txt，放到线程池中避免阻塞事件循环
+            wait = await loop.run_in_executor(executor, self.scheduler.reserve, url)
+            if wait > 0:
+                logger.debug(f"主机 {urlparse(url).netloc} 等待 {wait:.2f} 秒...")
+                await asyncio.sleep(wait)
+        
+        async def frontier_call(func, *args):
+            """调用待爬取队列的方法，共享队列的方法访问SQLite，放到单独的线程中执行"""
+            if frontier_executor is None:
+                return func(*args)
+            return await loop.run_in_executor(frontier_executor, func, *args)
+        
+        def pop_url():
+            """取出下一个URL，没有时返回None"""
+            if shared:
+                return frontier.pop_nowait()
+            return frontier.pop() if frontier else None
+        
+        def push_links(links, depth):
+            """将新链接加入待爬取队列"""
+            for link in links:
+                frontier.push(link, depth=depth)
+        
+        async def worker():
+            nonlocal page_count, in_flight
+            while page_count < self.max_pages:
+                if deferred and deferred[0][0] <= loop.time():
+                    _, url, depth = heapq.heappop(deferred)
+                else:
+                    popped = await frontier_call(pop_url)
+                    if popped is None:
+                        # 队列为空时等待进行中的请求产生新链接、推迟的URL到期，或其他进程加入新URL
+                        polling = shared and await frontier_call(frontier.waiting)
+                        if in_flight == 0 and not deferred and not polling:
+                            return
+                        timeouts = [deferred[0][0] - loop.time()] if deferred else []
+                        if polling:
+                            timeouts.append(frontier.poll_interval)
+                        wakeup.clear()
+                        try:
+                            await asyncio.wait_for(wakeup.wait(), min(timeouts) if timeouts else None)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    url, depth = popped
+                    if page_count >= self.max_pages:
+                        # 等待队列操作期间其他worker已达到页数上限，领取的URL在关闭时放回共享队列
+                        return
+                    if url in visited:
+                        await frontier_call(frontier.done, url)
+                        continue
+                page_count += 1
+                in_flight += 1
+                logger.info(f"爬取页面 ({page_count}/{self.max_pages}): {url}")
                 
-                # 将新链接添加到队列
-                for link in links:
-                    if link not in self.visited_urls and link not in queue:
-                        queue.append(link)
-            
-            # 标记为已访问
-            self.visited_urls.add(url)
-            page_count += 1
-            
-            # 延迟一段时间
-            if queue and page_count < self.max_pages:
-                logger.debug(f"等待 {self.delay} 秒...")
-                time.sleep(self.delay)
+                try:
+                    queue_depth.set(await frontier_call(len, frontier) + len(deferred), spider='basic')
+                    host = urlparse(url).netloc
+                    try:
+                        async with host_semaphores[host]:
+                            await wait_for_host(url)
+                            title, content, links = await loop.run_in_executor(executor, self.parse_page, url)
+                    except CircuitOpenError:
+                        # 主机熔断中时推迟该URL，不计入页数，也不标记为已访问
+                        delay = self._defer_delay(url, deferrals)
+                        if delay is not None:
+                            page_count -= 1
+                            heapq.heappush(deferred, (loop.time() + delay, url, depth))
+                            continue
+                        title, content, links = None, None, []
+                    
+                    # 如果解析成功，保存数据并将新链接添加到队列
+                    if title is not None:
+                        emit(self._make_record(url, title, content))
+                        items_total.inc(spider='basic')
+                        await frontier_call(push_links, [link for link in links if link not in visited], depth + 1)
+                    
+                    # 标记为已访问
+                    visited.add(url)
+                    await frontier_call(frontier.done, url)
+                finally:
+                    in_flight -= 1
+                    wakeup.set()
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            executor.shutdown(wait=False)
+            await frontier_call(self._close_frontier, frontier)
+            if frontier_executor is not None:
+                frontier_executor.shutdown()
+            if self.archive is not None:
+                self.archive.commit()
         
+        data = self._close_state(state, data)
+        self.record_count = len(data)
         logger.info(f"爬取完成，共爬取 {len(data)} 个页面")
         return data
     
@@ -133,55 +537,86 @@ class BasicCrawler:
         """
         保存爬取结果
         
+        data可以是列表，也可以是iter_crawl()返回的生成器等任意可迭代对象；
+        JSON、JSON Lines、CSV、Parquet、SQLite和分片在遍历过程中逐条写入，只遍历一次，内存占用不随记录数增长。
+        
         Args:
-            data (list): 爬取的数据列表
-            formats (list, optional): 保存格式列表，可选值为'json', 'csv', 'excel'，默认为['json']
+            data (iterable): 爬取的数据
+            formats (list, optional): 保存格式列表，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded',
+                'excel'，默认为['json']；'sqlite'按URL插入或更新到crawl_results.db中，'sharded'保存为压缩的JSON Lines分片
             
         Returns:
             dict: 保存的文件路径字典
         """
-        if not formats:
-            formats = ['json']
-        
-        result_files = {}
-        
-        if 'json' in formats:
-            json_file = self.storage.save_json(data, name="crawl_results")
-            result_files['json'] = json_file
-        
-        if 'csv' in formats:
-            csv_file = self.storage.save_csv(data, name="crawl_results")
-            result_files['csv'] = csv_file
-        
-        if 'excel' in formats:
-            excel_file = self.storage.save_excel(data, name="crawl_results")
-            result_files['excel'] = excel_file
-        
-        return result_files
+        return self.storage.save_formats(data, formats=formats, name="crawl_results")
 
 def main():
     """主函数"""
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="基本网页爬虫")
     parser.add_argument("url", help="要爬取的网站URL")
-    parser.add_argument("-d", "--delay", type=float, default=1.0, help="请求间隔时间（秒），默认为1秒")
+    parser.add_argument("-d", "--delay", type=float, default=1.0, help="同一主机的请求间隔时间（秒），默认为1秒")
+    parser.add_argument("-b", "--burst", type=int, default=1, help="同一主机允许的突发请求数，默认为1")
+    parser.add_argument("--ignore-crawl-delay", action="store_true", help="忽略robots.txt中的Crawl-delay")
     parser.add_argument("-m", "--max-pages", type=int, default=10, help="最大爬取页数，默认为10页")
-    parser.add_argument("-f", "--formats", nargs="+", choices=["json", "csv", "excel"], default=["json"], 
-                        help="保存格式，可选值为'json', 'csv', 'excel'，默认为'json'")
+    parser.add_argument("-f", "--formats", nargs="+", default=["json"],
+                        choices=["json", "jsonl", "csv", "parquet", "sqlite", "sharded", "excel"],
+                        help="保存格式，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded', 'excel'，默认为'json'")
+    parser.add_argument("-e", "--engine", choices=["sync", "async"], default="sync",
+                        help="爬取引擎，可选值为'sync', 'async'，默认为'sync'")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="异步引擎的最大并发请求数，默认为8")
+    parser.add_argument("--per-host", type=int, default=2, help="异步引擎中同一主机的最大并发请求数，默认为2")
+    parser.add_argument("--max-depth", type=int, default=None, help="最大爬取深度，默认不限制")
+    parser.add_argument("-j", "--job-id", help="任务ID，指定后爬取状态保存到SQLite，使用相同ID可从中断处继续")
+    parser.add_argument("--bloom", action="store_true", help="URL去重使用布隆过滤器，适合超大规模爬取")
+    parser.add_argument("-p", "--parser", choices=["lxml", "bs4"], default="lxml",
+                        help="页面解析方式，可选值为'lxml', 'bs4'，默认为'lxml'")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="启用HTTP缓存，指定秒数内直接使用缓存，超过后发送条件请求；0表示每次都发送条件请求")
+    parser.add_argument("--archive", nargs="?", const="crawler/data/archive", default=None, metavar="DIR",
+                        help="归档抓取到的原始HTML，之后可用reparse命令重新解析，默认目录为crawler/data/archive")
+    parser.add_argument("--shared-frontier", nargs="?", const="crawler/data/frontier.db", default=None, metavar="DB",
+                        help="使用共享待爬取队列，多个进程同时运行时共同完成爬取，默认数据库为crawler/data/frontier.db")
+    parser.add_argument("-q", "--queue", default="default", help="共享待爬取队列的名称，默认为'default'")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="在本地端口提供Prometheus格式的爬取指标（/metrics），默认不启动")
+    parser.add_argument("--metrics-file", default=None,
+                        help="定期将爬取指标写入该JSON文件，默认不写入")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="写入指标JSON文件的间隔（秒），默认为10秒")
     args = parser.parse_args()
+    if args.shared_frontier and args.job_id:
+        parser.error("--shared-frontier和--job-id不能同时使用")
     
     # 创建爬虫实例
-    crawler = BasicCrawler(args.url, delay=args.delay, max_pages=args.max_pages)
+    crawler = BasicCrawler(args.url, delay=args.delay, max_pages=args.max_pages,
+                           concurrency=args.concurrency, per_host_limit=args.per_host,
+                           max_depth=args.max_depth, burst=args.burst,
+                           respect_robots=not args.ignore_crawl_delay, bloom=args.bloom,
+                           parser=args.parser, cache_ttl=args.cache_ttl, archive_dir=args.archive,
+                           frontier_db=args.shared_frontier, frontier_queue=args.queue)
     
-    # 开始爬取
-    data = crawler.crawl()
+    # 启动指标导出
+    exporter = MetricsExporter(port=args.metrics_port, snapshot_path=args.metrics_file,
+                               interval=args.metrics_interval).start()
     
-    # 保存结果
-    result_files = crawler.save_results(data, formats=args.formats)
+    try:
+        # 开始爬取
+        if args.engine == "async":
+            data = asyncio.run(crawler.crawl_async(job_id=args.job_id))
+        else:
+            # 同步引擎边爬取边写入文件
+            data = crawler.iter_crawl(job_id=args.job_id)
+        
+        # 保存结果
+        result_files = crawler.save_results(data, formats=args.formats)
+    finally:
+        exporter.close()
+    if crawler.archive is not None:
+        crawler.archive.close()
     
     # 打印结果
     print("\n爬取结果:")
-    print(f"共爬取 {len(data)} 个页面")
+    print(f"共爬取 {crawler.record_count} 个页面")
     print("\n保存的文件:")
     for fmt, filepath in result_files.items():
         print(f"- {fmt.upper()}: {filepath}")
@@ -16,10 +16,34 @@ def main():
     # 基本爬虫命令
     basic_parser = subparsers.add_parser("basic", help="运行基本爬虫")
     basic_parser.add_argument("url", help="要爬取的网站URL")
-    basic_parser.add_argument("-d", "--delay", type=float, default=1.0, help="请求间隔时间（秒），默认为1秒")
+    basic_parser.add_argument("-d", "--delay", type=float, default=1.0, help="同一主机的请求间隔时间（秒），默认为1秒")
+    basic_parser.add_argument("-b", "--burst", type=int, default=1, help="同一主机允许的突发请求数，默认为1")
+    basic_parser.add_argument("--ignore-crawl-delay", action="store_true", help="忽略robots.txt中的Crawl-delay")
     basic_parser.add_argument("-m", "--max-pages", type=int, default=10, help="最大爬取页数，默认为10页")
-    basic_parser.add_argument("-f", "--formats", nargs="+", choices=["json", "csv", "excel"], default=["json"], 
-                            help="保存格式，可选值为'json', 'csv', 'excel'，默认为'json'")
+    basic_parser.add_argument("-f", "--formats", nargs="+", default=["json"],
+                            choices=["json", "jsonl", "csv", "parquet", "sqlite", "sharded", "excel"],
+                            help="保存格式，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded', 'excel'，默认为'json'")
+    basic_parser.add_argument("-e", "--engine", choices=["sync", "async"], default="sync",
+                            help="爬取引擎，可选值为'sync', 'async'，默认为'sync'")
+    basic_parser.add_argument("-c", "--concurrency", type=int, default=8, help="异步引擎的最大并发请求数，默认为8")
+    basic_parser.add_argument("--per-host", type=int, default=2, help="异步引擎中同一主机的最大并发请求数，默认为2")
+    basic_parser.add_argument("--max-depth", type=int, default=None, help="最大爬取深度，默认不限制")
+    basic_parser.add_argument("-j", "--job-id", help="任务ID，指定后爬取状态保存到SQLite，使用相同ID可从中断处继续")
+    basic_parser.add_argument("--bloom", action="store_true", help="URL去重使用布隆过滤器，适合超大规模爬取")
+    basic_parser.add_argument("-p", "--parser", choices=["lxml", "bs4"], default="lxml",
+                            help="页面解析方式，可选值为'lxml', 'bs4'，默认为'lxml'")
+    basic_parser.add_argument("--cache-ttl", type=float, default=None,
+                            help="启用HTTP缓存，指定秒数内直接使用缓存，超过后发送条件请求；0表示每次都发送条件请求")
+    basic_parser.add_argument("--archive", nargs="?", const="crawler/data/archive", default=None, metavar="DIR",
+                            help="归档抓取到的原始HTML，之后可用reparse命令重新解析，默认目录为crawler/data/archive")
+    basic_parser.add_argument("--shared-frontier", nargs="?", const="crawler/data/frontier.db", default=None, metavar="DB",
+                            help="使用共享待爬取队列，多个进程同时运行时共同完成爬取，默认数据库为crawler/data/frontier.db")
+    basic_parser.add_argument("-q", "--queue", default="default", help="共享待爬取队列的名称，默认为'default'")
+    basic_parser.add_argument("--metrics-port", type=int, default=None,
+                            help="在本地端口提供Prometheus格式的爬取指标（/metrics），默认不启动")
+    basic_parser.add_argument("--metrics-file", default=None, help="定期将爬取指标写入该JSON文件，默认不写入")
+    basic_parser.add_argument("--metrics-interval", type=float, default=10.0,
+                            help="写入指标JSON文件的间隔（秒），默认为10秒")
     
     # Selenium爬虫命令
     selenium_parser = subparsers.add_parser("selenium", help="运行Selenium爬虫")
@@ -31,12 +55,35 @@ def main():
     selenium_parser.add_argument("-t", "--timeout", type=int, default=10, help="页面加载超时时间（秒），默认为10秒")
     selenium_parser.add_argument("-f", "--formats", nargs="+", choices=["json", "csv", "excel"], default=["json"], 
                                 help="保存格式，可选值为'json', 'csv', 'excel'，默认为'json'")
+    selenium_parser.add_argument("--archive", nargs="?", const="crawler/data/archive", default=None, metavar="DIR",
+                                help="归档渲染后的HTML，之后可用reparse命令重新解析，默认目录为crawler/data/archive")
     
     # Scrapy爬虫命令
     scrapy_parser = subparsers.add_parser("scrapy", help="运行Scrapy爬虫")
     scrapy_parser.add_argument("spider", choices=["news", "sina_news"], help="爬虫名称")
     scrapy_parser.add_argument("-d", "--domain", help="域名")
-    scrapy_parser.add_argument("-s", "--start-url", help="起始URL")
+    scrapy_parser.add_argument("-s", "--start-url", nargs="+", help="起始URL，可以指定多个")
+    scrapy_parser.add_argument("--shards", type=int, default=1, help="分片（进程）数量，默认为1（不分片）")
+    scrapy_parser.add_argument("--shard-by", choices=["domain", "url"], default="domain",
+                               help="分片依据，'domain'按主机名，'url'按URL，默认为'domain'")
+    scrapy_parser.add_argument("--incremental", action="store_true",
+                               help="增量爬取：跳过已爬取的新闻，列表页使用条件请求，新闻都已爬取时停止翻页")
+    
+    # 重新解析命令
+    reparse_parser = subparsers.add_parser("reparse", help="重新解析归档的原始HTML（不访问网络）")
+    reparse_parser.add_argument("-a", "--archive-dir", default="crawler/data/archive",
+                                help="归档目录，默认为crawler/data/archive")
+    reparse_parser.add_argument("-p", "--parser", choices=["basic", "selenium", "news", "sina_news"], default="basic",
+                                help="使用哪个爬虫的解析逻辑，可选值为'basic', 'selenium', 'news', 'sina_news'，默认为'basic'")
+    reparse_parser.add_argument("-u", "--url-prefix", help="只解析以此开头的URL")
+    reparse_parser.add_argument("--since", help="只解析此时间之后抓取的页面，格式为'YYYY-MM-DD HH:MM:SS'")
+    reparse_parser.add_argument("--all-captures", action="store_true", help="解析每一次抓取，默认每个URL只解析最近一次")
+    reparse_parser.add_argument("-s", "--selector", help="Selenium爬虫的内容选择器")
+    reparse_parser.add_argument("--html-parser", choices=["lxml", "bs4"], default="lxml",
+                                help="基本爬虫的页面解析方式，可选值为'lxml', 'bs4'，默认为'lxml'")
+    reparse_parser.add_argument("-f", "--formats", nargs="+", default=["json"],
+                                choices=["json", "jsonl", "csv", "parquet", "sqlite", "sharded", "excel"],
+                                help="保存格式，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded', 'excel'，默认为'json'")
     
     args = parser.parse_args()
     
@@ -52,8 +99,40 @@ def main():
             sys.argv.extend(["-d", str(args.delay)])
         if args.max_pages != 10:
             sys.argv.extend(["-m", str(args.max_pages)])
+        if args.burst != 1:
+            sys.argv.extend(["-b", str(args.burst)])
+        if args.ignore_crawl_delay:
+            sys.argv.append("--ignore-crawl-delay")
         if args.formats != ["json"]:
             sys.argv.extend(["-f"] + args.formats)
+        if args.engine != "sync":
+            sys.argv.extend(["-e", args.engine])
+        if args.concurrency != 8:
+            sys.argv.extend(["-c", str(args.concurrency)])
+        if args.per_host != 2:
+            sys.argv.extend(["--per-host", str(args.per_host)])
+        if args.max_depth is not None:
+            sys.argv.extend(["--max-depth", str(args.max_depth)])
+        if args.job_id:
+            sys.argv.extend(["-j", args.job_id])
+        if args.bloom:
+            sys.argv.append("--bloom")
+        if args.parser != "lxml":
+            sys.argv.extend(["-p", args.parser])
+        if args.cache_ttl is not None:
+            sys.argv.extend(["--cache-ttl", str(args.cache_ttl)])
+        if args.archive:
+            sys.argv.extend(["--archive", args.archive])
+        if args.shared_frontier:
+            sys.argv.extend(["--shared-frontier", args.shared_frontier])
+        if args.queue != "default":
+            sys.argv.extend(["-q", args.queue])
+        if args.metrics_port is not None:
+            sys.argv.extend(["--metrics-port", str(args.metrics_port)])
+        if args.metrics_file:
+            sys.argv.extend(["--metrics-file", args.metrics_file])
+        if args.metrics_interval != 10.0:
+            sys.argv.extend(["--metrics-interval", str(args.metrics_interval)])
         
         # 运行基本爬虫
         basic_main()
@@ -77,6 +156,8 @@ def main():
             sys.argv.extend(["-t", str(args.timeout)])
         if args.formats != ["json"]:
             sys.argv.extend(["-f"] + args.formats)
+        if args.archive:
+            sys.argv.extend(["--archive", args.archive])
         
         # 运行Selenium爬虫
         selenium_main()
@@ -91,11 +172,43 @@ def main():
         if args.domain:
             sys.argv.extend(["-d", args.domain])
         if args.start_url:
-            sys.argv.extend(["-s", args.start_url])
+            sys.argv.extend(["-s"] + args.start_url)
+        if args.shards != 1:
+            sys.argv.extend(["--shards", str(args.shards)])
+        if args.shard_by != "domain":
+            sys.argv.extend(["--shard-by", args.shard_by])
+        if args.incremental:
+            sys.argv.append("--incremental")
         
         # 运行Scrapy爬虫
         scrapy_main()
     
+    elif args.command == "reparse":
+        # 导入重新解析模块
+        from crawler.reparse import main as reparse_main
+        
+        # 设置命令行参数
+        sys.argv = [sys.argv[0]]
+        if args.archive_dir != "crawler/data/archive":
+            sys.argv.extend(["-a", args.archive_dir])
+        if args.parser != "basic":
+            sys.argv.extend(["-p", args.parser])
+        if args.url_prefix:
+            sys.argv.extend(["-u", args.url_prefix])
+        if args.since:
+            sys.argv.extend(["--since", args.since])
+        if args.all_captures:
+            sys.argv.append("--all-captures")
+        if args.selector:
+            sys.argv.extend(["-s", args.selector])
+        if args.html_parser != "lxml":
+            sys.argv.extend(["--html-parser", args.html_parser])
+        if args.formats != ["json"]:
+            sys.argv.extend(["-f"] + args.formats)
+        
+        # 运行重新解析
+        reparse_main()
+    
     else:
         parser.print_help()
 
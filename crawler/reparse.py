@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+重新解析归档的原始HTML，修改解析逻辑后不需要重新爬取
+"""
+import os
+import sys
+import time
+import argparse
+
+from utils.logger import crawler_logger as logger
+from utils.archive import HtmlArchive
+from utils.storage import DataStorage
+
+# 添加项目根目录到Python路径（Scrapy爬虫的解析方法位于crawler.spiders包中）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Scrapy爬虫名称与解析方法
+SPIDER_CALLBACKS = {
+    'news': ('NewsSpider', 'parse_news'),
+    'sina_news': ('SinaNewsSpider', 'parse_sina_news'),
+}
+
+def make_parser(name, selector=None, html_parser="lxml"):
+    """
+    创建解析函数，使用与爬虫相同的解析逻辑
+
+    Args:
+        name (str): 解析器名称，可选值为'basic', 'selenium', 'news', 'sina_news'
+        selector (str, optional): Selenium爬虫的内容选择器，默认为None
+        html_parser (str, optional): 基本爬虫的页面解析方式，可选值为'lxml', 'bs4'，默认为'lxml'
+
+    Returns:
+        function: 接受ArchivedPage、返回记录列表的函数
+    """
+    if name == "basic":
+        from basic_crawler import BasicCrawler
+
+        # 只使用解析逻辑，链接过滤使用的base_url不影响标题和内容
+        crawler = BasicCrawler("", parser=html_parser)
+
+        def parse(page):
+            title, content, _ = crawler.extract_page(page.url, page.text)
+            return [crawler._make_record(page.url, title, content)]
+        return parse
+
+    if name == "selenium":
+        from selenium_crawler import SeleniumCrawler
+
+        # 不启动浏览器，只使用parse_page()
+        crawler = SeleniumCrawler()
+
+        def parse(page):
+            result = crawler.parse_page(page.text, selector=selector, url=page.url)
+            return [result] if result else []
+        return parse
+
+    if name in SPIDER_CALLBACKS:
+        from scrapy.http import HtmlResponse
+        from itemadapter import ItemAdapter, is_item
+        from crawler.spiders.news_spider.spiders import news
+
+        class_name, callback_name = SPIDER_CALLBACKS[name]
+        spider = getattr(news, class_name)()
+        callback = getattr(spider, callback_name)
+
+        def parse(page):
+            # 与实际爬取时一样，由Scrapy根据Content-Type、<meta>等推断编码
+            headers = {'Content-Type': page.content_type} if page.content_type else None
+            response = HtmlResponse(url=page.url, body=page.body, headers=headers)
+            result = callback(response)
+            if result is None:
+                return []
+            if is_item(result):
+                result = [result]
+            # 解析方法产出的Request在重新解析时忽略
+            return [ItemAdapter(item).asdict() for item in result if is_item(item)]
+        return parse
+
+    raise ValueError(f"不支持的解析器: {name}")
+
+def iter_reparse(archive, parse, url_prefix=None, since=None, latest_only=True):
+    """
+    逐个重新解析归档的页面
+
+    记录中的crawl_time设为页面的原始抓取时间；只解析状态码为2xx（或未知）的页面，单个页面解析失败时跳过。
+
+    Args:
+        archive (HtmlArchive): HTML归档
+        parse (function): make_parser()返回的解析函数
+        url_prefix (str, optional): 只解析以此开头的URL，默认为None（全部）
+        since (str, optional): 只解析此时间（含）之后抓取的页面，默认为None
+        latest_only (bool, optional): 每个URL是否只解析最近一次抓取，默认为True
+
+    Yields:
+        dict: 解析得到的记录
+    """
+    for page in archive.iter_pages(url_prefix=url_prefix, since=since, latest_only=latest_only):
+        if page.status is not None and not 200 <= page.status < 300:
+            continue
+        try:
+            records = parse(page)
+        except Exception as e:
+            logger.error(f"重新解析失败: {page.url}, 错误: {str(e)}")
+            continue
+        for record in records:
+            record['crawl_time'] = page.fetch_time
+            yield record
+
+def main():
+    """主函数"""
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description="重新解析归档的原始HTML")
+    parser.add_argument("-a", "--archive-dir", default="crawler/data/archive",
+                        help="归档目录，默认为crawler/data/archive")
+    parser.add_argument("-p", "--parser", choices=["basic", "selenium"] + list(SPIDER_CALLBACKS), default="basic",
+                        help="使用哪个爬虫的解析逻辑，可选值为'basic', 'selenium', 'news', 'sina_news'，默认为'basic'")
+    parser.add_argument("-u", "--url-prefix", help="只解析以此开头的URL")
+    parser.add_argument("--since", help="只解析此时间之后抓取的页面，格式为'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--all-captures", action="store_true", help="解析每一次抓取，默认每个URL只解析最近一次")
+    parser.add_argument("-s", "--selector", help="Selenium爬虫的内容选择器")
+    parser.add_argument("--html-parser", choices=["lxml", "bs4"], default="lxml",
+                        help="基本爬虫的页面解析方式，可选值为'lxml', 'bs4'，默认为'lxml'")
+    parser.add_argument("-f", "--formats", nargs="+", default=["json"],
+                        choices=["json", "jsonl", "csv", "parquet", "sqlite", "sharded", "excel"],
+                        help="保存格式，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded', 'excel'，默认为'json'")
+    args = parser.parse_args()
+
+    parse = make_parser(args.parser, selector=args.selector, html_parser=args.html_parser)
+    storage = DataStorage()
+
+    start = time.time()
+    with HtmlArchive(args.archive_dir) as archive:
+        logger.info(f"开始重新解析: {args.archive_dir} ({archive.stats()['urls']} 个URL)")
+        records = iter_reparse(archive, parse, url_prefix=args.url_prefix, since=args.since,
+                               latest_only=not args.all_captures)
+
+        # 统计记录数
+        count = 0
+        def counted(items):
+            nonlocal count
+            for item in items:
+                count += 1
+                yield item
+
+        result_files = storage.save_formats(counted(records), formats=args.formats, name="reparse_results")
+    elapsed = time.time() - start
+
+    # 打印结果
+    print("\n重新解析结果:")
+    print(f"共解析 {count} 条记录，耗时 {elapsed:.2f} 秒")
+    print("\n保存的文件:")
+    for fmt, filepath in result_files.items():
+        print(f"- {fmt.upper()}: {filepath}")
+
+if __name__ == "__main__":
+    main()
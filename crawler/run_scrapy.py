@@ -5,43 +5,198 @@
 """
 import os
 import sys
+import json
 import argparse
+import multiprocessing
+from datetime import datetime
 from scrapy.crawler import CrawlerProcess
+from scrapy.spiderloader import SpiderLoader
 from scrapy.utils.project import get_project_settings
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def run_spider(spider_name, domain=None, start_url=None):
+from crawler.utils.logger import crawler_logger as logger
+
+def get_settings(overrides=None):
     """
-    运行爬虫
+    获取爬虫设置
     
     Args:
-        spider_name (str): 爬虫名称
-        domain (str, optional): 域名，默认为None
-        start_url (str, optional): 起始URL，默认为None
+        overrides (dict, optional): 覆盖的设置，默认为None
+        
+    Returns:
+        Settings: 爬虫设置
     """
     # 获取项目设置
     settings = get_project_settings()
     
     # 设置项目设置模块
     settings.setmodule('crawler.spiders.news_spider.settings')
+    if overrides:
+        settings.setdict(overrides, priority='cmdline')
+    return settings
+
+def run_spider(spider_name, domain=None, start_url=None, settings_overrides=None):
+    """
+    运行爬虫
     
+    Args:
+        spider_name (str): 爬虫名称
+        domain (str, optional): 域名，默认为None
+        start_url (str/list, optional): 起始URL，可以是多个URL的列表，默认为None
+        settings_overrides (dict, optional): 覆盖的设置，默认为None
+        
+    Returns:
+        dict: 爬虫的统计信息
+    """
     # 创建爬虫进程
-    process = CrawlerProcess(settings)
+    process = CrawlerProcess(get_settings(settings_overrides))
     
     # 设置爬虫参数
     kwargs = {}
     if domain:
         kwargs['domain'] = domain
     if start_url:
-        kwargs['start_url'] = start_url
+        if isinstance(start_url, str):
+            kwargs['start_url'] = start_url
+        else:
+            kwargs['start_urls'] = list(start_url)
     
     # 启动爬虫
-    process.crawl(spider_name, **kwargs)
+    crawler = process.create_crawler(spider_name)
+    process.crawl(crawler, **kwargs)
     
     # 启动爬虫进程
     process.start()
+    return crawler.stats.get_stats()
+
+def _run_shard(spider_name, domain, start_urls, settings_overrides, stats_path):
+    """在子进程中运行一个分片，统计信息保存到stats_path"""
+    stats = run_spider(spider_name, domain=domain, start_url=start_urls, settings_overrides=settings_overrides)
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2, default=str)
+
+def merge_stats(stats_list):
+    """
+    合并多个分片的统计信息
+    
+    数值相加，耗时取最大值，开始时间取最早、结束时间取最晚，其他值相同时保留一个、不同时保留全部。
+    
+    Args:
+        stats_list (list): 各分片的统计信息
+        
+    Returns:
+        dict: 合并后的统计信息
+    """
+    merged = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key not in merged:
+                merged[key] = value
+            elif key == 'elapsed_time_seconds':
+                merged[key] = max(merged[key], value)
+            elif key == 'start_time':
+                merged[key] = min(merged[key], value)
+            elif key == 'finish_time':
+                merged[key] = max(merged[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] += value
+            elif isinstance(merged[key], list) and value not in merged[key]:
+                merged[key].append(value)
+            elif not isinstance(merged[key], list) and merged[key] != value:
+                merged[key] = [merged[key], value]
+    return merged
+
+def run_sharded(spider_name, shards, domain=None, start_url=None, shard_by='domain', settings_overrides=None):
+    """
+    用多个进程分片运行爬虫，每个进程使用一个CPU核心解析页面
+    
+    各分片使用SharedFrontierScheduler，每个分片有自己的共享待爬取队列；请求（包括起始请求和之后跟随的链接）
+    按所属分片加入对应的队列，由该分片的进程爬取，不会因为链接属于其他分片而丢失。
+    shard_by为'domain'时按主机名分配，同一主机的请求由同一个进程按其限速爬取，适合多个站点；
+    为'url'时按URL分配，单个站点的下载和解析也能分摊到多个进程。
+    每个分片的输出文件保存在DATA_DIR/shards_<爬虫名称>_<时间>/shard-NN目录下；指纹库、列表页缓存、
+    SQLite数据库和HTML归档仍使用DATA_DIR下的文件，在各分片之间以及与不分片的运行之间共享。
+    
+    Args:
+        spider_name (str): 爬虫名称
+        shards (int): 分片（进程）数量
+        domain (str, optional): 域名，默认为None
+        start_url (str/list, optional): 起始URL，默认为None（使用爬虫定义的起始URL）
+        shard_by (str, optional): 分片依据，可选值为'domain', 'url'，默认为'domain'
+        settings_overrides (dict, optional): 所有分片共同覆盖的设置，默认为None
+        
+    Returns:
+        dict: 合并后的统计信息
+    """
+    settings = get_settings(settings_overrides)
+    data_dir = settings.get('DATA_DIR', 'crawler/data')
+    if isinstance(start_url, str):
+        start_url = [start_url]
+    start_urls = list(start_url) if start_url else list(SpiderLoader.from_settings(settings).load(spider_name).start_urls)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_dir = os.path.join(data_dir, f"shards_{spider_name}_{timestamp}")
+    log_file = settings.get('LOG_FILE')
+    metrics_port = settings.get('METRICS_PORT')
+    
+    # 使用spawn启动子进程，每个子进程有独立的Twisted reactor
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for index in range(shards):
+        shard_dir = os.path.join(run_dir, f"shard-{index:02d}")
+        os.makedirs(shard_dir, exist_ok=True)
+        overrides = dict(settings_overrides or {})
+        overrides.update({
+            'SHARD_INDEX': index,
+            'SHARD_COUNT': shards,
+            'SHARD_BY': shard_by,
+            # 各分片产生的请求通过共享待爬取队列交给所属分片；所有分片都从全部起始URL开始，起始请求只入队一次
+            'SCHEDULER': 'crawler.spiders.news_spider.scheduler.SharedFrontierScheduler',
+            'FRONTIER_DB_PATH': os.path.join(run_dir, 'frontier.db'),
+            # 每个分片的输出文件（JSON、CSV等）和统计信息保存在各自的目录下
+            'DATA_DIR': shard_dir,
+            # 指纹库、列表页缓存、SQLite数据库和HTML归档在各分片之间共享，与不分片运行时使用相同的文件，
+            # 下次运行（无论是否分片）都能跳过已爬取的新闻、对列表页发送条件请求
+            'FINGERPRINT_DB_PATH': settings.get('FINGERPRINT_DB_PATH') or os.path.join(data_dir, 'fingerprints.db'),
+            'INCREMENTAL_CACHE_DIR': settings.get('INCREMENTAL_CACHE_DIR') or os.path.join(data_dir, 'list_cache'),
+            'SQLITE_DB_PATH': settings.get('SQLITE_DB_PATH') or os.path.join(data_dir, 'news.db'),
+            'ARCHIVE_DIR': settings.get('ARCHIVE_DIR') or os.path.join(data_dir, 'archive'),
+        })
+        if log_file:
+            root, ext = os.path.splitext(log_file)
+            overrides['LOG_FILE'] = f"{root}_shard-{index:02d}{ext}"
+        if metrics_port:
+            # 每个分片使用各自的指标端口
+            overrides['METRICS_PORT'] = int(metrics_port) + index
+        
+        stats_path = os.path.join(shard_dir, 'stats.json')
+        worker = context.Process(
+            target=_run_shard, args=(spider_name, domain, start_urls, overrides, stats_path), name=f"shard-{index:02d}"
+        )
+        worker.start()
+        logger.info(f"分片 {index} 已启动 (PID {worker.pid}): {shard_dir}")
+        workers.append((index, worker, stats_path))
+    
+    # 等待所有分片结束并合并统计信息
+    stats_list = []
+    for index, worker, stats_path in workers:
+        worker.join()
+        if worker.exitcode != 0 or not os.path.exists(stats_path):
+            logger.error(f"分片 {index} 异常退出，退出码: {worker.exitcode}")
+            continue
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            stats_list.append(json.load(f))
+    
+    merged = merge_stats(stats_list)
+    merged['shard/count'] = len(workers)
+    merged['shard/failed'] = len(workers) - len(stats_list)
+    if workers:
+        with open(os.path.join(run_dir, 'stats.json'), 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2, default=str)
+    logger.info(f"{len(stats_list)}/{len(workers)} 个分片完成，共 {merged.get('item_scraped_count', 0)} 条数据: {run_dir}")
+    return merged
 
 def main():
     """主函数"""
@@ -49,11 +204,29 @@ def main():
     parser = argparse.ArgumentParser(description="运行Scrapy爬虫")
     parser.add_argument("spider", choices=["news", "sina_news"], help="爬虫名称")
     parser.add_argument("-d", "--domain", help="域名")
-    parser.add_argument("-s", "--start-url", help="起始URL")
+    parser.add_argument("-s", "--start-url", nargs="+", help="起始URL，可以指定多个")
+    parser.add_argument("--shards", type=int, default=1, help="分片（进程）数量，默认为1（不分片）")
+    parser.add_argument("--shard-by", choices=["domain", "url"], default="domain",
+                        help="分片依据，'domain'按主机名，'url'按URL，默认为'domain'")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量爬取：跳过已爬取的新闻，列表页使用条件请求，新闻都已爬取时停止翻页")
     args = parser.parse_args()
     
     # 运行爬虫
-    run_spider(args.spider, domain=args.domain, start_url=args.start_url)
+    start_url = args.start_url[0] if args.start_url and len(args.start_url) == 1 else args.start_url
+    overrides = {'INCREMENTAL_ENABLED': True} if args.incremental else None
+    if args.shards > 1:
+        stats = run_sharded(args.spider, args.shards, domain=args.domain, start_url=start_url,
+                            shard_by=args.shard_by, settings_overrides=overrides)
+        
+        # 打印结果
+        print("\n分片爬取结果:")
+        print(f"分片数: {stats['shard/count']}，失败: {stats['shard/failed']}")
+        print(f"共爬取 {stats.get('item_scraped_count', 0)} 条数据，"
+              f"{stats.get('downloader/response_count', 0)} 个响应，"
+              f"耗时 {stats.get('elapsed_time_seconds', 0):.2f} 秒")
+    else:
+        run_spider(args.spider, domain=args.domain, start_url=start_url, settings_overrides=overrides)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
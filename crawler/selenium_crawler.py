@@ -18,11 +18,12 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 from utils.logger import crawler_logger as logger
 from utils.storage import DataStorage
 from utils.user_agents import get_random_user_agent
+from utils.archive import HtmlArchive
 
 class SeleniumCrawler:
     """Selenium爬虫类，用于爬取动态网页"""
     
-    def __init__(self, headless=True, timeout=10, wait_time=2):
+    def __init__(self, headless=True, timeout=10, wait_time=2, archive_dir=None):
         """
         初始化Selenium爬虫
         
@@ -30,12 +31,15 @@ class SeleniumCrawler:
             headless (bool, optional): 是否使用无头模式，默认为True
             timeout (int, optional): 页面加载超时时间（秒），默认为10秒
             wait_time (int, optional): 页面渲染等待时间（秒），默认为2秒
+            archive_dir (str, optional): 原始HTML归档目录，指定后保存渲染后的页面，之后可用reparse重新解析，
+                默认为None（不归档）
         """
         self.headless = headless
         self.timeout = timeout
         self.wait_time = wait_time
         self.driver = None
         self.storage = DataStorage()
+        self.archive = HtmlArchive(archive_dir) if archive_dir else None
     
     def _setup_driver(self):
         """
@@ -112,13 +116,14 @@ class SeleniumCrawler:
             logger.error(f"获取页面失败: {url}, 错误: {str(e)}")
             return None
     
-    def parse_page(self, html, selector=None):
+    def parse_page(self, html, selector=None, url=None):
         """
         解析页面
         
         Args:
             html (str): 页面HTML
             selector (str, optional): 内容选择器，默认为None
+            url (str, optional): 页面URL，默认为None（使用浏览器当前的URL）
             
         Returns:
             dict: 解析结果
@@ -142,7 +147,7 @@ class SeleniumCrawler:
                 content = "\n".join([p.text.strip() for p in soup.find_all('p')])
             
             # 获取当前URL
-            current_url = self.driver.current_url
+            current_url = url or self.driver.current_url
             
             return {
                 "url": current_url,
@@ -225,6 +230,10 @@ class SeleniumCrawler:
                 # 重新获取页面HTML（因为滚动后页面内容可能更新）
                 html = self.driver.page_source
             
+            # 归档渲染后的页面
+            if html and self.archive is not None:
+                self.archive.store(self.driver.current_url, html, content_type="text/html")
+            
             # 解析页面
             result = self.parse_page(html, selector=content_selector)
             
@@ -237,6 +246,8 @@ class SeleniumCrawler:
         finally:
             # 停止WebDriver
             self.stop()
+            if self.archive is not None:
+                self.archive.commit()
     
     def save_result(self, data, formats=None):
         """
@@ -284,10 +295,12 @@ def main():
     parser.add_argument("-t", "--timeout", type=int, default=10, help="页面加载超时时间（秒），默认为10秒")
     parser.add_argument("-f", "--formats", nargs="+", choices=["json", "csv", "excel"], default=["json"], 
                         help="保存格式，可选值为'json', 'csv', 'excel'，默认为'json'")
+    parser.add_argument("--archive", nargs="?", const="crawler/data/archive", default=None, metavar="DIR",
+                        help="归档渲染后的HTML，之后可用reparse命令重新解析，默认目录为crawler/data/archive")
     args = parser.parse_args()
     
     # 创建爬虫实例
-    crawler = SeleniumCrawler(headless=not args.no_headless, timeout=args.timeout)
+    crawler = SeleniumCrawler(headless=not args.no_headless, timeout=args.timeout, archive_dir=args.archive)
     
     # 开始爬取
     data = crawler.crawl(
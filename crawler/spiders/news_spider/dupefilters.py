@@ -0,0 +1,75 @@
+"""
+Scrapy爬虫的去重过滤器
+"""
+import os
+
+from scrapy import signals
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.job import job_dir
+
+from crawler.utils.fingerprint_store import FingerprintStore
+
+def get_fingerprint_store(crawler):
+    """
+    获取爬虫共用的指纹库
+
+    PersistentDupeFilter、PersistentDuplicatesPipeline和IncrementalMixin共用同一个FingerprintStore，
+    第一次调用时打开（只载入一次布隆过滤器），爬虫关闭（spider_closed，所有Pipeline写完之后）时写入缓冲区并关闭。
+
+    Args:
+        crawler (Crawler): Scrapy的Crawler
+
+    Returns:
+        FingerprintStore: 指纹库
+    """
+    store = getattr(crawler, 'fingerprint_store', None)
+    if store is None:
+        settings = crawler.settings
+        data_dir = settings.get('DATA_DIR', 'crawler/data')
+        # 新URL由PersistentDuplicatesPipeline加入，不自动批量写入，关闭时一次写入
+        store = FingerprintStore(
+            settings.get('FINGERPRINT_DB_PATH') or os.path.join(data_dir, 'fingerprints.db'),
+            bloom=settings.getbool('FINGERPRINT_BLOOM', True),
+            capacity=settings.getint('FINGERPRINT_CAPACITY', 1000000),
+            batch_size=None
+        )
+        crawler.fingerprint_store = store
+        crawler.signals.connect(store.close, signal=signals.spider_closed)
+    return store
+
+class PersistentDupeFilter(RFPDupeFilter):
+    """
+    跨运行的去重过滤器
+
+    本次运行内的重复请求仍按Scrapy的请求指纹过滤；另外，URL已保存在指纹库中的GET请求直接过滤，不再下载。
+    指纹库只记录PersistentDuplicatesPipeline处理过的Item的URL（即已解析的新闻页面），
+    列表页、导航页不会写入指纹库，每次运行仍会重新爬取以发现新的新闻。
+    """
+
+    def __init__(self, path=None, debug=False, *, fingerprinter=None, crawler=None, stats=None):
+        super().__init__(path, debug, fingerprinter=fingerprinter)
+        self.crawler = crawler
+        self.stats = stats
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            job_dir(settings),
+            settings.getbool('DUPEFILTER_DEBUG'),
+            fingerprinter=crawler.request_fingerprinter,
+            crawler=crawler,
+            stats=crawler.stats
+        )
+
+    def open(self):
+        self.store = get_fingerprint_store(self.crawler)
+        self.logger.info(f"指纹库: {self.store.db_path} ({len(self.store)} 个已爬取的URL)")
+
+    def request_seen(self, request):
+        if request.method == 'GET' and request.url in self.store:
+            if self.stats is not None:
+                self.stats.inc_value('dupefilter/persistent')
+            return True
+        return super().request_seen(request)
@@ -0,0 +1,86 @@
+"""
+Scrapy爬虫的扩展
+"""
+import os
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet import task
+from twisted.internet.threads import deferToThread
+
+from crawler.utils.metrics import (
+    MetricsExporter, fetch_latency, response_bytes, responses_total, retries_total, items_total, queue_depth
+)
+
+class MetricsExtension:
+    """
+    爬取指标扩展，根据Scrapy信号记录每个主机的下载耗时、响应字节数和状态码、重试次数、Item数量，
+    并定期记录调度器中的请求数量；指标通过METRICS_PORT端口以Prometheus文本格式提供，并定期写入JSON快照文件。
+    回调函数的解析耗时由爬虫中的timed装饰器记录。
+    """
+
+    def __init__(self, crawler, port=None, host='127.0.0.1', snapshot_path=None, interval=10.0):
+        self.crawler = crawler
+        self.exporter = MetricsExporter(port=port, host=host, snapshot_path=snapshot_path, interval=interval)
+        self.interval = interval
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('METRICS_ENABLED', False):
+            raise NotConfigured
+
+        port = settings.get('METRICS_PORT')
+        snapshot_path = settings.get('METRICS_SNAPSHOT_PATH') or os.path.join(
+            settings.get('DATA_DIR', 'crawler/data'), f'metrics_{crawler.spidercls.name}.json'
+        )
+        extension = cls(
+            crawler,
+            port=int(port) if port is not None else None,
+            host=settings.get('METRICS_HOST', '127.0.0.1'),
+            snapshot_path=snapshot_path,
+            interval=settings.getfloat('METRICS_SNAPSHOT_INTERVAL', 10.0)
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        return extension
+
+    def spider_opened(self, spider):
+        self.exporter.start()
+        self.task = task.LoopingCall(self.update_queue_depth, spider)
+        self.task.start(min(self.interval, 5.0))
+
+    def spider_closed(self, spider):
+        # 调度器此时已关闭，不再读取队列长度
+        if self.task is not None and self.task.running:
+            self.task.stop()
+        # 关闭HTTP服务、等待快照线程并写入最后的快照，在线程中执行，不阻塞reactor
+        return deferToThread(self.exporter.close)
+
+    def update_queue_depth(self, spider):
+        """记录调度器中等待下载的请求数量"""
+        slot = getattr(self.crawler.engine, 'slot', None)
+        # 爬虫关闭过程中调度器可能已经关闭
+        if slot is not None and slot.closing is None and slot.scheduler is not None:
+            queue_depth.set(len(slot.scheduler), spider=spider.name)
+
+    def response_received(self, response, request, spider):
+        host = urlparse_cached(request).netloc
+        responses_total.inc(host=host, status=response.status)
+        response_bytes.inc(len(response.body), host=host)
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            fetch_latency.observe(latency, host=host)
+
+    def request_scheduled(self, request, spider):
+        # RetryMiddleware重新调度的请求带有retry_times
+        if request.meta.get('retry_times'):
+            retries_total.inc(host=urlparse_cached(request).netloc)
+
+    def item_scraped(self, item, response, spider):
+        items_total.inc(spider=spider.name)
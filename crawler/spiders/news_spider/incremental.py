@@ -0,0 +1,65 @@
+"""
+Scrapy爬虫的增量爬取支持
+"""
+from crawler.spiders.news_spider.dupefilters import get_fingerprint_store
+
+class IncrementalMixin:
+    """
+    增量爬取Mixin，与CrawlSpider一起使用（class XxxSpider(IncrementalMixin, CrawlSpider)）
+
+    启用后（INCREMENTAL_ENABLED设置或-a incremental=1参数）：
+    - 有callback的规则提取到的新闻链接，URL已在指纹库中时不再生成请求
+    - 页面中提取到的新闻链接全部已爬取过时，不再跟随该页面的翻页、导航链接
+    - 起始页和翻页、导航页的请求带有incremental_list标记，由ConditionalRequestMiddleware发送条件请求
+    指纹库与PersistentDupeFilter、PersistentDuplicatesPipeline共用（get_fingerprint_store）。
+    """
+
+    incremental = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        settings = crawler.settings
+        if spider.incremental is None:
+            spider.incremental = settings.getbool('INCREMENTAL_ENABLED', False)
+        elif isinstance(spider.incremental, str):
+            # 命令行参数为字符串
+            spider.incremental = spider.incremental.lower() not in ('0', 'false', 'no', 'off', '')
+
+        spider.known_urls = get_fingerprint_store(crawler) if spider.incremental else None
+        return spider
+
+    def start_requests(self):
+        for request in super().start_requests():
+            if self.incremental:
+                request.meta['incremental_list'] = True
+            yield request
+
+    def _requests_to_follow(self, response):
+        if not self.incremental:
+            yield from super()._requests_to_follow(response)
+            return
+
+        # 先取出全部请求，根据新闻链接是否都已爬取决定是否继续翻页
+        articles, others = [], []
+        for request in super()._requests_to_follow(response):
+            if request is None:
+                continue
+            if self._rules[request.meta['rule']].callback is not None:
+                articles.append(request)
+            else:
+                others.append(request)
+
+        new_articles = [request for request in articles if request.url not in self.known_urls]
+        stats = self.crawler.stats
+        if len(new_articles) < len(articles):
+            stats.inc_value('incremental/known_skipped', len(articles) - len(new_articles))
+        yield from new_articles
+
+        if articles and not new_articles:
+            self.logger.info(f"页面中的 {len(articles)} 篇新闻均已爬取，停止翻页: {response.url}")
+            stats.inc_value('incremental/pagination_stopped')
+            return
+        for request in others:
+            request.meta['incremental_list'] = True
+            yield request
@@ -2,26 +2,42 @@
 Scrapy爬虫的中间件
 """
 import random
+import os
+import time
 from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers, Request, TextResponse
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.misc import load_object
+from twisted.internet.threads import deferToThread
 from itemadapter import is_item, ItemAdapter
 
-from crawler.utils.user_agents import get_random_user_agent, DEFAULT_USER_AGENTS
+from crawler.utils.user_agents import user_agent_pool, DEFAULT_USER_AGENTS
+from crawler.utils.archive import HtmlArchive
+from crawler.utils.background_writer import BackgroundWriter
+from crawler.utils.http_cache import HttpCache
+from crawler.utils.retry import parse_retry_after
+from crawler.utils.url import shard_for
+from crawler.spiders.news_spider.scheduler import SharedFrontierScheduler
 
 class RandomUserAgentMiddleware:
-    """随机User-Agent中间件"""
+    """随机User-Agent中间件，从进程内共享的用户代理池中抽取"""
     
-    def __init__(self, user_agents=None):
+    def __init__(self, user_agents=None, sticky=False):
         self.user_agents = user_agents or DEFAULT_USER_AGENTS
+        self.sticky = sticky
     
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls()
+        middleware = cls(sticky=crawler.settings.getbool('USER_AGENT_STICKY_PER_HOST', False))
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
         return middleware
     
     def process_request(self, request, spider):
-        # 设置随机User-Agent
-        request.headers['User-Agent'] = get_random_user_agent()
+        # 设置随机User-Agent（sticky时同一主机固定使用同一个）
+        host = urlparse_cached(request).netloc
+        request.headers['User-Agent'] = user_agent_pool.for_host(host, sticky=self.sticky)
         return None
     
     def spider_opened(self, spider):
@@ -72,4 +88,388 @@ class NewsDownloaderMiddleware:
         pass
     
     def spider_opened(self, spider):
-        spider.logger.info('Spider opened: %s' % spider.name) 
\ No newline at end of file
+        spider.logger.info('Spider opened: %s' % spider.name)
+
+class ArchiveMiddleware:
+    """
+    原始HTML归档中间件，保存成功下载的页面，之后可用reparse命令重新解析
+    
+    响应内容放入后台写入队列后立即返回，压缩、写入分段文件和索引由后台线程完成，不阻塞Scrapy的reactor线程。
+    """
+    
+    def __init__(self, archive_dir='crawler/data/archive', queue_size=1000, batch_size=500, flush_interval=1.0):
+        self.archive = HtmlArchive(archive_dir)
+        self.writer = BackgroundWriter(self.archive, max_queue=queue_size, batch_size=batch_size,
+                                       flush_interval=flush_interval)
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ARCHIVE_ENABLED', False):
+            raise NotConfigured
+        data_dir = settings.get('DATA_DIR', 'crawler/data')
+        middleware = cls(
+            archive_dir=settings.get('ARCHIVE_DIR') or os.path.join(data_dir, 'archive'),
+            queue_size=settings.getint('ARCHIVE_QUEUE_SIZE', 1000),
+            batch_size=settings.getint('WRITER_BATCH_SIZE', 500),
+            flush_interval=settings.getfloat('WRITER_FLUSH_INTERVAL', 1.0)
+        )
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+    
+    def process_response(self, request, response, spider):
+        # 只归档解压后的成功响应（重定向等在更靠近下载器的中间件中已处理）
+        if 200 <= response.status < 300 and response.body:
+            content_type = response.headers.get('Content-Type')
+            self.writer.write({
+                'url': response.url,
+                'body': response.body,
+                'status': response.status,
+                'content_type': content_type.decode('latin-1') if content_type else None,
+                'encoding': response.encoding if isinstance(response, TextResponse) else None,
+                'fetch_time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        return response
+    
+    def _close(self):
+        """写完队列中的内容，读取统计信息后关闭归档"""
+        self.writer.flush()
+        stats = self.archive.stats()
+        self.writer.close()
+        return stats
+    
+    def spider_closed(self, spider):
+        # 在线程中等待剩余的内容写完，返回Deferred，Scrapy等待其完成后再结束
+        d = deferToThread(self._close)
+        d.addCallback(lambda stats: spider.logger.info(
+            f"已归档 {stats['captures']} 次抓取，{stats['bodies']} 个不同页面"
+        ))
+        return d
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    自适应并发中间件，按下载槽位（通常为域名）调整并发数和下载延迟
+    
+    对每个槽位统计响应时间和错误率（超时、连接失败、5xx、429）的指数加权移动平均（EWMA），
+    每隔ADAPTIVE_CONCURRENCY_INTERVAL秒按AIMD方式调整一次：响应时间低于目标且错误率不超过目标时，
+    先逐步减小延迟，延迟降到下限后并发数加1；超过目标时并发数减半、延迟加倍。
+    收到429时立即降低，并且延迟不小于Retry-After。
+    """
+    
+    def __init__(self, crawler, min_concurrency=1, max_concurrency=16, min_delay=0.0, max_delay=30.0,
+                 target_latency=1.0, target_error_rate=0.05, interval=5.0, alpha=0.3):
+        self.crawler = crawler
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.target_latency = target_latency
+        self.target_error_rate = target_error_rate
+        self.interval = interval
+        self.alpha = alpha
+        self.states = {}
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED', False):
+            raise NotConfigured
+        if settings.getbool('AUTOTHROTTLE_ENABLED'):
+            # AutoThrottle也会修改槽位的延迟，两者同时启用会互相干扰
+            raise NotConfigured('AUTOTHROTTLE_ENABLED与ADAPTIVE_CONCURRENCY_ENABLED不能同时启用')
+        return cls(
+            crawler,
+            min_concurrency=settings.getint('ADAPTIVE_CONCURRENCY_MIN', 1),
+            max_concurrency=settings.getint('ADAPTIVE_CONCURRENCY_MAX', 16),
+            min_delay=settings.getfloat('ADAPTIVE_DELAY_MIN', 0.0),
+            max_delay=settings.getfloat('ADAPTIVE_DELAY_MAX', 30.0),
+            target_latency=settings.getfloat('ADAPTIVE_TARGET_LATENCY', 1.0),
+            target_error_rate=settings.getfloat('ADAPTIVE_TARGET_ERROR_RATE', 0.05),
+            interval=settings.getfloat('ADAPTIVE_CONCURRENCY_INTERVAL', 5.0)
+        )
+    
+    def _get_slot(self, request):
+        """获取请求所在的下载器槽位，未经过下载器（如缓存命中）时返回None"""
+        key = request.meta.get('download_slot')
+        engine = self.crawler.engine
+        if key is None or engine is None:
+            return None, None
+        return key, engine.downloader.slots.get(key)
+    
+    def _get_state(self, key):
+        """获取槽位的统计状态，不存在时创建"""
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = {
+                'latency': None, 'error_rate': 0.0, 'samples': 0, 'last_adjust': time.monotonic(),
+                'last_throttled': 0.0,
+            }
+        return state
+    
+    def _record(self, key, slot, latency, error, spider):
+        """记录一次请求结果，到达调整间隔时调整槽位"""
+        state = self._get_state(key)
+        if latency is not None:
+            if state['latency'] is None:
+                state['latency'] = latency
+            else:
+                state['latency'] += self.alpha * (latency - state['latency'])
+        state['error_rate'] += self.alpha * (float(error) - state['error_rate'])
+        state['samples'] += 1
+        
+        if time.monotonic() - state['last_adjust'] < self.interval:
+            return
+        latency = state['latency'] if state['latency'] is not None else 0.0
+        if state['error_rate'] > self.target_error_rate or latency > self.target_latency:
+            self._decrease(key, slot, state, spider)
+        else:
+            self._increase(key, slot, state, spider)
+    
+    def _increase(self, key, slot, state, spider):
+        """加性增加：延迟减半（接近下限时直接降到下限），延迟已到下限时并发数加1"""
+        concurrency, delay = slot.concurrency, slot.delay
+        if delay > self.min_delay:
+            delay /= 2
+            if delay < self.min_delay + 0.05:
+                delay = self.min_delay
+        elif concurrency < self.max_concurrency:
+            concurrency += 1
+        self._apply(key, slot, state, concurrency, delay, '提高', spider)
+    
+    def _decrease(self, key, slot, state, spider, min_delay=None):
+        """乘性减少：并发数减半，延迟加倍（至少0.5秒，且不小于min_delay）"""
+        concurrency = max(self.min_concurrency, slot.concurrency // 2)
+        delay = min(self.max_delay, max(slot.delay * 2, 0.5, min_delay or 0.0))
+        self._apply(key, slot, state, concurrency, delay, '降低', spider)
+    
+    def _apply(self, key, slot, state, concurrency, delay, action, spider):
+        """修改槽位的并发数和延迟，并记录日志"""
+        latency = state['latency']
+        if (concurrency, delay) != (slot.concurrency, slot.delay):
+            spider.logger.info(
+                f"自适应并发{action} {key}: 并发 {slot.concurrency} -> {concurrency}，"
+                f"延迟 {slot.delay:.2f} -> {delay:.2f} 秒 "
+                f"(响应时间 {latency if latency is not None else 0.0:.2f} 秒，错误率 {state['error_rate']:.1%}，"
+                f"样本 {state['samples']})"
+            )
+            self.crawler.stats.inc_value(f"adaptive_concurrency/{'increase' if action == '提高' else 'decrease'}")
+            slot.concurrency = concurrency
+            slot.delay = delay
+        state['samples'] = 0
+        state['last_adjust'] = time.monotonic()
+    
+    def process_response(self, request, response, spider):
+        key, slot = self._get_slot(request)
+        if slot is None or 'cached' in response.flags:
+            return response
+        
+        if response.status == 429:
+            # 被限流时立即降低，不等待调整间隔
+            state = self._get_state(key)
+            state['error_rate'] += self.alpha * (1.0 - state['error_rate'])
+            retry_after = response.headers.get('Retry-After')
+            wait = parse_retry_after(retry_after.decode('latin-1'), self.max_delay) if retry_after else None
+            now = time.monotonic()
+            if now - state['last_throttled'] < (state['latency'] or 0.0) + slot.delay:
+                # 刚降低过，同一批并发请求收到的429不再重复降低，只保证延迟不小于Retry-After
+                if wait and wait > slot.delay:
+                    slot.delay = wait
+                return response
+            state['last_throttled'] = now
+            self._decrease(key, slot, state, spider, min_delay=wait)
+            return response
+        
+        error = response.status >= 500 or response.status == 408
+        self._record(key, slot, request.meta.get('download_latency'), error, spider)
+        return response
+    
+    def process_exception(self, request, exception, spider):
+        key, slot = self._get_slot(request)
+        if slot is not None:
+            # 超时、连接失败等，没有响应时间样本
+            self._record(key, slot, None, True, spider)
+        return None
+
+class ConditionalRequestMiddleware:
+    """
+    条件请求中间件，增量爬取时列表页（带incremental_list标记的请求）使用HttpCache发送条件请求
+    
+    已缓存的列表页带If-None-Match/If-Modified-Since请求，服务器返回304时用缓存内容构造200响应交给爬虫，
+    页面中的新闻链接都已爬取过，IncrementalMixin会据此停止翻页。新闻页不缓存，由指纹库去重。
+    爬虫启用了增量爬取（INCREMENTAL_ENABLED设置或-a incremental=1参数）时才打开缓存。
+    缓存的读写（包括整个页面内容）在线程池中执行，process_request/process_response返回Deferred，不阻塞reactor。
+    """
+    
+    def __init__(self, cache_dir='crawler/data/list_cache'):
+        self.cache_dir = cache_dir
+        self.cache = None
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        data_dir = crawler.settings.get('DATA_DIR', 'crawler/data')
+        middleware = cls(cache_dir=crawler.settings.get('INCREMENTAL_CACHE_DIR') or os.path.join(data_dir, 'list_cache'))
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+    
+    def spider_opened(self, spider):
+        if getattr(spider, 'incremental', False):
+            self.cache = HttpCache(self.cache_dir)
+    
+    def _enabled(self, request):
+        return self.cache is not None and request.meta.get('incremental_list') and request.method == 'GET'
+    
+    def process_request(self, request, spider):
+        if not self._enabled(request):
+            return None
+        
+        def add_headers(entry):
+            if entry is not None:
+                for name, value in self.cache.conditional_headers(entry).items():
+                    request.headers[name] = value
+            return None
+        
+        return deferToThread(self.cache.get, request.url).addCallback(add_headers)
+    
+    def process_response(self, request, response, spider):
+        if not self._enabled(request):
+            return response
+        
+        if response.status == 304:
+            return deferToThread(self._load, request.url).addCallback(
+                self._not_modified_response, request, response, spider)
+        
+        if response.status == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            headers = {
+                name.decode('latin-1'): b', '.join(values).decode('latin-1')
+                for name, values in response.headers.items()
+            }
+            d = deferToThread(self.cache.store, response.url, response.status, headers, response.body,
+                              encoding=response.encoding if isinstance(response, TextResponse) else None)
+            return d.addCallback(lambda _: response)
+        return response
+    
+    def _load(self, url):
+        """读取缓存条目并更新它的保存时间（在线程池中执行）"""
+        entry = self.cache.get(url)
+        if entry is not None:
+            self.cache.touch(url)
+        return entry
+    
+    def _not_modified_response(self, entry, request, response, spider):
+        if entry is None:
+            return response
+        spider.crawler.stats.inc_value('incremental/not_modified')
+        headers = Headers(entry.headers)
+        respcls = responsetypes.from_args(headers=headers, url=entry.url, body=entry.body)
+        return respcls(url=response.url, status=entry.status, headers=headers, body=entry.body,
+                       request=request, flags=['not_modified'])
+    
+    def spider_closed(self, spider):
+        if self.cache is not None:
+            return deferToThread(self.cache.close)
+
+class ShardFilterMiddleware:
+    """
+    分片中间件（爬虫中间件），run_scrapy --shards运行多个进程时使用
+    
+    使用SharedFrontierScheduler时（run_scrapy分片运行的默认方式），请求由调度器加入所属分片的队列，
+    本中间件只标记起始请求，各进程产生的相同起始请求只入队一次。
+    未使用SharedFrontierScheduler时只能过滤：SHARD_BY为'domain'时丢弃主机名不属于本分片的请求；
+    为'url'时所有分片都跟随列表页、导航页，只请求URL属于本分片的新闻页。
+    """
+    
+    def __init__(self, stats, index=0, count=1, by='domain', routed=False):
+        self.stats = stats
+        self.index = index
+        self.count = count
+        self.by = by
+        self.routed = routed
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        count = crawler.settings.getint('SHARD_COUNT', 1)
+        if count <= 1:
+            raise NotConfigured
+        return cls(
+            crawler.stats,
+            index=crawler.settings.getint('SHARD_INDEX', 0),
+            count=count,
+            by=crawler.settings.get('SHARD_BY', 'domain'),
+            routed=issubclass(load_object(crawler.settings['SCHEDULER']), SharedFrontierScheduler)
+        )
+    
+    def process_start_requests(self, start_requests, spider):
+        for request in start_requests:
+            if self.routed:
+                request.meta['shard_start'] = True
+            elif self.by == 'domain' and shard_for(request.url, self.count, by=self.by) != self.index:
+                self.stats.inc_value('shard/filtered')
+                continue
+            yield request
+    
+    def _is_article(self, request, spider):
+        """请求是否由有callback的规则（新闻页）生成"""
+        rule = request.meta.get('rule')
+        rules = getattr(spider, '_rules', None)
+        return rule is not None and rules is not None and rules[rule].callback is not None
+    
+    def process_spider_output(self, response, result, spider):
+        if self.routed:
+            yield from result
+            return
+        for i in result:
+            if isinstance(i, Request):
+                if self.by == 'url' and not self._is_article(i, spider):
+                    yield i
+                    continue
+                if shard_for(i.url, self.count, by=self.by) != self.index:
+                    self.stats.inc_value('shard/filtered')
+                    continue
+            yield i
+    
+class FrontierAckMiddleware:
+    """
+    共享待爬取队列确认中间件，只在使用SharedFrontierScheduler时启用，同时作为下载器中间件和爬虫中间件
+
+    - 爬虫中间件：响应经过爬虫回调、产生的请求全部入队后确认领取（包括HttpError等异常的响应），
+      确认前其他进程不会认为队列已处理完而提前结束
+    - 下载器中间件：请求下载失败或被其他下载器中间件忽略（IgnoreRequest，如robots.txt禁止）时确认领取，
+      避免领取一直挂起
+    下载器中间件放在最外层（优先级数值最大），process_exception最先被调用；
+    爬虫中间件放在最外层（优先级数值最小），最后处理回调的输出。
+    """
+    
+    def __init__(self, crawler):
+        self.crawler = crawler
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not issubclass(load_object(crawler.settings['SCHEDULER']), SharedFrontierScheduler):
+            raise NotConfigured
+        return cls(crawler)
+    
+    def _ack(self, request, spider):
+        if request is not None and 'frontier_lease' in request.meta:
+            self.crawler.engine.slot.scheduler.request_finished(request, spider)
+    
+    def process_exception(self, request, exception, spider):
+        self._ack(request, spider)
+        return None
+    
+    def process_spider_output(self, response, result, spider):
+        try:
+            yield from result
+        finally:
+            self._ack(response.request, spider)
+    
+    async def process_spider_output_async(self, response, result, spider):
+        try:
+            async for i in result:
+                yield i
+        finally:
+            self._ack(response.request, spider)
+    
+    def process_spider_exception(self, response, exception, spider):
+        self._ack(response.request, spider)
+        return None
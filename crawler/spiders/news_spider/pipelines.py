@@ -2,27 +2,70 @@
 Scrapy爬虫的Pipeline定义
 """
 import os
-import json
-import csv
 from datetime import datetime
 
 from scrapy.exceptions import DropItem
+from twisted.internet.threads import deferToThread
 from itemadapter import ItemAdapter
 
+from crawler.utils.fingerprint import FingerprintSet
+from crawler.utils.sqlite_storage import SqliteStorage
+from crawler.utils.storage import CsvSink, JsonSink, JsonlWriter
+from crawler.utils.background_writer import BackgroundWriter
+from crawler.spiders.news_spider.dupefilters import get_fingerprint_store
+
 class DuplicatesPipeline:
-    """去重Pipeline"""
+    """去重Pipeline，按规范化URL的指纹去重"""
     
-    def __init__(self):
-        self.urls_seen = set()
+    def __init__(self, bloom=False, capacity=1024):
+        self.urls_seen = FingerprintSet(bloom=bloom, capacity=capacity)
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            bloom=crawler.settings.getbool('URLS_SEEN_BLOOM', False),
+            capacity=crawler.settings.getint('URLS_SEEN_CAPACITY', 1024)
+        )
     
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
-        if adapter.get('url') in self.urls_seen:
-            raise DropItem(f"重复的新闻: {item['url']}")
+        url = adapter.get('url')
+        # 没有URL的Item无法去重，原样交给后续Pipeline
+        if not url:
+            return item
+        if url in self.urls_seen:
+            raise DropItem(f"重复的新闻: {url}")
         else:
-            self.urls_seen.add(adapter['url'])
+            self.urls_seen.add(url)
             return item
 
+class PersistentDuplicatesPipeline:
+    """
+    跨运行的去重Pipeline，将新闻URL写入指纹库，之后的运行由PersistentDupeFilter过滤这些请求
+    
+    放在所有存储Pipeline之后，只记录已交给存储Pipeline的Item，不丢弃Item（再次爬取的新闻仍会更新SQLite中的记录）。
+    URL先保存在内存中，爬虫关闭、所有存储Pipeline写完之后才写入指纹库（spider_closed在所有Pipeline的close_spider
+    完成之后发送），存储失败或进程中断时这些新闻下次仍会爬取。指纹库与PersistentDupeFilter共用。
+    """
+    
+    def __init__(self, crawler, stats=None):
+        self.crawler = crawler
+        self.stats = stats
+        self.store = None
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler, stats=crawler.stats)
+    
+    def open_spider(self, spider):
+        self.store = get_fingerprint_store(self.crawler)
+    
+    def process_item(self, item, spider):
+        url = ItemAdapter(item).get('url')
+        if url and not self.store.add(url):
+            self.stats.inc_value('fingerprint/recrawled', spider=spider)
+        return item
+
 class CleanDataPipeline:
     """数据清洗Pipeline"""
     
@@ -43,18 +86,51 @@ class CleanDataPipeline:
         
         return item
 
-class JsonWriterPipeline:
-    """JSON文件存储Pipeline"""
+class BackgroundWriterPipeline:
+    """
+    由BackgroundWriter写入的存储Pipeline的基类，子类在open_spider中创建self.writer
+    
+    process_item只把Item放入后台写入队列。关闭时在线程中等待剩余的Item写完并关闭写入器，
+    close_spider返回Deferred，Scrapy等它完成后再结束爬虫，reactor线程不会被阻塞。
+    """
     
-    def __init__(self, data_dir='crawler/data'):
+    # 关闭时日志中显示的存储名称
+    storage_name = None
+    
+    def close_spider(self, spider):
+        d = deferToThread(self.writer.close)
+        d.addCallback(lambda _: spider.logger.info(f"已保存 {self.writer.count} 条数据到{self.storage_name}"))
+        return d
+    
+    def process_item(self, item, spider):
+        # 将Item放入写入队列
+        self.writer.write(ItemAdapter(item).asdict())
+        return item
+
+class JsonWriterPipeline(BackgroundWriterPipeline):
+    """JSON文件存储Pipeline，Item到达时即由后台线程写入文件，内存占用不随Item数量增长"""
+    
+    storage_name = 'JSON文件'
+    
+    def __init__(self, data_dir='crawler/data', file_format='json', queue_size=10000, batch_size=500,
+                 flush_interval=1.0):
+        if file_format not in ('json', 'jsonl'):
+            raise ValueError(f"不支持的JSON文件格式: {file_format}，可选值为'json', 'jsonl'")
         self.data_dir = data_dir
-        self.file = None
-        self.items = []
+        self.file_format = file_format
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.writer = None
     
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
-            data_dir=crawler.settings.get('DATA_DIR', 'crawler/data')
+            data_dir=crawler.settings.get('DATA_DIR', 'crawler/data'),
+            file_format=crawler.settings.get('JSON_WRITER_FORMAT', 'json'),
+            queue_size=crawler.settings.getint('WRITER_QUEUE_SIZE', 10000),
+            batch_size=crawler.settings.getint('WRITER_BATCH_SIZE', 500),
+            flush_interval=crawler.settings.getfloat('WRITER_FLUSH_INTERVAL', 1.0)
         )
     
     def open_spider(self, spider):
@@ -63,40 +139,40 @@ class JsonWriterPipeline:
         
         # 生成文件名
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{spider.name}_{timestamp}.json"
+        filename = f"{spider.name}_{timestamp}.{self.file_format}"
         filepath = os.path.join(self.data_dir, filename)
         
-        # 打开文件
-        self.file = open(filepath, 'w', encoding='utf-8')
+        # json逐条写入JSON数组，关闭时写入数组结尾；jsonl每行一条，进程被杀死时已写入的行仍然完整
+        if self.file_format == 'jsonl':
+            sink = JsonlWriter(filepath, flush_every=self.batch_size)
+        else:
+            sink = JsonSink(filepath, flush_every=self.batch_size)
+        self.writer = BackgroundWriter(sink, max_queue=self.queue_size, batch_size=self.batch_size,
+                                       flush_interval=self.flush_interval)
         
         # 记录文件路径
         spider.logger.info(f"JSON文件路径: {filepath}")
         spider.json_file = filepath
-    
-    def close_spider(self, spider):
-        # 写入数据
-        json.dump(self.items, self.file, ensure_ascii=False, indent=2)
-        self.file.close()
-        
-        spider.logger.info(f"已保存 {len(self.items)} 条数据到JSON文件")
-    
-    def process_item(self, item, spider):
-        # 将Item转换为字典并添加到列表
-        self.items.append(dict(item))
-        return item
 
-class CsvWriterPipeline:
-    """CSV文件存储Pipeline"""
+class CsvWriterPipeline(BackgroundWriterPipeline):
+    """CSV文件存储Pipeline，由后台线程写入文件，不阻塞Scrapy的reactor线程"""
+    
+    storage_name = 'CSV文件'
     
-    def __init__(self, data_dir='crawler/data'):
+    def __init__(self, data_dir='crawler/data', queue_size=10000, batch_size=500, flush_interval=1.0):
         self.data_dir = data_dir
-        self.file = None
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         self.writer = None
     
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
-            data_dir=crawler.settings.get('DATA_DIR', 'crawler/data')
+            data_dir=crawler.settings.get('DATA_DIR', 'crawler/data'),
+            queue_size=crawler.settings.getint('WRITER_QUEUE_SIZE', 10000),
+            batch_size=crawler.settings.getint('WRITER_BATCH_SIZE', 500),
+            flush_interval=crawler.settings.getfloat('WRITER_FLUSH_INTERVAL', 1.0)
         )
     
     def open_spider(self, spider):
@@ -108,24 +184,43 @@ class CsvWriterPipeline:
         filename = f"{spider.name}_{timestamp}.csv"
         filepath = os.path.join(self.data_dir, filename)
         
-        # 打开文件
-        self.file = open(filepath, 'w', encoding='utf-8', newline='')
+        # 表头取自前几条Item的字段，之后出现的新字段在关闭时补充到表头
+        self.writer = BackgroundWriter(CsvSink(filepath, batch_size=self.batch_size), max_queue=self.queue_size,
+                                       batch_size=self.batch_size, flush_interval=self.flush_interval)
         
         # 记录文件路径
         spider.logger.info(f"CSV文件路径: {filepath}")
         spider.csv_file = filepath
+
+class SqlitePipeline(BackgroundWriterPipeline):
+    """
+    SQLite存储Pipeline，按URL插入或更新，多次运行的结果保存在同一个数据库中
     
-    def close_spider(self, spider):
-        self.file.close()
+    Item放入后台写入队列后立即返回，由后台线程每batch_size条或每flush_interval秒用executemany批量写入，
+    数据库写入不阻塞Scrapy的reactor线程。
+    """
     
-    def process_item(self, item, spider):
-        # 如果writer还没有初始化
-        if self.writer is None:
-            # 获取所有字段名
-            fieldnames = item.keys()
-            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
-            self.writer.writeheader()
-        
-        # 将Item写入CSV
-        self.writer.writerow(ItemAdapter(item).asdict())
-        return item 
\ No newline at end of file
+    storage_name = 'SQLite'
+    
+    def __init__(self, db_path='crawler/data/news.db', batch_size=500, flush_interval=1.0, queue_size=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.writer = None
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        data_dir = crawler.settings.get('DATA_DIR', 'crawler/data')
+        return cls(
+            db_path=crawler.settings.get('SQLITE_DB_PATH') or os.path.join(data_dir, 'news.db'),
+            batch_size=crawler.settings.getint('SQLITE_BATCH_SIZE', 500),
+            flush_interval=crawler.settings.getfloat('SQLITE_FLUSH_INTERVAL', 1.0),
+            queue_size=crawler.settings.getint('WRITER_QUEUE_SIZE', 10000)
+        )
+    
+    def open_spider(self, spider):
+        storage = SqliteStorage(self.db_path, batch_size=self.batch_size)
+        self.writer = BackgroundWriter(storage, max_queue=self.queue_size, batch_size=self.batch_size,
+                                       flush_interval=self.flush_interval)
+        spider.logger.info(f"SQLite数据库路径: {self.db_path}")
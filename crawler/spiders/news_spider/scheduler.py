@@ -0,0 +1,152 @@
+"""
+Scrapy爬虫的调度器
+"""
+import os
+import pickle
+import random
+
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.utils.misc import create_instance, load_object
+from scrapy.utils.request import request_from_dict
+
+from crawler.utils.shared_frontier import SharedFrontier
+from crawler.utils.url import shard_for
+
+class SharedFrontierScheduler(BaseScheduler):
+    """
+    使用共享待爬取队列（SQLite）的调度器，同一台机器上的多个Scrapy进程可以协作爬取同一个队列
+
+    请求序列化后保存在队列中，以请求指纹去重，所有进程合计每个请求只会被领取一次。
+    领取的请求在其响应经过爬虫回调、产生的新请求全部入队后才确认（由FrontierAckMiddleware负责），
+    下载失败或被下载器中间件忽略（IgnoreRequest，如robots.txt禁止）时也会确认；
+    重定向、重试产生的新请求入队后确认原请求。进程崩溃时未确认的请求在可见性超时后重新回到队列，
+    由其他进程领取；进程正常关闭时已领取但尚未处理完的请求放回队列。
+
+    分片运行（SHARD_COUNT > 1）时每个分片有自己的队列（<队列名称>-shard-NN），请求按SHARD_BY计算所属分片，
+    加入该分片的队列，由对应的进程爬取；所有分片的队列都处理完后各进程才结束。
+    """
+
+    def __init__(self, dupefilter, frontier, stats=None, crawler=None, shard_queues=None, shard_by='domain'):
+        self.df = dupefilter
+        self.frontier = frontier
+        self.stats = stats
+        self.crawler = crawler
+        self.shard_queues = shard_queues
+        self.shard_by = shard_by
+        self.spider = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        dupefilter_cls = load_object(settings['DUPEFILTER_CLASS'])
+        data_dir = settings.get('DATA_DIR', 'crawler/data')
+        queue = settings.get('FRONTIER_QUEUE') or crawler.spidercls.name
+
+        shard_queues = None
+        shard_count = settings.getint('SHARD_COUNT', 1)
+        if shard_count > 1:
+            shard_queues = [f"{queue}-shard-{index:02d}" for index in range(shard_count)]
+            queue = shard_queues[settings.getint('SHARD_INDEX', 0)]
+
+        frontier = SharedFrontier(
+            settings.get('FRONTIER_DB_PATH') or os.path.join(data_dir, 'frontier.db'),
+            queue=queue,
+            visibility_timeout=settings.getfloat('FRONTIER_VISIBILITY_TIMEOUT', 300),
+            host_limit=settings.getint('FRONTIER_HOST_LIMIT') or None,
+            max_attempts=settings.getint('FRONTIER_MAX_ATTEMPTS', 3)
+        )
+        return cls(
+            create_instance(dupefilter_cls, settings, crawler),
+            frontier,
+            stats=crawler.stats,
+            crawler=crawler,
+            shard_queues=shard_queues,
+            shard_by=settings.get('SHARD_BY', 'domain')
+        )
+
+    def open(self, spider):
+        self.spider = spider
+        counts = self.frontier.counts()
+        spider.logger.info(f"共享待爬取队列: {self.frontier.db_path} (队列: {self.frontier.queue}, "
+                           f"待领取 {counts['pending']} 个, 其他进程处理中 {counts['leased']} 个, 已完成 {counts['done']} 个)")
+        return self.df.open()
+
+    def close(self, reason):
+        released = self.frontier.release_all()
+        if released:
+            self.spider.logger.info(f"已将 {released} 个未处理的请求放回共享待爬取队列")
+        self.frontier.close()
+        return self.df.close(reason)
+
+    def _key(self, request, start):
+        """
+        请求的64位去重键
+
+        dont_filter的请求（重试等）每次使用随机键，总是入队；分片运行时各进程都会产生相同的起始请求，
+        起始请求仍按指纹去重，只入队一次。
+        """
+        if request.dont_filter and not start:
+            return random.getrandbits(64)
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        return int.from_bytes(fingerprint[:8], 'big')
+
+    def _queue_for(self, request):
+        """请求所属的队列（分片运行时为所属分片的队列）"""
+        if self.shard_queues is None:
+            return self.frontier.queue
+        return self.shard_queues[shard_for(request.url, len(self.shard_queues), by=self.shard_by)]
+
+    def enqueue_request(self, request):
+        # 重定向、重试等复制出的请求带有原请求的领取记录，新请求入队（或被丢弃）后确认原请求
+        lease_id = request.meta.pop('frontier_lease', None)
+        start = request.meta.pop('shard_start', False)
+        try:
+            if not request.dont_filter and self.df.request_seen(request):
+                self.df.log(request, self.spider)
+                return False
+            queue = self._queue_for(request)
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+            added = self.frontier.push(request.url, depth=request.meta.get('depth', 0), priority=request.priority,
+                                       data=data, key=self._key(request, start), queue=queue)
+            if not added:
+                # 其他进程已经将该请求加入队列
+                self.stats.inc_value('scheduler/frontier_duplicate', spider=self.spider)
+                return False
+            if queue != self.frontier.queue:
+                self.stats.inc_value('shard/routed', spider=self.spider)
+            self.stats.inc_value('scheduler/enqueued/frontier', spider=self.spider)
+            self.stats.inc_value('scheduler/enqueued', spider=self.spider)
+            return True
+        finally:
+            if lease_id is not None:
+                self._ack(lease_id, request)
+
+    def next_request(self):
+        leases = self.frontier.lease(1)
+        if not leases:
+            return None
+        lease = leases[0]
+        request = request_from_dict(pickle.loads(lease.data), spider=self.spider)
+        request.meta['frontier_lease'] = lease.id
+        self.stats.inc_value('scheduler/dequeued/frontier', spider=self.spider)
+        self.stats.inc_value('scheduler/dequeued', spider=self.spider)
+        return request
+
+    def _ack(self, lease_id, request):
+        """确认领取"""
+        if not self.frontier.ack(lease_id):
+            self.spider.logger.warning(f"请求的领取已超时，可能已被其他进程重复处理: {request.url}")
+
+    def request_finished(self, request, spider):
+        """请求处理结束（回调产生的请求全部入队、下载失败或被忽略）后确认，重复调用时只确认一次"""
+        lease_id = request.meta.pop('frontier_lease', None)
+        if lease_id is not None:
+            self._ack(lease_id, request)
+
+    def has_pending_requests(self):
+        # 其他进程（分片运行时包括所有分片）还有未确认的请求时可能会加入新请求，不能结束；
+        # 本进程领取的请求由引擎自己跟踪（下载器、Scraper中），不计入
+        return self.frontier.active_count(include_own=False, queues=self.shard_queues) > 0
+
+    def __len__(self):
+        return self.frontier.pending_count()
@@ -31,22 +31,126 @@ DEFAULT_REQUEST_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
 }
 
+# 同一主机是否固定使用同一个User-Agent
+USER_AGENT_STICKY_PER_HOST = False
+
 # 启用中间件
 DOWNLOADER_MIDDLEWARES = {
     'crawler.spiders.news_spider.middlewares.RandomUserAgentMiddleware': 543,
+    # 在RetryMiddleware(550)之前处理响应和异常，重试的请求也计入统计
+    'crawler.spiders.news_spider.middlewares.AdaptiveConcurrencyMiddleware': 560,
+    # 在HttpCompressionMiddleware(590)之后处理响应，缓存的是解压后的列表页
+    'crawler.spiders.news_spider.middlewares.ConditionalRequestMiddleware': 570,
+    # 在HttpCompressionMiddleware(590)之后处理响应，归档的是解压后的内容
+    'crawler.spiders.news_spider.middlewares.ArchiveMiddleware': 580,
+    # 只在使用SharedFrontierScheduler时启用，最外层处理异常，忽略或下载失败的请求也确认领取
+    'crawler.spiders.news_spider.middlewares.FrontierAckMiddleware': 990,
+}
+
+# 自适应并发：按域名统计响应时间和错误率，自动调整每个域名的并发数和下载延迟
+# （DOWNLOAD_DELAY为初始延迟，CONCURRENT_REQUESTS仍是所有域名的总并发上限）
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 16
+ADAPTIVE_DELAY_MIN = 0.0
+ADAPTIVE_DELAY_MAX = 30.0
+# 目标响应时间（秒）和错误率，超过时降低并发
+ADAPTIVE_TARGET_LATENCY = 1.0
+ADAPTIVE_TARGET_ERROR_RATE = 0.05
+# 每个域名调整的间隔（秒）
+ADAPTIVE_CONCURRENCY_INTERVAL = 5.0
+
+# 增量爬取：跳过已爬取的新闻链接，列表页的新闻都已爬取时停止翻页，列表页使用条件请求；默认关闭，
+# 用 run_scrapy --incremental、-s INCREMENTAL_ENABLED=1 或 -a incremental=1 启用；以及列表页缓存目录，默认为DATA_DIR下的list_cache
+INCREMENTAL_ENABLED = False
+INCREMENTAL_CACHE_DIR = None
+
+# 启用爬虫中间件
+SPIDER_MIDDLEWARES = {
+    # 只在使用SharedFrontierScheduler时启用，最外层处理回调的输出，产生的请求全部入队后确认领取
+    'crawler.spiders.news_spider.middlewares.FrontierAckMiddleware': 10,
+    'crawler.spiders.news_spider.middlewares.ShardFilterMiddleware': 550,
 }
 
+# 分片运行（run_scrapy --shards K）时由run_scrapy为每个进程设置：分片序号、分片数量和分片依据（'domain'或'url'），
+# 同时使用SharedFrontierScheduler，请求加入所属分片的队列
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+SHARD_BY = 'domain'
+
+# 启用扩展
+EXTENSIONS = {
+    'crawler.spiders.news_spider.extensions.MetricsExtension': 500,
+}
+
+# 爬取指标：是否启用；Prometheus文本格式端点的端口（None为不启动，分片运行时每个分片依次加1）和监听地址；
+# JSON快照文件路径（默认为DATA_DIR下的metrics_<爬虫名称>.json）及写入间隔（秒）
+METRICS_ENABLED = True
+METRICS_PORT = None
+METRICS_HOST = '127.0.0.1'
+METRICS_SNAPSHOT_PATH = None
+METRICS_SNAPSHOT_INTERVAL = 10.0
+
+# 是否归档原始HTML（之后可用reparse命令重新解析），以及归档目录，默认为DATA_DIR下的archive；
+# 后台写入队列中最多等待归档的响应数量（队列中保存的是完整的响应内容），队列满时处理响应会等待写入
+ARCHIVE_ENABLED = False
+ARCHIVE_DIR = None
+ARCHIVE_QUEUE_SIZE = 1000
+
 # 启用Pipeline
 ITEM_PIPELINES = {
     'crawler.spiders.news_spider.pipelines.DuplicatesPipeline': 300,
     'crawler.spiders.news_spider.pipelines.CleanDataPipeline': 400,
     'crawler.spiders.news_spider.pipelines.JsonWriterPipeline': 800,
     'crawler.spiders.news_spider.pipelines.CsvWriterPipeline': 900,
+    'crawler.spiders.news_spider.pipelines.SqlitePipeline': 950,
+    # 在所有存储Pipeline之后记录URL，写完之后才写入指纹库
+    'crawler.spiders.news_spider.pipelines.PersistentDuplicatesPipeline': 1000,
 }
 
+# 去重Pipeline是否使用布隆过滤器（内存固定，存在少量误判），以及预计URL数量
+URLS_SEEN_BLOOM = False
+URLS_SEEN_CAPACITY = 1024
+
+# 跨运行去重：已解析过的新闻URL保存在指纹库中，之后的运行不再请求这些URL（列表页不受影响）
+DUPEFILTER_CLASS = 'crawler.spiders.news_spider.dupefilters.PersistentDupeFilter'
+
+# 指纹库路径，默认为DATA_DIR下的fingerprints.db；是否使用布隆过滤器预先检查及预计URL数量
+FINGERPRINT_DB_PATH = None
+FINGERPRINT_BLOOM = True
+FINGERPRINT_CAPACITY = 1000000
+
+# 多个进程协作爬取同一个共享待爬取队列（SQLite）时启用该调度器，各进程使用相同的FRONTIER_DB_PATH和FRONTIER_QUEUE
+# SCHEDULER = 'crawler.spiders.news_spider.scheduler.SharedFrontierScheduler'
+
+# 共享待爬取队列路径，默认为DATA_DIR下的frontier.db；队列名称，默认为爬虫名称
+# 已完成的请求保留在队列中，不会再次爬取；重新完整爬取时使用新的队列名称
+FRONTIER_DB_PATH = None
+FRONTIER_QUEUE = None
+
+# 领取后多少秒未确认视为失败并放回队列，同一请求最多领取次数，同一主机同时被领取的请求上限（0为不限制）
+FRONTIER_VISIBILITY_TIMEOUT = 300
+FRONTIER_MAX_ATTEMPTS = 3
+FRONTIER_HOST_LIMIT = 0
+
 # 数据存储目录
 DATA_DIR = 'crawler/data'
 
+# 文件写入Pipeline的后台写入队列大小，队列满时处理Item会等待写入
+WRITER_QUEUE_SIZE = 10000
+
+# 后台线程每批写入的Item数量，以及刷新文件缓冲区的间隔（秒）
+WRITER_BATCH_SIZE = 500
+WRITER_FLUSH_INTERVAL = 1.0
+
+# JSON文件格式：'json'为JSON数组（关闭时写入数组结尾），'jsonl'为每行一条（中断时已写入的行仍可读取）
+JSON_WRITER_FORMAT = 'json'
+
+# SQLite数据库路径，默认为DATA_DIR下的news.db；每多少条或每多少秒批量写入一次
+SQLITE_DB_PATH = None
+SQLITE_BATCH_SIZE = 500
+SQLITE_FLUSH_INTERVAL = 1.0
+
 # 日志级别
 LOG_LEVEL = 'INFO'
 
@@ -10,8 +10,10 @@ from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 
 from crawler.spiders.news_spider.items import NewsItem
+from crawler.spiders.news_spider.incremental import IncrementalMixin
+from crawler.utils.metrics import timed, parse_time
 
-class NewsSpider(CrawlSpider):
+class NewsSpider(IncrementalMixin, CrawlSpider):
     """新闻爬虫"""
     
     name = 'news'
@@ -40,6 +42,7 @@ class NewsSpider(CrawlSpider):
         if start_url:
             self.start_urls = [start_url]
     
+    @timed(parse_time, callback='parse_news')
     def parse_news(self, response):
         """
         解析新闻页面
@@ -92,7 +95,7 @@ class NewsSpider(CrawlSpider):
         
         return item
 
-class SinaNewsSpider(CrawlSpider):
+class SinaNewsSpider(IncrementalMixin, CrawlSpider):
     """新浪新闻爬虫示例"""
     
     name = 'sina_news'
@@ -108,6 +111,7 @@ class SinaNewsSpider(CrawlSpider):
         Rule(LinkExtractor(restrict_css='#blk_nav_1, .nav')),
     )
     
+    @timed(parse_time, callback='parse_sina_news')
     def parse_sina_news(self, response):
         """
         解析新浪新闻页面
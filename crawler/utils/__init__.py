@@ -1,18 +1,68 @@
 """
 爬虫工具模块
 """
-from .user_agents import get_random_user_agent, get_specific_user_agent
+from .user_agents import (
+    get_random_user_agent, get_specific_user_agent, get_user_agent_for_host, UserAgentPool, user_agent_pool
+)
 from .logger import crawler_logger, setup_logger
 from .http import HttpClient, http_client
-from .storage import DataStorage, data_storage
+from .http_cache import HttpCache
+from .retry import RetryPolicy, RetryBudget, CircuitBreaker, CircuitOpenError
+from .storage import DataStorage, data_storage, JsonSink, CsvSink, JsonlWriter, ParquetSink, ShardedWriter
+from .sqlite_storage import SqliteStorage
+from .background_writer import BackgroundWriter
+from .url import canonicalize_url, url_fingerprint, shard_for
+from .fingerprint import BloomFilter, FingerprintSet
+from .fingerprint_store import FingerprintStore
+from .frontier import CrawlFrontier
+from .extract import extract_page
+from .crawl_state import SqliteCrawlState
+from .shared_frontier import SharedFrontier, SharedFrontierAdapter
+from .scheduler import TokenBucket, PolitenessScheduler
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry, MetricsExporter, metrics, timed
 
 __all__ = [
     'get_random_user_agent',
     'get_specific_user_agent',
+    'get_user_agent_for_host',
+    'UserAgentPool',
+    'user_agent_pool',
     'crawler_logger',
     'setup_logger',
     'HttpClient',
     'http_client',
+    'HttpCache',
+    'RetryPolicy',
+    'RetryBudget',
+    'CircuitBreaker',
+    'CircuitOpenError',
     'DataStorage',
     'data_storage',
+    'JsonSink',
+    'CsvSink',
+    'JsonlWriter',
+    'ParquetSink',
+    'ShardedWriter',
+    'SqliteStorage',
+    'BackgroundWriter',
+    'canonicalize_url',
+    'url_fingerprint',
+    'shard_for',
+    'BloomFilter',
+    'FingerprintSet',
+    'FingerprintStore',
+    'CrawlFrontier',
+    'extract_page',
+    'SqliteCrawlState',
+    'SharedFrontier',
+    'SharedFrontierAdapter',
+    'TokenBucket',
+    'PolitenessScheduler',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsRegistry',
+    'MetricsExporter',
+    'metrics',
+    'timed',
 ] 
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+HTML归档工具模块，保存抓取到的原始响应内容，修改解析逻辑后可以直接重新解析，不需要重新爬取
+
+响应内容按SHA-256去重，每个内容压缩为一个gzip成员追加到分段文件（segment-00000.gz等）中，
+分段文件可以直接用zcat等工具解压；SQLite索引记录每次抓取的URL、时间和内容所在的分段与偏移量。
+"""
+import os
+import gzip
+import hashlib
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from .logger import crawler_logger as logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    fetch_time TEXT NOT NULL,
+    status INTEGER,
+    content_type TEXT,
+    encoding TEXT,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_captures_url_time ON captures (url, fetch_time);
+CREATE INDEX IF NOT EXISTS idx_captures_fetch_time ON captures (fetch_time);
+"""
+
+class ArchivedPage(namedtuple('ArchivedPage', [
+    'url', 'fetch_time', 'status', 'content_type', 'encoding', 'body'
+])):
+    """归档的页面"""
+
+    __slots__ = ()
+
+    @property
+    def text(self):
+        """按保存时的编码解码后的页面内容"""
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+class HtmlArchive:
+    """
+    原始HTML归档
+
+    同一内容只保存一次（多个URL或多次抓取得到相同内容时只增加索引记录），
+    当前分段文件超过segment_size后写入新的分段。索引每commit_every次写入提交一次，
+    进程中断时未提交的内容会留在分段文件中但不会被引用，不影响已有数据。
+
+    多个进程（如分片运行的各分片）可以同时写入同一个归档目录：每个实例第一次写入时独占创建一个新的分段文件，
+    只写入自己创建的分段；索引记录先缓存在内存中，提交时在一个短事务中写入。
+    """
+
+    def __init__(self, archive_dir="crawler/data/archive", segment_size=256 * 1024 * 1024, commit_every=100,
+                 compresslevel=6):
+        """
+        初始化HTML归档
+
+        Args:
+            archive_dir (str, optional): 归档目录，默认为'crawler/data/archive'
+            segment_size (int, optional): 单个分段文件的大小上限（字节），默认为256MB
+            commit_every (int, optional): 每多少次写入提交一次索引，默认为100
+            compresslevel (int, optional): gzip压缩级别，默认为6
+        """
+        self.archive_dir = archive_dir
+        self.segment_size = segment_size
+        self.commit_every = commit_every
+        self.compresslevel = compresslevel
+        self._pending = 0
+        self._bodies = {}
+        self._captures = []
+        self._lock = threading.Lock()
+
+        os.makedirs(archive_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(archive_dir, "index.db"), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        # 第一次写入时才创建分段文件，只读取归档时不会产生空的分段
+        self.segment = None
+        self._file = None
+
+    def _segment_path(self, segment):
+        """分段文件路径"""
+        return os.path.join(self.archive_dir, f"segment-{segment:05d}.gz")
+
+    def _new_segment(self):
+        """独占创建一个新的分段文件（其他进程已创建的分段不会被写入），调用方需持有锁"""
+        if self._file is not None:
+            self._file.close()
+        segment = 0 if self.segment is None else self.segment + 1
+        while os.path.exists(self._segment_path(segment)):
+            segment += 1
+        while True:
+            try:
+                fd = os.open(self._segment_path(segment), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except FileExistsError:
+                segment += 1
+        self.segment = segment
+        self._file = os.fdopen(fd, 'ab')
+
+    def store(self, url, body, status=200, content_type=None, encoding=None, fetch_time=None):
+        """
+        保存一次抓取的响应内容
+
+        Args:
+            url (str): 页面URL
+            body (bytes/str): 响应内容，为str时按encoding（默认为utf-8）编码
+            status (int, optional): 状态码，默认为200
+            content_type (str, optional): Content-Type，默认为None
+            encoding (str, optional): 响应编码，默认为None
+            fetch_time (str, optional): 抓取时间，格式为'YYYY-MM-DD HH:MM:SS'，默认为当前时间
+
+        Returns:
+            str: 内容的SHA-256十六进制摘要
+        """
+        if isinstance(body, str):
+            encoding = encoding or 'utf-8'
+            body = body.encode(encoding, errors='replace')
+        digest = hashlib.sha256(body).hexdigest()
+        fetch_time = fetch_time or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock:
+            exists = digest in self._bodies or self.conn.execute(
+                "SELECT 1 FROM bodies WHERE hash = ?", (digest,)
+            ).fetchone() is not None
+            if not exists:
+                data = gzip.compress(body, compresslevel=self.compresslevel)
+                if self._file is None or (self._file.tell() > 0
+                                          and self._file.tell() + len(data) > self.segment_size):
+                    self._new_segment()
+                offset = self._file.tell()
+                self._file.write(data)
+                self._bodies[digest] = (digest, self.segment, offset, len(data), len(body))
+            self._captures.append((url, fetch_time, status, content_type, encoding, digest))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+        return digest
+
+    def _commit(self):
+        """先将分段文件写入磁盘，再在一个事务中写入缓存的索引记录（调用方需持有锁）"""
+        if not self._captures:
+            return
+        if self._file is not None:
+            self._file.flush()
+        with self.conn:
+            # 其他进程可能同时保存了相同的内容，保留先写入的记录
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO bodies (hash, segment, offset, length, size) VALUES (?, ?, ?, ?, ?)",
+                self._bodies.values()
+            )
+            self.conn.executemany(
+                "INSERT INTO captures (url, fetch_time, status, content_type, encoding, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._captures
+            )
+        self._bodies = {}
+        self._captures = []
+        self._pending = 0
+
+    def commit(self):
+        """提交索引"""
+        with self._lock:
+            self._commit()
+
+    def write(self, record):
+        """
+        保存一次抓取，供BackgroundWriter在后台线程中调用
+
+        Args:
+            record (dict): store()的参数（url、body、status、content_type、encoding、fetch_time）
+        """
+        self.store(**record)
+
+    def flush(self):
+        """提交索引，供BackgroundWriter定期调用"""
+        self.commit()
+
+    def _read_body(self, segment, offset, length, files=None):
+        """从分段文件中读取并解压内容"""
+        if segment == self.segment:
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+        if files is not None:
+            f = files.get(segment)
+            if f is None:
+                f = files[segment] = open(self._segment_path(segment), 'rb')
+            f.seek(offset)
+            return gzip.decompress(f.read(length))
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return gzip.decompress(f.read(length))
+
+    def get(self, url, before=None):
+        """
+        获取URL最近一次抓取的页面
+
+        Args:
+            url (str): 页面URL
+            before (str, optional): 只查找此时间（含）之前的抓取，默认为None（最近一次）
+
+        Returns:
+            ArchivedPage: 归档的页面，不存在时返回None
+        """
+        sql = ("SELECT c.url, c.fetch_time, c.status, c.content_type, c.encoding, b.segment, b.offset, b.length "
+               "FROM captures c JOIN bodies b ON b.hash = c.hash WHERE c.url = ?")
+        params = [url]
+        if before is not None:
+            sql += " AND c.fetch_time <= ?"
+            params.append(before)
+        sql += " ORDER BY c.fetch_time DESC, c.id DESC LIMIT 1"
+        with self._lock:
+            self._commit()
+            row = self.conn.execute(sql, params).fetchone()
+        if row is None:
+            return None
+        return ArchivedPage(*row[:5], self._read_body(*row[5:]))
+
+    def iter_pages(self, url_prefix=None, since=None, latest_only=True):
+        """
+        逐个读取归档的页面（按分段和偏移量顺序读取，磁盘顺序访问）
+
+        Args:
+            url_prefix (str, optional): 只读取以此开头的URL，默认为None（全部）
+            since (str, optional): 只读取此时间（含）之后的抓取，默认为None
+            latest_only (bool, optional): 每个URL是否只读取最近一次抓取，默认为True
+
+        Yields:
+            ArchivedPage: 归档的页面
+        """
+        where, params = [], []
+        if url_prefix:
+            where.append("substr(url, 1, ?) = ?")
+            params.extend([len(url_prefix), url_prefix])
+        if since:
+            where.append("fetch_time >= ?")
+            params.append(since)
+        condition = f"WHERE {' AND '.join(where)}" if where else ""
+        if latest_only:
+            ids = f"SELECT MAX(id) FROM captures {condition} GROUP BY url"
+        else:
+            ids = f"SELECT id FROM captures {condition}"
+        sql = ("SELECT c.url, c.fetch_time, c.status, c.content_type, c.encoding, b.segment, b.offset, b.length "
+               f"FROM captures c JOIN bodies b ON b.hash = c.hash WHERE c.id IN ({ids}) "
+               "ORDER BY b.segment, b.offset")
+        with self._lock:
+            self._commit()
+            rows = self.conn.execute(sql, params).fetchall()
+
+        files = {}
+        try:
+            for row in rows:
+                yield ArchivedPage(*row[:5], self._read_body(*row[5:], files=files))
+        finally:
+            for f in files.values():
+                f.close()
+
+    def stats(self):
+        """
+        获取归档统计信息
+
+        Returns:
+            dict: 抓取次数、URL数、不同内容数、原始大小和压缩后大小（字节）
+        """
+        with self._lock:
+            self._commit()
+            captures, urls = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM captures").fetchone()
+            bodies, size, length = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM bodies"
+            ).fetchone()
+        return {'captures': captures, 'urls': urls, 'bodies': bodies, 'size': size, 'compressed_size': length}
+
+    def close(self):
+        """提交索引并关闭归档"""
+        with self._lock:
+            if self.conn is None:
+                return
+            self._commit()
+            if self._file is not None:
+                self._file.close()
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+if __name__ == "__main__":
+    # 测试
+    with HtmlArchive("crawler/data/test_archive") as archive:
+        html = "<html><head><title>测试</title></head><body><p>内容</p></body></html>"
+        archive.store("https://example.com/a", html)
+        archive.store("https://example.com/b", html)  # 内容相同，只增加索引记录
+        print(archive.get("https://example.com/a").text)
+        print([page.url for page in archive.iter_pages()])
+        print(archive.stats())
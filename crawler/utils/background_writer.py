@@ -0,0 +1,181 @@
+"""
+后台写入工具模块，在单独的线程中将记录写入存储，爬取线程只需把记录放入队列
+"""
+import time
+import queue
+import threading
+
+from .logger import crawler_logger as logger
+
+# 队列中表示关闭的消息（flush使用threading.Event作为消息）
+_CLOSE = object()
+
+class BackgroundWriter:
+    """
+    后台写入器
+
+    包装任意具有write(record)和close()方法的写入器（JsonSink、CsvSink、JsonlWriter、ParquetSink、
+    SqliteStorage、ShardedWriter、HtmlArchive等）。write()只把记录放入有界队列，由后台线程按批取出写入；
+    队列满时write()阻塞等待（背压），避免写入跟不上时内存无限增长。
+    后台线程中的写入错误会在下一次调用write()、flush()或close()时抛出。
+    """
+
+    def __init__(self, sink, max_queue=10000, batch_size=500, flush_interval=1.0, put_timeout=None):
+        """
+        初始化后台写入器并启动写入线程
+
+        Args:
+            sink: 实际的写入器
+            max_queue (int, optional): 队列中最多等待写入的记录数，默认为10000
+            batch_size (int, optional): 后台线程每批最多写入的记录数，默认为500
+            flush_interval (float, optional): 距上次刷新超过多少秒时调用sink.flush()（如果有），默认为1秒
+            put_timeout (float, optional): 队列满时write()最多等待的秒数，超时抛出queue.Full，
+                默认为None（一直等待）
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.count = 0
+        self.error = None
+        self.closed = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+
+    def _flush_sink(self, durable=False):
+        """
+        调用写入器的flush()（如果有）
+
+        Args:
+            durable (bool, optional): 是否改为调用写入器的fsync()（如果有），同步到磁盘，默认为False
+        """
+        flush = getattr(self.sink, 'fsync', None) if durable else None
+        if flush is None:
+            flush = getattr(self.sink, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def _run(self):
+        """后台线程：按批取出记录写入，处理flush和close消息"""
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            batch = []
+            control = None
+            while item is not None:
+                if item is _CLOSE or isinstance(item, threading.Event):
+                    control = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch and self.error is None:
+                try:
+                    for record in batch:
+                        self.sink.write(record)
+                except Exception as e:
+                    # 出错后丢弃之后的记录，错误在调用方线程中抛出
+                    self.error = e
+                    logger.error(f"后台写入失败: {str(e)}")
+
+            if control is not None or time.monotonic() - last_flush >= self.flush_interval:
+                if self.error is None:
+                    try:
+                        self._flush_sink(durable=isinstance(control, threading.Event))
+                    except Exception as e:
+                        self.error = e
+                        logger.error(f"后台写入失败: {str(e)}")
+                last_flush = time.monotonic()
+
+            if isinstance(control, threading.Event):
+                control.set()
+            elif control is _CLOSE:
+                return
+
+    def _raise_error(self):
+        """如果后台线程出过错，在调用方线程中抛出"""
+        if self.error is not None:
+            raise self.error
+
+    def write(self, record):
+        """
+        将一条记录放入写入队列，队列满时阻塞
+
+        Args:
+            record (dict): 记录
+
+        Raises:
+            queue.Full: 设置了put_timeout且等待超时
+        """
+        self._raise_error()
+        if self.closed:
+            raise ValueError("后台写入器已关闭")
+        self._queue.put(record, timeout=self.put_timeout)
+        self.count += 1
+
+    def flush(self, timeout=None):
+        """
+        等待此前放入队列的记录全部交给写入器，并同步到磁盘
+
+        写入器有fsync()时调用fsync()（JsonSink、CsvSink、JsonlWriter），返回True时这些记录已经写入磁盘；
+        否则调用flush()（如果有），是否落盘由写入器决定：SqliteStorage和HtmlArchive提交事务，
+        ParquetSink和ShardedWriter在close()之前不保证数据完整。后台线程定期的刷新只调用flush()。
+
+        Args:
+            timeout (float, optional): 最多等待的秒数，默认为None（一直等待）
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        self._raise_error()
+        if self.closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        finished = done.wait(timeout)
+        self._raise_error()
+        return finished
+
+    def close(self):
+        """
+        写完队列中的所有记录，停止后台线程并关闭写入器
+
+        Returns:
+            写入器close()的返回值（通常为文件路径）
+        """
+        if not self.closed:
+            self.closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        result = self.sink.close()
+        self._raise_error()
+        return result
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+if __name__ == "__main__":
+    # 测试
+    from crawler.utils.storage import JsonlWriter
+
+    with BackgroundWriter(JsonlWriter("crawler/data/test_background.jsonl"), max_queue=100) as writer:
+        start = time.time()
+        for i in range(10000):
+            writer.write({"id": i, "name": f"测试{i}"})
+        writer.flush()
+        print(f"写入 {writer.count} 条记录，耗时 {time.time() - start:.3f} 秒")
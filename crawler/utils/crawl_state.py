@@ -0,0 +1,324 @@
+"""
+爬取状态持久化工具模块，使用SQLite保存待爬取队列、已访问URL和爬取结果，支持中断后恢复
+
+已入队和已访问的URL以规范化URL的64位指纹保存。
+"""
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+from .url import url_fingerprint
+from .logger import crawler_logger as logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    base_url TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_job_seq ON frontier (job_id, seq);
+CREATE TABLE IF NOT EXISTS seen (
+    job_id TEXT NOT NULL,
+    fp INTEGER NOT NULL,
+    PRIMARY KEY (job_id, fp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS visited (
+    job_id TEXT NOT NULL,
+    fp INTEGER NOT NULL,
+    PRIMARY KEY (job_id, fp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_job_seq ON records (job_id, seq);
+"""
+
+def _fp(url):
+    """计算URL指纹，转换为SQLite INTEGER可保存的有符号64位整数"""
+    fp = url_fingerprint(url)
+    return fp - (1 << 64) if fp >= (1 << 63) else fp
+
+class SqliteFrontier:
+    """基于SQLite的待爬取队列，接口与CrawlFrontier相同"""
+
+    def __init__(self, state, max_depth=None, max_size=None):
+        """
+        初始化待爬取队列
+
+        Args:
+            state (SqliteCrawlState): 所属的爬取状态
+            max_depth (int, optional): 最大爬取深度，默认为None（不限制）
+            max_size (int, optional): 队列最大长度，默认为None（不限制）
+        """
+        self.state = state
+        self.max_depth = max_depth
+        self.max_size = max_size
+        # 已取出但尚未处理完成的URL，处理完成后才从数据库中删除，进程中断后会重新取出
+        self._leased = {}
+        self._cursor = 0
+        self._size = state.conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE job_id = ?", (state.job_id,)
+        ).fetchone()[0]
+
+    def push(self, url, depth=0):
+        """
+        将URL加入队列
+
+        Args:
+            url (str): 要加入的URL
+            depth (int, optional): URL的爬取深度，默认为0
+
+        Returns:
+            bool: 是否成功入队
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if self.max_size is not None and len(self) >= self.max_size:
+            return False
+
+        cur = self.state.conn.execute(
+            "INSERT OR IGNORE INTO seen (job_id, fp) VALUES (?, ?)", (self.state.job_id, _fp(url))
+        )
+        if cur.rowcount == 0:
+            return False
+
+        self.state.conn.execute(
+            "INSERT INTO frontier (job_id, url, depth) VALUES (?, ?, ?)", (self.state.job_id, url, depth)
+        )
+        self._size += 1
+        self.state.changed()
+        return True
+
+    def pop(self):
+        """
+        取出下一个待爬取URL
+
+        Returns:
+            tuple: (URL, 爬取深度)
+
+        Raises:
+            IndexError: 队列为空
+        """
+        row = self.state.conn.execute(
+            "SELECT seq, url, depth FROM frontier WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT 1",
+            (self.state.job_id, self._cursor)
+        ).fetchone()
+        if row is None:
+            raise IndexError("pop from an empty frontier")
+
+        seq, url, depth = row
+        self._cursor = seq
+        self._leased[url] = seq
+        return url, depth
+
+    def done(self, url):
+        """
+        标记URL已处理完成，从队列中删除
+
+        Args:
+            url (str): 已处理完成的URL
+        """
+        seq = self._leased.pop(url, None)
+        if seq is None:
+            return
+        self.state.conn.execute("DELETE FROM frontier WHERE seq = ?", (seq,))
+        self._size -= 1
+        self.state.changed()
+        # 页面处理完成是一致的状态点，在此处批量提交
+        self.state.checkpoint()
+
+    def seen(self, url):
+        """
+        判断URL是否曾经入队
+
+        Args:
+            url (str): URL
+
+        Returns:
+            bool: 是否曾经入队
+        """
+        return self.state.conn.execute(
+            "SELECT 1 FROM seen WHERE job_id = ? AND fp = ?", (self.state.job_id, _fp(url))
+        ).fetchone() is not None
+
+    def __len__(self):
+        """队列中待爬取URL的数量（不含已取出的URL）"""
+        return self._size - len(self._leased)
+
+    def __bool__(self):
+        """队列是否非空"""
+        return len(self) > 0
+
+class SqliteUrlSet:
+    """基于SQLite的URL集合，保存规范化URL的指纹，支持in、add和len操作"""
+
+    def __init__(self, state, table):
+        """
+        初始化URL集合
+
+        Args:
+            state (SqliteCrawlState): 所属的爬取状态
+            table (str): 表名
+        """
+        self.state = state
+        self.table = table
+        self._size = state.conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE job_id = ?", (state.job_id,)
+        ).fetchone()[0]
+
+    def add(self, url):
+        """
+        添加URL
+
+        Args:
+            url (str): URL
+        """
+        cur = self.state.conn.execute(
+            f"INSERT OR IGNORE INTO {self.table} (job_id, fp) VALUES (?, ?)", (self.state.job_id, _fp(url))
+        )
+        if cur.rowcount:
+            self._size += 1
+            self.state.changed()
+
+    def __contains__(self, url):
+        """判断URL是否在集合中"""
+        return self.state.conn.execute(
+            f"SELECT 1 FROM {self.table} WHERE job_id = ? AND fp = ?", (self.state.job_id, _fp(url))
+        ).fetchone() is not None
+
+    def __len__(self):
+        """集合中URL的数量"""
+        return self._size
+
+class SqliteCrawlState:
+    """
+    基于SQLite（WAL模式）的可恢复爬取状态
+
+    同一个数据库文件可保存多个任务，以job_id区分。所有修改在事务中进行，
+    在页面处理完成（frontier.done）时，累计修改达到commit_every次则提交一次，
+    进程中断后从最近一次提交的状态恢复，未提交的页面会被重新爬取。
+    """
+
+    def __init__(self, job_id, base_url=None, db_path="crawler/data/crawl_state.db",
+                 commit_every=100, max_depth=None, max_frontier_size=None):
+        """
+        初始化爬取状态
+
+        Args:
+            job_id (str): 任务ID
+            base_url (str, optional): 起始URL，仅用于记录，默认为None
+            db_path (str, optional): 数据库文件路径，默认为'crawler/data/crawl_state.db'
+            commit_every (int, optional): 每多少次修改提交一次事务，默认为100
+            max_depth (int, optional): 最大爬取深度，默认为None（不限制）
+            max_frontier_size (int, optional): 待爬取队列的最大长度，默认为None（不限制）
+        """
+        self.job_id = job_id
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._pending = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None时由本类自行管理事务
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, base_url, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (job_id, base_url, now, now)
+        )
+        self.resumed = cur.rowcount == 0
+
+        self.conn.execute("BEGIN")
+        self.frontier = SqliteFrontier(self, max_depth=max_depth, max_size=max_frontier_size)
+        self.visited = SqliteUrlSet(self, "visited")
+
+        if self.resumed:
+            logger.info(f"恢复爬取任务: {job_id} (已访问 {len(self.visited)} 个页面，待爬取 {len(self.frontier)} 个URL)")
+        else:
+            logger.info(f"创建爬取任务: {job_id}，状态保存在: {db_path}")
+
+    def changed(self):
+        """记录一次修改"""
+        self._pending += 1
+
+    def checkpoint(self):
+        """修改次数达到批量大小时提交事务"""
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """提交当前事务并开启新事务"""
+        self.conn.execute(
+            "UPDATE jobs SET updated_at = ? WHERE job_id = ?",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.job_id)
+        )
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+        self._pending = 0
+
+    def add_record(self, record):
+        """
+        保存一条爬取记录
+
+        Args:
+            record (dict): 爬取记录
+        """
+        self.conn.execute(
+            "INSERT INTO records (job_id, data) VALUES (?, ?)",
+            (self.job_id, json.dumps(record, ensure_ascii=False))
+        )
+        self.changed()
+
+    def iter_records(self):
+        """
+        按保存顺序逐条读取爬取记录
+
+        Yields:
+            dict: 爬取记录
+        """
+        cur = self.conn.cursor()
+        cur.execute("SELECT data FROM records WHERE job_id = ? ORDER BY seq", (self.job_id,))
+        for (data,) in cur:
+            yield json.loads(data)
+
+    def record_count(self):
+        """
+        获取已保存的记录数量
+
+        Returns:
+            int: 记录数量
+        """
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM records WHERE job_id = ?", (self.job_id,)
+        ).fetchone()[0]
+
+    def close(self):
+        """提交未提交的修改并关闭数据库"""
+        if self.conn is not None:
+            self.conn.execute("COMMIT")
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
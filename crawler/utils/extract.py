@@ -0,0 +1,109 @@
+"""
+页面提取工具模块，基于lxml的解析事件一次遍历提取页面标题、段落文本和链接
+"""
+from urllib.parse import urljoin
+
+from lxml import etree
+
+# 这些元素中的文本不计入段落内容（与BeautifulSoup的.text行为一致）
+_SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+class _PageTarget:
+    """lxml解析器的target，在解析过程中直接收集标题、段落和链接，不构建文档树"""
+
+    def __init__(self):
+        self.title = None
+        self.paragraphs = []
+        self.hrefs = []
+        self.base_href = None
+        self._title_parts = None
+        self._p_depth = 0
+        self._p_parts = None
+        self._skip_depth = 0
+
+    def start(self, tag, attrib):
+        if tag == 'p':
+            self._p_depth += 1
+            if self._p_depth == 1:
+                self._p_parts = []
+        elif tag == 'a':
+            href = attrib.get('href')
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == 'title':
+            if self.title is None and self._title_parts is None:
+                self._title_parts = []
+        elif tag == 'base':
+            if self.base_href is None and attrib.get('href') is not None:
+                self.base_href = attrib['href']
+        elif tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag):
+        if tag == 'p':
+            if self._p_depth:
+                self._p_depth -= 1
+                if self._p_depth == 0:
+                    self.paragraphs.append(''.join(self._p_parts).strip())
+                    self._p_parts = None
+        elif tag == 'title':
+            if self._title_parts is not None and self.title is None:
+                self.title = ''.join(self._title_parts)
+                self._title_parts = None
+        elif tag in _SKIP_TEXT_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+
+    def data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._p_parts is not None and not self._skip_depth:
+            self._p_parts.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        # 文档未闭合的元素按结束处理
+        if self._title_parts is not None and self.title is None:
+            self.title = ''.join(self._title_parts)
+        if self._p_parts is not None:
+            self.paragraphs.append(''.join(self._p_parts).strip())
+        return self
+
+def extract_page(html, url):
+    """
+    一次遍历提取页面标题、段落文本和链接
+
+    结果与使用BeautifulSoup获取soup.title、所有<p>的文本和所有<a href>的结果相同，
+    链接按页面中的<base href>（如果有）解析为绝对URL。
+
+    Args:
+        html (str/bytes): 页面HTML
+        url (str): 页面URL
+
+    Returns:
+        tuple: (页面标题, 页面内容, 页面链接列表)，没有<title>时标题为'无标题'
+    """
+    target = _PageTarget()
+    if html:
+        parser = etree.HTMLParser(target=target)
+        parser.feed(html)
+        parser.close()
+
+    title = target.title.strip() if target.title is not None else "无标题"
+    content = "\n".join(target.paragraphs)
+
+    base_url = urljoin(url, target.base_href) if target.base_href else url
+    links = [urljoin(base_url, href) for href in target.hrefs]
+
+    return title, content, links
+
+if __name__ == "__main__":
+    # 测试
+    html = """
+    <html><head><title> 测试页面 </title><base href="/docs/"></head>
+    <body><p>第一段<b>加粗</b></p><p>第二段<script>var x;</script></p>
+    <a href="a.html">A</a><a href="https://example.org/b">B</a></body></html>
+    """
+    print(extract_page(html, "https://example.com/index.html"))
@@ -0,0 +1,193 @@
+"""
+URL指纹集合工具模块，以64位指纹代替完整URL字符串进行去重，节省内存
+"""
+import math
+from array import array
+
+from .url import url_fingerprint
+
+class BloomFilter:
+    """布隆过滤器，内存固定，存在一定的误判率（可能把未见过的URL判断为已存在）"""
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity (int, optional): 预计元素数量，默认为100万
+            error_rate (float, optional): 达到预计数量时的误判率，默认为0.001
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        """使用双重哈希从64位指纹生成num_hashes个位置"""
+        h1 = fingerprint & 0xFFFFFFFF
+        h2 = (fingerprint >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, fingerprint):
+        """
+        添加指纹
+
+        Args:
+            fingerprint (int): 64位指纹
+
+        Returns:
+            bool: 是否为新元素（原先不存在）
+        """
+        added = False
+        for pos in self._positions(fingerprint):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, fingerprint):
+        """判断指纹是否可能存在"""
+        for pos in self._positions(fingerprint):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        """已添加的元素数量（近似值）"""
+        return self.count
+
+class FingerprintSet:
+    """
+    URL指纹集合
+
+    默认使用基于array('Q')的开放寻址哈希表保存64位指纹，每个URL只占十几到二十几字节，
+    没有误判；bloom=True时使用布隆过滤器，内存固定但存在误判，适合超大规模爬取。
+    add()和in操作接受URL字符串，URL会先规范化再计算指纹。
+    """
+
+    # 哈希表中表示空槽位的值，指纹为0时替换为1
+    _EMPTY = 0
+
+    def __init__(self, bloom=False, capacity=1024, error_rate=0.001):
+        """
+        初始化指纹集合
+
+        Args:
+            bloom (bool, optional): 是否使用布隆过滤器，默认为False
+            capacity (int, optional): 初始容量（布隆过滤器为预计元素数量），默认为1024
+            error_rate (float, optional): 布隆过滤器的误判率，默认为0.001
+        """
+        self.bloom = BloomFilter(capacity, error_rate) if bloom else None
+        size = 8
+        while size < capacity * 2:
+            size *= 2
+        self._table = None if bloom else array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    @staticmethod
+    def fingerprint(url):
+        """
+        计算URL的指纹
+
+        Args:
+            url (str): URL
+
+        Returns:
+            int: 64位指纹（非0）
+        """
+        return url_fingerprint(url) or 1
+
+    def _find(self, fingerprint):
+        """查找指纹所在槽位，不存在时返回应插入的空槽位"""
+        table = self._table
+        mask = self._mask
+        i = fingerprint & mask
+        while True:
+            value = table[i]
+            if value == fingerprint or value == self._EMPTY:
+                return i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        """哈希表扩容为原来的两倍"""
+        old = self._table
+        self._table = array('Q', bytes(8 * len(old) * 2))
+        self._mask = len(self._table) - 1
+        for value in old:
+            if value != self._EMPTY:
+                self._table[self._find(value)] = value
+
+    def add_fingerprint(self, fingerprint):
+        """
+        添加指纹
+
+        Args:
+            fingerprint (int): 64位指纹（非0）
+
+        Returns:
+            bool: 是否为新元素
+        """
+        if self.bloom is not None:
+            added = self.bloom.add(fingerprint)
+            self._count = len(self.bloom)
+            return added
+
+        i = self._find(fingerprint)
+        if self._table[i] == fingerprint:
+            return False
+        self._table[i] = fingerprint
+        self._count += 1
+        # 装载因子超过0.6时扩容，保证线性探测的查找效率
+        if self._count * 5 > len(self._table) * 3:
+            self._grow()
+        return True
+
+    def contains_fingerprint(self, fingerprint):
+        """
+        判断指纹是否存在
+
+        Args:
+            fingerprint (int): 64位指纹（非0）
+
+        Returns:
+            bool: 是否存在
+        """
+        if self.bloom is not None:
+            return fingerprint in self.bloom
+        return self._table[self._find(fingerprint)] == fingerprint
+
+    def add(self, url):
+        """
+        添加URL
+
+        Args:
+            url (str): URL
+
+        Returns:
+            bool: 是否为新URL
+        """
+        return self.add_fingerprint(self.fingerprint(url))
+
+    def __contains__(self, url):
+        """判断URL是否已存在"""
+        return self.contains_fingerprint(self.fingerprint(url))
+
+    def __len__(self):
+        """集合中的元素数量"""
+        return self._count
+
+if __name__ == "__main__":
+    # 测试
+    seen = FingerprintSet()
+    print(seen.add("https://example.com/a?x=1&y=2"))  # True
+    print(seen.add("https://example.com/a/?y=2&x=1#top"))  # False，规范化后相同
+    print("https://EXAMPLE.com:443/a?x=1&y=2" in seen)  # True
+    print(len(seen))  # 1
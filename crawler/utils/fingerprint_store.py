@@ -0,0 +1,162 @@
+"""
+持久化URL指纹工具模块，将URL的64位指纹保存到SQLite中，多次运行之间共享，已爬取的URL不再重复爬取
+"""
+import os
+import time
+import sqlite3
+import threading
+
+from .url import url_fingerprint
+from .fingerprint import BloomFilter
+from .logger import crawler_logger as logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fp INTEGER PRIMARY KEY,
+    url TEXT,
+    added_at REAL NOT NULL
+);
+"""
+
+def _signed(fp):
+    """将64位指纹转换为SQLite INTEGER可保存的有符号64位整数"""
+    return fp - (1 << 64) if fp >= (1 << 63) else fp
+
+class FingerprintStore:
+    """
+    基于SQLite的持久化URL指纹集合
+
+    URL先规范化再计算指纹，与FingerprintSet一致。add()的指纹先放在缓冲区中，每batch_size条批量写入
+    （batch_size为None时只在flush()或close()时写入）。
+    bloom=True时打开数据库后将已有指纹载入布隆过滤器，查询时先检查布隆过滤器，
+    大部分新URL不需要访问数据库；布隆过滤器判断可能存在时再查询数据库确认，因此不会误判。
+    """
+
+    def __init__(self, db_path="crawler/data/fingerprints.db", bloom=True, capacity=1000000, error_rate=0.001,
+                 batch_size=500):
+        """
+        初始化持久化指纹集合
+
+        Args:
+            db_path (str, optional): 数据库文件路径，默认为'crawler/data/fingerprints.db'
+            bloom (bool, optional): 是否使用布隆过滤器预先检查，默认为True
+            capacity (int, optional): 布隆过滤器的预计元素数量，数据库中已有更多指纹时自动扩大，默认为100万
+            error_rate (float, optional): 布隆过滤器的误判率，默认为0.001
+            batch_size (int, optional): 每多少条指纹批量写入一次，为None时只在flush()或close()时写入，默认为500
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        self.bloom = None
+        if bloom:
+            count = self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+            self.bloom = BloomFilter(max(capacity, count * 2), error_rate)
+            for (fp,) in self.conn.execute("SELECT fp FROM fingerprints"):
+                self.bloom.add(fp & 0xFFFFFFFFFFFFFFFF)
+            logger.info(f"已载入 {count} 个URL指纹: {db_path}")
+
+    @staticmethod
+    def fingerprint(url):
+        """
+        计算URL的指纹
+
+        Args:
+            url (str): URL
+
+        Returns:
+            int: 64位指纹
+        """
+        return url_fingerprint(url)
+
+    def _contains(self, fp):
+        """判断指纹是否存在（调用方需持有锁）"""
+        if self.bloom is not None and fp not in self.bloom:
+            return False
+        if fp in self._pending:
+            return True
+        return self.conn.execute(
+            "SELECT 1 FROM fingerprints WHERE fp = ?", (_signed(fp),)
+        ).fetchone() is not None
+
+    def add(self, url):
+        """
+        添加URL
+
+        Args:
+            url (str): URL
+
+        Returns:
+            bool: 是否为新URL
+        """
+        fp = self.fingerprint(url)
+        with self._lock:
+            if self._contains(fp):
+                return False
+            self._pending[fp] = (url, time.time())
+            if self.bloom is not None:
+                self.bloom.add(fp)
+            if self.batch_size is not None and len(self._pending) >= self.batch_size:
+                self._flush()
+        return True
+
+    def _flush(self):
+        """将缓冲区中的指纹写入数据库（调用方需持有锁）"""
+        if not self._pending:
+            return
+        rows = [(_signed(fp), url, added_at) for fp, (url, added_at) in self._pending.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO fingerprints (fp, url, added_at) VALUES (?, ?, ?)", rows)
+        self._pending = {}
+
+    def flush(self):
+        """将缓冲区中的指纹写入数据库"""
+        with self._lock:
+            self._flush()
+
+    def __contains__(self, url):
+        """判断URL是否已存在"""
+        fp = self.fingerprint(url)
+        with self._lock:
+            return self._contains(fp)
+
+    def __len__(self):
+        """已保存的指纹数量（含缓冲区中的指纹）"""
+        with self._lock:
+            self._flush()
+            return self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def close(self):
+        """写入缓冲区中的指纹并关闭数据库"""
+        with self._lock:
+            if self.conn is None:
+                return
+            self._flush()
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+if __name__ == "__main__":
+    # 测试
+    with FingerprintStore("crawler/data/test_fingerprints.db") as store:
+        print(store.add("https://example.com/a?x=1&y=2"))
+        print("https://example.com/a/?y=2&x=1#top" in store)  # 规范化后相同
+        print("https://example.com/b" in store)
+        print(len(store))
@@ -0,0 +1,95 @@
+"""
+爬取队列工具模块，提供O(1)入队、出队和去重的待爬取URL队列
+"""
+from collections import deque
+
+from .fingerprint import FingerprintSet
+
+class CrawlFrontier:
+    """待爬取URL队列，使用双端队列保存URL，使用指纹集合记录已入队的URL"""
+
+    def __init__(self, max_depth=None, max_size=None, seen=None):
+        """
+        初始化待爬取队列
+
+        Args:
+            max_depth (int, optional): 最大爬取深度，超过该深度的URL不入队，默认为None（不限制）
+            max_size (int, optional): 队列最大长度，队列已满时新URL不入队，默认为None（不限制）
+            seen (FingerprintSet, optional): 记录已入队URL的集合，默认为None（创建新的FingerprintSet）
+        """
+        self.max_depth = max_depth
+        self.max_size = max_size
+        self._queue = deque()
+        self._enqueued = seen if seen is not None else FingerprintSet()
+
+    def push(self, url, depth=0):
+        """
+        将URL加入队列
+
+        Args:
+            url (str): 要加入的URL
+            depth (int, optional): URL的爬取深度，起始URL为0，默认为0
+
+        Returns:
+            bool: 是否成功入队（已入队过、超过最大深度或队列已满时返回False）
+        """
+        if url in self._enqueued:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if self.max_size is not None and len(self._queue) >= self.max_size:
+            return False
+
+        self._enqueued.add(url)
+        self._queue.append((url, depth))
+        return True
+
+    def pop(self):
+        """
+        取出队首URL
+
+        Returns:
+            tuple: (URL, 爬取深度)
+
+        Raises:
+            IndexError: 队列为空
+        """
+        return self._queue.popleft()
+
+    def done(self, url):
+        """
+        标记URL已处理完成（内存队列无需处理，持久化队列据此删除或确认URL）
+
+        Args:
+            url (str): 已处理完成的URL
+        """
+
+    def seen(self, url):
+        """
+        判断URL是否曾经入队
+
+        Args:
+            url (str): URL
+
+        Returns:
+            bool: 是否曾经入队
+        """
+        return url in self._enqueued
+
+    def __len__(self):
+        """队列中待爬取URL的数量"""
+        return len(self._queue)
+
+    def __bool__(self):
+        """队列是否非空"""
+        return bool(self._queue)
+
+if __name__ == "__main__":
+    # 测试
+    frontier = CrawlFrontier(max_depth=1, max_size=3)
+    print(frontier.push("https://example.com/"))  # True
+    print(frontier.push("https://example.com/"))  # False，重复
+    print(frontier.push("https://example.com/a", depth=1))  # True
+    print(frontier.push("https://example.com/b", depth=2))  # False，超过最大深度
+    while frontier:
+        print(frontier.pop())
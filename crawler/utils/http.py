@@ -2,29 +2,56 @@
 HTTP请求工具模块，封装常用的HTTP请求功能
 """
 import time
-import random
+from urllib.parse import urlparse
+
 import requests
-from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, HTTPError, ConnectionError
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
 
-from .user_agents import get_random_user_agent
+from .user_agents import get_user_agent_for_host
+from .retry import (
+    RetryPolicy, RetryBudget, CircuitBreaker, CircuitOpenError, FAILURE_STATUS_CODES, parse_retry_after
+)
+from .metrics import fetch_latency, response_bytes, responses_total, retries_total
 from .logger import crawler_logger as logger
 
 class HttpClient:
     """HTTP客户端类，封装常用的HTTP请求方法"""
     
-    def __init__(self, timeout=10, retry_times=3, retry_interval=(1, 3)):
+    def __init__(self, timeout=10, retry_times=3, retry_interval=(1, 3), pool_size=None, rate_limiter=None,
+                 cache=None, circuit_breaker=None, retry_budget=None, sticky_user_agent=False):
         """
         初始化HTTP客户端
         
         Args:
             timeout (int, optional): 请求超时时间，默认为10秒
             retry_times (int, optional): 重试次数，默认为3次
-            retry_interval (tuple, optional): 重试间隔时间范围（秒），默认为1-3秒
+            retry_interval (tuple, optional): 第一次重试的间隔时间范围（秒），之后每次翻倍，默认为1-3秒
+            pool_size (int, optional): 每个主机的连接池大小，默认为None（使用requests默认值）；
+                多线程并发请求时应不小于并发数
+            rate_limiter (PolitenessScheduler, optional): 按主机限速的调度器，每次发送请求前调用其acquire()，
+                默认为None（不限速）
+            cache (HttpCache, optional): HTTP缓存，GET请求会使用缓存并发送条件请求，默认为None（不使用缓存）
+            circuit_breaker (CircuitBreaker, optional): 按主机的熔断器，默认为None（创建默认配置的熔断器）
+            retry_budget (RetryBudget, optional): 重试预算，默认为None（创建默认配置的重试预算）
+            sticky_user_agent (bool, optional): 是否为每个主机固定使用同一个User-Agent，默认为False（每次随机）
         """
         self.timeout = timeout
         self.retry_times = retry_times
         self.retry_interval = retry_interval
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.retry_policy = RetryPolicy(retry_interval=retry_interval)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.sticky_user_agent = sticky_user_agent
         self.session = requests.Session()
+        if pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
     
     def get(self, url, params=None, headers=None, cookies=None, proxies=None, **kwargs):
         """
@@ -39,13 +66,66 @@ class HttpClient:
             **kwargs: 其他参数传递给requests.get()
             
         Returns:
-            Response: 请求响应对象
+            Response: 请求响应对象，来自缓存时from_cache属性为True
             
         Raises:
             RequestException: 请求异常
         """
-        return self._request('GET', url, params=params, headers=headers, 
-                            cookies=cookies, proxies=proxies, **kwargs)
+        if self.cache is None:
+            return self._request('GET', url, params=params, headers=headers, 
+                                cookies=cookies, proxies=proxies, **kwargs)
+        
+        # 缓存键使用带查询参数的完整URL
+        if params:
+            prepared = PreparedRequest()
+            prepared.prepare_url(url, params)
+            full_url = prepared.url
+        else:
+            full_url = url
+        
+        entry = self.cache.get(full_url)
+        if entry is not None and self.cache.is_fresh(entry):
+            logger.debug(f"使用缓存: {full_url}")
+            return self._build_cached_response(entry)
+        
+        # 有缓存时发送条件请求
+        headers = dict(headers or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+        
+        response = self._request('GET', full_url, headers=headers,
+                                 cookies=cookies, proxies=proxies, **kwargs)
+        
+        if response.status_code == 304 and entry is not None:
+            logger.debug(f"内容未修改，使用缓存: {full_url}")
+            self.cache.touch(full_url)
+            return self._build_cached_response(entry)
+        
+        if response.status_code == 200:
+            self.cache.store(full_url, response.status_code, response.headers, response.content,
+                             encoding=response.encoding)
+        response.from_cache = False
+        return response
+    
+    def _build_cached_response(self, entry):
+        """
+        根据缓存条目构造响应对象
+        
+        Args:
+            entry (CacheEntry): 缓存条目
+            
+        Returns:
+            Response: 响应对象
+        """
+        response = requests.Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response._content = entry.body
+        response.encoding = entry.encoding
+        response.url = entry.url
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
     
     def post(self, url, data=None, json=None, headers=None, cookies=None, proxies=None, **kwargs):
         """
@@ -78,38 +158,104 @@ class HttpClient:
             url (str): 请求URL
             **kwargs: 其他参数传递给requests方法
             
+        只重试连接失败、超时和408/429/5xx等可重试的错误，4xx等错误直接抛出；
+        响应带有Retry-After时按其等待，否则使用带随机抖动的指数退避。
+        每次请求的耗时、状态码、响应字节数和重试次数按主机记录到爬虫指标中。
+        
         Returns:
             Response: 请求响应对象
             
         Raises:
+            CircuitOpenError: 主机熔断中
             RequestException: 请求异常
         """
         # 设置默认超时
         kwargs.setdefault('timeout', self.timeout)
         
         # 设置默认请求头
-        headers = kwargs.get('headers', {})
+        host = urlparse(url).netloc
+        headers = dict(kwargs.get('headers') or {})
         if not headers.get('User-Agent'):
-            headers['User-Agent'] = get_random_user_agent()
+            headers['User-Agent'] = get_user_agent_for_host(host, sticky=self.sticky_user_agent)
         kwargs['headers'] = headers
         
+        # 主机熔断中时直接失败
+        if not self.circuit_breaker.allow(host):
+            raise CircuitOpenError(f"主机 {host} 熔断中，跳过请求: {url}")
+        self.retry_budget.record_request()
+        # allow()放行后、结果记录到熔断器之前出现其他异常（如限速器、读取响应内容出错）时，
+        # 需要释放半开状态的探测名额，否则主机会一直停留在探测中
+        pending = True
+        
         # 重试机制
-        for i in range(self.retry_times):
-            try:
-                logger.debug(f"发送 {method} 请求到 {url}")
-                response = self.session.request(method, url, **kwargs)
-                response.raise_for_status()  # 如果状态码不是200，抛出异常
-                return response
-            except RequestException as e:
-                logger.warning(f"请求失败 ({i+1}/{self.retry_times}): {str(e)}")
-                if i < self.retry_times - 1:  # 如果不是最后一次重试
-                    # 随机等待一段时间再重试
-                    sleep_time = random.uniform(self.retry_interval[0], self.retry_interval[1])
-                    logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
-                    time.sleep(sleep_time)
+        try:
+            for i in range(self.retry_times):
+                retry_after = None
+                try:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire(url)
+                    logger.debug(f"发送 {method} 请求到 {url}")
+                    start = time.perf_counter()
+                    response = self.session.request(method, url, **kwargs)
+                except RequestException as e:
+                    responses_total.inc(host=host, status='error')
+                    if not self.retry_policy.is_retryable_exception(e):
+                        # 证书错误等连接问题计入主机失败，URL错误等与主机无关
+                        if isinstance(e, ConnectionError):
+                            self.circuit_breaker.record_failure(host)
+                        else:
+                            self.circuit_breaker.release(host)
+                        pending = False
+                        logger.error(f"请求失败，错误不可重试: {url}, 错误: {str(e)}")
+                        raise
+                    self.circuit_breaker.record_failure(host)
+                    pending = False
+                    error = e
                 else:
+                    status = response.status_code
+                    fetch_latency.observe(time.perf_counter() - start, host=host)
+                    responses_total.inc(host=host, status=status)
+                    if not kwargs.get('stream'):
+                        response_bytes.inc(len(response.content), host=host)
+                    if not self.retry_policy.is_retryable_status(status):
+                        self.circuit_breaker.record_success(host)
+                        pending = False
+                        response.raise_for_status()  # 4xx等不可重试的错误直接抛出异常
+                        return response
+                    
+                    # 5xx/408计入主机失败；429说明主机正常，只是需要降低频率
+                    if status in FAILURE_STATUS_CODES:
+                        self.circuit_breaker.record_failure(host)
+                    else:
+                        self.circuit_breaker.record_success(host)
+                    pending = False
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    error = HTTPError(f"{status} {response.reason} for url: {url}", response=response)
+                
+                logger.warning(f"请求失败 ({i+1}/{self.retry_times}): {str(error)}")
+                if i == self.retry_times - 1:
                     logger.error(f"请求失败，已达到最大重试次数: {url}")
-                    raise
+                    raise error
+                if retry_after is not None and retry_after > self.retry_policy.max_retry_after:
+                    logger.error(f"Retry-After为 {retry_after:.0f} 秒，超过上限，放弃重试: {url}")
+                    raise error
+                if not self.retry_budget.try_retry():
+                    logger.error(f"重试预算已用完，放弃重试: {url}")
+                    raise error
+                if not self.circuit_breaker.allow(host):
+                    logger.error(f"主机 {host} 已熔断，放弃重试: {url}")
+                    raise error
+                pending = True
+                
+                # 优先按Retry-After等待，否则指数退避
+                sleep_time = retry_after if retry_after is not None else self.retry_policy.backoff(i)
+                logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
+                retries_total.inc(host=host)
+                time.sleep(sleep_time)
+        except BaseException:
+            if pending:
+                self.circuit_breaker.release(host)
+            raise
     
     def close(self):
         """关闭会话"""
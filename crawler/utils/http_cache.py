@@ -0,0 +1,219 @@
+"""
+HTTP缓存工具模块，在磁盘上保存响应内容和校验信息（ETag/Last-Modified），用于条件请求
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+
+from .url import canonicalize_url
+from .logger import crawler_logger as logger
+
+# 缓存条目
+CacheEntry = namedtuple('CacheEntry', [
+    'key', 'url', 'status', 'headers', 'etag', 'last_modified', 'encoding', 'body', 'stored_at'
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+"""
+
+class HttpCache:
+    """
+    磁盘HTTP响应缓存
+
+    以规范化URL为键保存响应，超过容量时按最近最少使用（LRU）淘汰。
+    缓存时间在ttl以内的条目直接使用，不发送请求；超过ttl后发送带If-None-Match/If-Modified-Since的
+    条件请求，服务器返回304时使用缓存内容；超过max_age的条目视为失效并删除。
+    """
+
+    def __init__(self, cache_dir="crawler/data/http_cache", ttl=0, max_age=7 * 24 * 3600,
+                 max_bytes=256 * 1024 * 1024, max_entries=None):
+        """
+        初始化HTTP缓存
+
+        Args:
+            cache_dir (str, optional): 缓存目录，默认为'crawler/data/http_cache'
+            ttl (float, optional): 条目在多少秒内视为新鲜、无需请求服务器，默认为0（每次都发送条件请求）
+            max_age (float, optional): 条目最长保留时间（秒），默认为7天，为None时不限制
+            max_bytes (int, optional): 缓存内容总大小上限（字节），默认为256MB，为None时不限制
+            max_entries (int, optional): 缓存条目数量上限，默认为None（不限制）
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "cache.db"), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._total_bytes, self._count = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries"
+        ).fetchone()
+
+    @staticmethod
+    def make_key(url):
+        """
+        生成缓存键
+
+        Args:
+            url (str): URL
+
+        Returns:
+            str: 规范化后的URL
+        """
+        return canonicalize_url(url)
+
+    def get(self, url):
+        """
+        获取缓存条目
+
+        Args:
+            url (str): URL
+
+        Returns:
+            CacheEntry: 缓存条目，不存在或已超过max_age时返回None
+        """
+        key = self.make_key(url)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT key, url, status, headers, etag, last_modified, encoding, body, stored_at "
+                "FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            entry = CacheEntry(*row[:3], json.loads(row[3]), *row[4:7], bytes(row[7]), row[8])
+            now = time.time()
+            if self.max_age is not None and now - entry.stored_at > self.max_age:
+                self._delete(key)
+                self.conn.commit()
+                return None
+
+            self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            return entry
+
+    def is_fresh(self, entry):
+        """
+        判断条目是否在ttl以内，可以不请求服务器直接使用
+
+        Args:
+            entry (CacheEntry): 缓存条目
+
+        Returns:
+            bool: 是否新鲜
+        """
+        return bool(self.ttl) and time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        生成条件请求头
+
+        Args:
+            entry (CacheEntry): 缓存条目
+
+        Returns:
+            dict: 条件请求头
+        """
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url, status, headers, body, encoding=None):
+        """
+        保存响应
+
+        Args:
+            url (str): URL
+            status (int): 状态码
+            headers (dict): 响应头
+            body (bytes): 响应内容
+            encoding (str, optional): 响应编码，默认为None
+        """
+        key = self.make_key(url)
+        headers = {str(k): str(v) for k, v in headers.items()}
+        lower = {k.lower(): v for k, v in headers.items()}
+        # Cache-Control: no-store的响应不缓存
+        if 'no-store' in lower.get('cache-control', ''):
+            return
+
+        now = time.time()
+        size = len(body)
+        with self._lock:
+            self._delete(key)
+            self.conn.execute(
+                "INSERT INTO entries (key, url, status, headers, etag, last_modified, encoding, body, size, "
+                "stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), lower.get('etag'), lower.get('last-modified'),
+                 encoding, sqlite3.Binary(body), size, now, now)
+            )
+            self._total_bytes += size
+            self._count += 1
+            self._evict()
+            self.conn.commit()
+
+    def touch(self, url):
+        """
+        服务器确认缓存仍然有效（304）后，刷新条目的保存时间
+
+        Args:
+            url (str): URL
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, self.make_key(url))
+            )
+            self.conn.commit()
+
+    def _delete(self, key):
+        """删除条目（调用方需持有锁）"""
+        row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+            self._count -= 1
+
+    def _evict(self):
+        """超过容量时按最近访问时间淘汰条目（调用方需持有锁）"""
+        while ((self.max_bytes is not None and self._total_bytes > self.max_bytes)
+               or (self.max_entries is not None and self._count > self.max_entries)):
+            row = self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self._count -= 1
+            logger.debug(f"淘汰缓存: {row[0]}")
+
+    def close(self):
+        """关闭缓存"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
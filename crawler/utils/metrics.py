@@ -0,0 +1,523 @@
+"""
+爬虫指标工具模块，记录请求耗时、下载字节数、解析耗时、Item数量、队列长度和重试次数等指标，
+通过本地端口以Prometheus文本格式提供，或定期保存为JSON快照文件
+"""
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+import inspect
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .logger import crawler_logger as logger
+
+# 耗时直方图的默认分桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    """转义Prometheus标签值"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    """格式化Prometheus样本值"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class _Metric:
+    """指标基类，每组标签值对应一个样本"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        初始化指标
+
+        Args:
+            name (str): 指标名称
+            documentation (str): 指标说明
+            labelnames (tuple, optional): 标签名称，默认为无标签
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        """标签值元组，未指定的标签为空字符串"""
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"指标 {self.name} 没有标签: {', '.join(sorted(unknown))}")
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _label_text(self, key, extra=None):
+        """Prometheus格式的标签"""
+        pairs = list(zip(self.labelnames, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        """
+        获取所有样本
+
+        Returns:
+            list: (标签字典, 值)列表
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), self._export(value)) for key, value in items]
+
+    def _export(self, value):
+        """样本值的快照（子类可覆盖）"""
+        return value
+
+    def render(self):
+        """
+        生成Prometheus文本格式
+
+        Returns:
+            list: 文本行列表
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._label_text(key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        增加计数
+
+        Args:
+            amount (float, optional): 增加的数量，默认为1
+            **labels: 标签值
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """可以任意设置的瞬时值"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        """
+        设置当前值
+
+        Args:
+            value (float): 当前值
+            **labels: 标签值
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        """
+        增加当前值
+
+        Args:
+            amount (float, optional): 增加的数量，默认为1
+            **labels: 标签值
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """
+        减少当前值
+
+        Args:
+            amount (float, optional): 减少的数量，默认为1
+            **labels: 标签值
+        """
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """分桶统计的直方图，记录样本数量、总和及落在各分桶中的数量"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            name (str): 指标名称
+            documentation (str): 指标说明
+            labelnames (tuple, optional): 标签名称，默认为无标签
+            buckets (tuple, optional): 分桶上界（升序），默认为DEFAULT_BUCKETS
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        记录一个样本
+
+        Args:
+            value (float): 样本值
+            **labels: 标签值
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [各分桶数量..., 超过最大分桶的数量], 总和
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        记录with代码块的耗时（秒）
+
+        Args:
+            **labels: 标签值
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _export(self, value):
+        counts, total = value
+        count = sum(counts)
+        bounds = [_format_value(float(bound)) for bound in self.buckets] + ['+Inf']
+        return {'count': count, 'sum': total, 'avg': total / count if count else 0.0,
+                'buckets': dict(zip(bounds, self._cumulative(counts)))}
+
+    @staticmethod
+    def _cumulative(counts):
+        """各分桶的累计数量"""
+        result, running = [], 0
+        for count in counts:
+            running += count
+            result.append(running)
+        return result
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = self._cumulative(counts)
+            for bound, count in zip(self.buckets + (float('inf'),), cumulative):
+                label = self._label_text(key, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{label} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        """初始化注册表"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.start_time = time.time()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        """获取已有指标，不存在时创建"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """
+        获取或创建计数器
+
+        Args:
+            name (str): 指标名称
+            documentation (str): 指标说明
+            labelnames (tuple, optional): 标签名称，默认为无标签
+
+        Returns:
+            Counter: 计数器
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """
+        获取或创建瞬时值指标
+
+        Args:
+            name (str): 指标名称
+            documentation (str): 指标说明
+            labelnames (tuple, optional): 标签名称，默认为无标签
+
+        Returns:
+            Gauge: 瞬时值指标
+        """
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        获取或创建直方图
+
+        Args:
+            name (str): 指标名称
+            documentation (str): 指标说明
+            labelnames (tuple, optional): 标签名称，默认为无标签
+            buckets (tuple, optional): 分桶上界，默认为DEFAULT_BUCKETS
+
+        Returns:
+            Histogram: 直方图
+        """
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """
+        生成所有指标的Prometheus文本格式
+
+        Returns:
+            str: 文本
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        获取所有指标的快照
+
+        Returns:
+            dict: {'time', 'uptime', 'metrics': {指标名称: {'type', 'samples': [{'labels', 'value'}]}}}
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        now = time.time()
+        return {
+            'time': now,
+            'uptime': now - self.start_time,
+            'metrics': {
+                metric.name: {
+                    'type': metric.type,
+                    'samples': [{'labels': labels, 'value': value} for labels, value in metric.samples()]
+                }
+                for metric in metrics
+            }
+        }
+
+def timed(histogram, **labels):
+    """
+    记录函数耗时的装饰器，生成器函数记录每次产出数据前的执行时间之和
+
+    Args:
+        histogram (Histogram): 记录耗时的直方图
+        **labels: 标签值
+
+    Returns:
+        function: 装饰器
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                # 不计入调用方处理产出数据的时间
+                elapsed = 0.0
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            value = next(gen)
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        yield value
+                except StopIteration:
+                    return
+                finally:
+                    histogram.observe(elapsed, **labels)
+            return gen_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """返回Prometheus文本格式指标的请求处理器"""
+
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"指标请求: {self.address_string()} {format % args}")
+
+class MetricsExporter:
+    """
+    指标导出器，在后台线程中提供Prometheus文本格式的HTTP端点，并定期写入JSON快照文件
+
+    JSON快照中计数器额外包含与上一次快照相比的每秒增量（rate），例如Item数量的rate即每秒Item数。
+    """
+
+    def __init__(self, registry=None, port=None, host='127.0.0.1', snapshot_path=None, interval=10.0):
+        """
+        初始化指标导出器
+
+        Args:
+            registry (MetricsRegistry, optional): 指标注册表，默认为None（使用默认注册表metrics）
+            port (int, optional): HTTP端点端口，默认为None（不启动HTTP端点）
+            host (str, optional): HTTP端点监听地址，默认为'127.0.0.1'
+            snapshot_path (str, optional): JSON快照文件路径，默认为None（不写入快照）
+            interval (float, optional): 写入JSON快照的间隔（秒），默认为10秒
+        """
+        self.registry = registry or metrics
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.server = None
+        self._threads = []
+        self._stop = threading.Event()
+        self._last_counters = {}
+        self._last_time = None
+
+    def start(self):
+        """启动HTTP端点和快照线程"""
+        if self.port is not None:
+            handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+            # 端口为0时由系统分配
+            self.port = self.server.server_address[1]
+            thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            logger.info(f"指标端点: http://{self.host}:{self.port}/metrics")
+        if self.snapshot_path:
+            snapshot_dir = os.path.dirname(self.snapshot_path)
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
+            thread = threading.Thread(target=self._snapshot_loop, name='metrics-snapshot', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            logger.info(f"指标快照文件: {self.snapshot_path} (每 {self.interval} 秒)")
+        return self
+
+    def _snapshot_loop(self):
+        """定期写入快照"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.error(f"写入指标快照失败: {str(e)}")
+
+    def write_snapshot(self):
+        """
+        立即写入一次JSON快照
+
+        Returns:
+            dict: 快照内容
+        """
+        snapshot = self.registry.snapshot()
+        now = snapshot['time']
+        elapsed = now - self._last_time if self._last_time is not None else snapshot['uptime']
+        counters = {}
+        for name, metric in snapshot['metrics'].items():
+            if metric['type'] != 'counter':
+                continue
+            for sample in metric['samples']:
+                key = (name, tuple(sorted(sample['labels'].items())))
+                counters[key] = sample['value']
+                previous = self._last_counters.get(key, 0)
+                sample['rate'] = (sample['value'] - previous) / elapsed if elapsed > 0 else 0.0
+        self._last_counters = counters
+        self._last_time = now
+
+        # 先写入临时文件再替换，读取方不会读到写了一半的文件
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.snapshot_path)
+        return snapshot
+
+    def close(self):
+        """停止HTTP端点和快照线程，并写入最后一次快照"""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        if self.snapshot_path:
+            self.write_snapshot()
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+# 默认注册表
+metrics = MetricsRegistry()
+
+# 爬虫通用指标，BasicCrawler、HttpClient和Scrapy扩展共用
+fetch_latency = metrics.histogram('crawler_fetch_seconds', 'HTTP请求耗时（秒）', ['host'])
+response_bytes = metrics.counter('crawler_response_bytes_total', '下载的响应体字节数', ['host'])
+responses_total = metrics.counter('crawler_responses_total', '收到的响应数量', ['host', 'status'])
+retries_total = metrics.counter('crawler_retries_total', '请求重试次数', ['host'])
+parse_time = metrics.histogram('crawler_parse_seconds', '页面解析耗时（秒）', ['callback'])
+items_total = metrics.counter('crawler_items_total', '爬取到的Item数量', ['spider'])
+queue_depth = metrics.gauge('crawler_queue_depth', '待爬取队列长度', ['spider'])
+
+if __name__ == "__main__":
+    # 测试
+    fetch_latency.observe(0.12, host='example.com')
+    fetch_latency.observe(0.8, host='example.com')
+    items_total.inc(spider='test')
+    queue_depth.set(42, spider='test')
+
+    @timed(parse_time, callback='demo')
+    def parse():
+        time.sleep(0.01)
+
+    parse()
+    with MetricsExporter(port=0, snapshot_path='crawler/data/test_metrics.json', interval=1) as exporter:
+        from urllib.request import urlopen
+        print(urlopen(f"http://127.0.0.1:{exporter.port}/metrics").read().decode('utf-8'))
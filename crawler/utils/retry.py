@@ -0,0 +1,282 @@
+"""
+重试工具模块，提供可重试错误分类、指数退避、Retry-After解析、全局重试预算和按主机的熔断器
+"""
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from requests.exceptions import (
+    RequestException, ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError, SSLError
+)
+
+from .logger import crawler_logger as logger
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# 计入熔断器失败次数的HTTP状态码（429表示限流而非故障，只按Retry-After等待）
+FAILURE_STATUS_CODES = frozenset({408, 500, 502, 503, 504})
+
+class CircuitOpenError(RequestException):
+    """主机熔断中，请求被直接拒绝"""
+
+def parse_retry_after(value, max_wait=None):
+    """
+    解析Retry-After响应头
+
+    Args:
+        value (str): Retry-After的值，可以是秒数或HTTP日期
+        max_wait (float, optional): 等待时间上限（秒），默认为None（不限制）
+
+    Returns:
+        float: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        wait = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        wait = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    wait = max(0.0, wait)
+    return min(wait, max_wait) if max_wait is not None else wait
+
+class RetryPolicy:
+    """重试策略：判断错误是否可重试，计算带随机抖动的指数退避时间"""
+
+    def __init__(self, retry_interval=(1, 3), max_backoff=60, max_retry_after=120,
+                 retry_status_codes=RETRYABLE_STATUS_CODES):
+        """
+        初始化重试策略
+
+        Args:
+            retry_interval (tuple, optional): 第一次重试的等待时间范围（秒），之后每次翻倍，默认为1-3秒
+            max_backoff (float, optional): 退避时间上限（秒），默认为60秒
+            max_retry_after (float, optional): 接受的Retry-After上限（秒），超过时不再重试，默认为120秒
+            retry_status_codes (set, optional): 可重试的HTTP状态码
+        """
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.retry_status_codes = retry_status_codes
+
+    def is_retryable_status(self, status_code):
+        """
+        判断HTTP状态码是否可重试
+
+        Args:
+            status_code (int): 状态码
+
+        Returns:
+            bool: 是否可重试
+        """
+        return status_code in self.retry_status_codes
+
+    @staticmethod
+    def is_retryable_exception(exc):
+        """
+        判断请求异常是否可重试（连接失败、超时、传输中断可重试；证书错误、URL错误、重定向过多等不可重试）
+
+        Args:
+            exc (Exception): 异常
+
+        Returns:
+            bool: 是否可重试
+        """
+        if isinstance(exc, SSLError):
+            return False
+        return isinstance(exc, (ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError))
+
+    def backoff(self, attempt):
+        """
+        计算第attempt次重试前的等待时间
+
+        Args:
+            attempt (int): 重试序号，从0开始
+
+        Returns:
+            float: 等待时间（秒）
+        """
+        low, high = self.retry_interval
+        return min(self.max_backoff, random.uniform(low, high) * (2 ** attempt))
+
+class RetryBudget:
+    """
+    全局重试预算
+
+    每个请求存入ratio个令牌，每次重试消耗1个令牌，令牌最多积累max_tokens个。
+    大量请求失败时重试次数被限制在请求数的一定比例内，避免重试放大故障。
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10, max_tokens=100):
+        """
+        初始化重试预算
+
+        Args:
+            ratio (float, optional): 每个请求存入的令牌数，即重试次数占请求数的比例上限，默认为0.2
+            min_tokens (int, optional): 初始令牌数，保证请求量少时也能重试，默认为10
+            max_tokens (int, optional): 令牌数上限，默认为100
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """记录一次请求"""
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_retry(self):
+        """
+        尝试消耗一次重试
+
+        Returns:
+            bool: 预算是否允许重试
+        """
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class CircuitBreaker:
+    """
+    按主机的熔断器
+
+    连续失败failure_threshold次后熔断，熔断期间请求直接失败；经过recovery_timeout秒后进入半开状态，
+    只放行一个探测请求，成功则恢复，失败则再次熔断，且熔断时间翻倍（不超过max_recovery_timeout）。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, max_recovery_timeout=600):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold (int, optional): 触发熔断的连续失败次数，默认为5
+            recovery_timeout (float, optional): 熔断后多少秒尝试恢复，默认为30秒
+            max_recovery_timeout (float, optional): 熔断时间上限（秒），默认为600秒
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        """获取主机状态，不存在时创建"""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0,
+                'timeout': self.recovery_timeout, 'probing': False,
+            }
+        return state
+
+    def state(self, host):
+        """
+        获取主机的熔断状态
+
+        Args:
+            host (str): 主机名
+
+        Returns:
+            str: 'closed'、'open'或'half_open'
+        """
+        with self._lock:
+            return self._get(host)['state']
+
+    def retry_in(self, host):
+        """
+        获取主机熔断结束前的剩余时间
+
+        Args:
+            host (str): 主机名
+
+        Returns:
+            float: 剩余时间（秒），未熔断时为0
+        """
+        with self._lock:
+            state = self._get(host)
+            if state['state'] != self.OPEN:
+                return 0.0
+            return max(state['opened_at'] + state['timeout'] - time.monotonic(), 0.0)
+
+    def allow(self, host):
+        """
+        判断是否允许向主机发送请求
+
+        Args:
+            host (str): 主机名
+
+        Returns:
+            bool: 是否允许
+        """
+        with self._lock:
+            state = self._get(host)
+            if state['state'] == self.CLOSED:
+                return True
+            if state['state'] == self.OPEN:
+                if time.monotonic() - state['opened_at'] < state['timeout']:
+                    return False
+                state['state'] = self.HALF_OPEN
+                state['probing'] = False
+                logger.info(f"主机 {host} 熔断结束，发送探测请求")
+            # 半开状态只放行一个探测请求
+            if state['probing']:
+                return False
+            state['probing'] = True
+            return True
+
+    def record_success(self, host):
+        """
+        记录一次成功请求
+
+        Args:
+            host (str): 主机名
+        """
+        with self._lock:
+            state = self._get(host)
+            if state['state'] != self.CLOSED:
+                logger.info(f"主机 {host} 已恢复")
+            state.update(state=self.CLOSED, failures=0, timeout=self.recovery_timeout, probing=False)
+
+    def release(self, host):
+        """
+        请求结束但无法判断主机是否正常时调用，释放半开状态的探测名额
+
+        Args:
+            host (str): 主机名
+        """
+        with self._lock:
+            self._get(host)['probing'] = False
+
+    def record_failure(self, host):
+        """
+        记录一次失败请求
+
+        Args:
+            host (str): 主机名
+        """
+        with self._lock:
+            state = self._get(host)
+            state['failures'] += 1
+            if state['state'] == self.HALF_OPEN:
+                # 探测失败，熔断时间翻倍
+                state['timeout'] = min(state['timeout'] * 2, self.max_recovery_timeout)
+            elif state['state'] == self.OPEN or state['failures'] < self.failure_threshold:
+                return
+            state.update(state=self.OPEN, opened_at=time.monotonic(), probing=False)
+            logger.warning(f"主机 {host} 连续失败 {state['failures']} 次，熔断 {state['timeout']} 秒")
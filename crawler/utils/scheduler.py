@@ -0,0 +1,339 @@
+"""
+礼貌爬取调度工具模块，为每个主机维护一个令牌桶，按主机限制请求频率
+"""
+import time
+import heapq
+import threading
+import urllib.request
+from collections import deque
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from .user_agents import get_random_user_agent
+from .logger import crawler_logger as logger
+
+class TokenBucket:
+    """
+    令牌桶
+
+    令牌以rate个/秒的速度补充，最多积累burst个。预约令牌时允许令牌数为负（即欠账），
+    返回需要等待的时间，因此多个调用方并发预约时也能保证整体速率不超过rate。
+    """
+
+    def __init__(self, rate, burst=1, now=None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate (float): 令牌补充速度（个/秒），为None或0时不限速
+            burst (int, optional): 令牌桶容量，即允许的突发请求数，默认为1
+            now (float, optional): 当前时间，默认为time.monotonic()
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        """根据经过的时间补充令牌"""
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now=None):
+        """
+        预约一个令牌
+
+        Args:
+            now (float, optional): 当前时间，默认为time.monotonic()
+
+        Returns:
+            float: 使用该令牌前需要等待的时间（秒），0表示可立即使用
+        """
+        now = time.monotonic() if now is None else now
+        paused = max(self.paused_until - now, 0.0)
+        if not self.rate:
+            return paused
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0 if self.tokens >= 0 else -self.tokens / self.rate, paused)
+
+    def ready_at(self, now=None):
+        """
+        计算下一个令牌可用的时间
+
+        Args:
+            now (float, optional): 当前时间，默认为time.monotonic()
+
+        Returns:
+            float: 下一个令牌可用的时间（与time.monotonic()同一时间基准）
+        """
+        now = time.monotonic() if now is None else now
+        ready = now
+        if self.rate:
+            self._refill(now)
+            if self.tokens < 1:
+                ready = now + (1 - self.tokens) / self.rate
+        return max(ready, self.paused_until)
+
+    def pause(self, seconds, now=None):
+        """
+        暂停发放令牌
+
+        Args:
+            seconds (float): 暂停时间（秒）
+            now (float, optional): 当前时间，默认为time.monotonic()
+        """
+        now = time.monotonic() if now is None else now
+        self.paused_until = max(self.paused_until, now + seconds)
+
+class PolitenessScheduler:
+    """
+    按主机限速的调度器
+
+    每个主机一个令牌桶，速率为rate个/秒、容量为burst；如果robots.txt中声明了Crawl-delay
+    且比配置的间隔更长，则使用Crawl-delay。调度器为每个主机维护一个URL队列，
+    next()总是返回最早可以请求的主机的URL，因此不同主机之间互不影响。
+    也可以只使用acquire()/reserve()对请求限速，例如HttpClient的rate_limiter。
+    """
+
+    def __init__(self, rate=1.0, burst=1, respect_robots=True, user_agent="*"):
+        """
+        初始化调度器
+
+        Args:
+            rate (float, optional): 每个主机每秒允许的请求数，为None或0时不限速，默认为1
+            burst (int, optional): 每个主机允许的突发请求数，默认为1
+            respect_robots (bool, optional): 是否遵守robots.txt中的Crawl-delay，默认为True
+            user_agent (str, optional): 读取robots.txt规则时使用的User-Agent，默认为'*'
+        """
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self._buckets = {}
+        self._queues = {}
+        self._heap = []
+        self._seq = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        # 正在读取robots.txt的主机，其他调用方等待Crawl-delay设置完成后再预约
+        self._initializing = {}
+
+    def set_crawl_delay(self, host, delay):
+        """
+        设置主机的请求间隔，仅当比当前速率更慢时生效
+
+        Args:
+            host (str): 主机名（含端口）
+            delay (float): 请求间隔（秒）
+        """
+        if not delay or delay <= 0:
+            return
+        with self._lock:
+            bucket = self._get_bucket(host)
+            rate = 1.0 / delay
+            if not bucket.rate or rate < bucket.rate:
+                bucket.rate = rate
+                bucket.burst = 1
+                bucket.tokens = min(bucket.tokens, 1)
+                logger.info(f"主机 {host} 的请求间隔设置为 {delay} 秒")
+
+    def _get_bucket(self, host):
+        """获取主机的令牌桶，不存在时创建"""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def _ensure_host(self, url):
+        """
+        首次遇到主机时创建令牌桶，并按需读取robots.txt中的Crawl-delay
+
+        Args:
+            url (str): URL
+
+        Returns:
+            str: 主机名
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc
+        fetch_robots = self.respect_robots and parsed.scheme in ("http", "https")
+        pending = owner = None
+        with self._lock:
+            if host in self._buckets:
+                pending = self._initializing.get(host)
+            else:
+                self._get_bucket(host)
+                if fetch_robots:
+                    owner = self._initializing[host] = threading.Event()
+
+        if pending is not None:
+            # 其他线程正在读取该主机的robots.txt，等Crawl-delay生效后再返回，避免按默认速率发出第一批请求
+            pending.wait()
+            return host
+
+        if owner is not None:
+            try:
+                self.set_crawl_delay(host, self._fetch_crawl_delay(f"{parsed.scheme}://{host}/robots.txt"))
+            finally:
+                with self._lock:
+                    self._initializing.pop(host, None)
+                owner.set()
+        return host
+
+    def _fetch_crawl_delay(self, robots_url):
+        """
+        读取robots.txt中的Crawl-delay
+
+        Args:
+            robots_url (str): robots.txt的URL
+
+        Returns:
+            float: Crawl-delay（秒），未声明或读取失败时返回None
+        """
+        try:
+            request = urllib.request.Request(robots_url, headers={"User-Agent": get_random_user_agent()})
+            with urllib.request.urlopen(request, timeout=10) as response:
+                lines = response.read().decode("utf-8", errors="ignore").splitlines()
+        except Exception as e:
+            logger.debug(f"读取robots.txt失败: {robots_url}, 错误: {str(e)}")
+            return None
+
+        parser = RobotFileParser()
+        parser.parse(lines)
+        delay = parser.crawl_delay(self.user_agent)
+        if delay is None:
+            request_rate = parser.request_rate(self.user_agent)
+            if request_rate and request_rate.requests:
+                delay = request_rate.seconds / request_rate.requests
+        return float(delay) if delay else None
+
+    def reserve(self, url):
+        """
+        为URL所在主机预约一次请求（不阻塞）
+
+        Args:
+            url (str): 请求URL
+
+        Returns:
+            float: 发起请求前需要等待的时间（秒）
+        """
+        host = self._ensure_host(url)
+        with self._lock:
+            return self._buckets[host].reserve()
+
+    def acquire(self, url):
+        """
+        为URL所在主机获取一次请求许可，必要时阻塞等待
+
+        Args:
+            url (str): 请求URL
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            logger.debug(f"主机 {urlparse(url).netloc} 限速，等待 {wait:.2f} 秒...")
+            time.sleep(wait)
+
+    def add(self, url, item=None):
+        """
+        将URL加入所在主机的队列
+
+        Args:
+            url (str): URL
+            item (optional): 与URL一起返回的附加数据，例如爬取深度
+        """
+        host = self._ensure_host(url)
+        with self._lock:
+            queue = self._queues.get(host)
+            if queue is None:
+                queue = self._queues[host] = deque()
+                self._push_host(host, self._buckets[host].ready_at())
+            queue.append((url, item))
+            self._size += 1
+
+    def defer(self, url, item=None, delay=0):
+        """
+        推迟请求URL：所在主机暂停delay秒，并将URL重新加入该主机的队列
+
+        Args:
+            url (str): URL
+            item (optional): 与URL一起返回的附加数据，例如爬取深度
+            delay (float, optional): 主机暂停的时间（秒），默认为0
+        """
+        host = self._ensure_host(url)
+        with self._lock:
+            self._buckets[host].pause(delay)
+        self.add(url, item)
+
+    def _push_host(self, host, ready_at):
+        """将主机按可请求时间加入堆"""
+        self._seq += 1
+        heapq.heappush(self._heap, (ready_at, self._seq, host))
+
+    def next(self):
+        """
+        取出最早可以请求的主机的下一个URL，必要时阻塞等待该主机的令牌
+
+        Returns:
+            tuple: (URL, 附加数据)
+
+        Raises:
+            IndexError: 调度器为空
+        """
+        with self._lock:
+            now = time.monotonic()
+            # 令牌可能已被acquire()消耗，堆中的时间过期时重新计算
+            while self._heap:
+                ready_at, _, host = self._heap[0]
+                actual = self._buckets[host].ready_at(now)
+                if actual <= ready_at + 1e-6:
+                    break
+                heapq.heapreplace(self._heap, (actual, self._seq, host))
+                self._seq += 1
+            if not self._heap:
+                raise IndexError("next from an empty scheduler")
+
+            _, _, host = heapq.heappop(self._heap)
+            queue = self._queues[host]
+            url, item = queue.popleft()
+            self._size -= 1
+            bucket = self._buckets[host]
+            wait = bucket.reserve(now)
+            if queue:
+                self._push_host(host, bucket.ready_at(now))
+            else:
+                del self._queues[host]
+
+        if wait > 0:
+            logger.debug(f"等待 {wait:.2f} 秒后请求主机 {host}...")
+            time.sleep(wait)
+        return url, item
+
+    def clear(self):
+        """清空所有待请求的URL，保留各主机的令牌桶"""
+        with self._lock:
+            self._queues.clear()
+            self._heap.clear()
+            self._size = 0
+
+    def __len__(self):
+        """调度器中待请求URL的数量"""
+        return self._size
+
+    def __bool__(self):
+        """调度器是否非空"""
+        return self._size > 0
+
+if __name__ == "__main__":
+    # 测试：两个主机交替返回，同一主机的请求间隔为0.5秒
+    scheduler = PolitenessScheduler(rate=2, burst=1, respect_robots=False)
+    for i in range(3):
+        scheduler.add(f"https://a.example.com/{i}")
+        scheduler.add(f"https://b.example.com/{i}")
+    start = time.monotonic()
+    while scheduler:
+        url, _ = scheduler.next()
+        print(f"{time.monotonic() - start:.2f}s {url}")
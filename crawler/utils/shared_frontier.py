@@ -0,0 +1,531 @@
+"""
+共享待爬取队列工具模块，基于SQLite，多个本地爬虫进程可以从同一个队列中领取URL，互不重复
+
+URL被领取（lease）后在可见性超时内只属于领取它的进程，处理完成后确认（ack）；进程崩溃时
+超时的URL会重新回到队列，由其他进程领取。领取时按主机轮流选择，并可限制每个主机同时被领取的URL数量。
+"""
+import os
+import time
+import socket
+import sqlite3
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from .url import url_fingerprint
+from .logger import crawler_logger as logger
+
+# URL状态
+PENDING, LEASED, DONE, FAILED = 0, 1, 2, 3
+
+# 领取到的URL
+Lease = namedtuple('Lease', ['id', 'url', 'depth', 'priority', 'data', 'attempts'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    data BLOB,
+    state INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    UNIQUE (queue, key)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_host ON entries (queue, host, state, priority DESC, id);
+CREATE INDEX IF NOT EXISTS idx_entries_lease ON entries (queue, state, lease_until);
+CREATE TABLE IF NOT EXISTS hosts (
+    queue TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0,
+    leased INTEGER NOT NULL DEFAULT 0,
+    last_lease REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (queue, host)
+) WITHOUT ROWID;
+"""
+
+def _signed(value):
+    """将64位无符号整数转换为SQLite INTEGER可保存的有符号64位整数"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+class SharedFrontier:
+    """
+    基于SQLite（WAL模式）的共享待爬取队列
+
+    同一个数据库文件可保存多个队列，以queue区分。URL以规范化URL的指纹（或调用方指定的key）去重，
+    同一URL在队列中只出现一次，已完成的URL再次加入时被忽略。领取、确认等操作都在BEGIN IMMEDIATE事务中进行，
+    多个进程同时操作时由SQLite保证原子性。
+    """
+
+    def __init__(self, db_path="crawler/data/frontier.db", queue="default", visibility_timeout=300,
+                 host_limit=None, max_attempts=3, worker_id=None):
+        """
+        初始化共享待爬取队列
+
+        Args:
+            db_path (str, optional): 数据库文件路径，默认为'crawler/data/frontier.db'
+            queue (str, optional): 队列名称，默认为'default'
+            visibility_timeout (float, optional): 领取后多少秒未确认视为处理失败，URL重新回到队列，默认为300秒
+            host_limit (int, optional): 同一主机同时被领取（所有进程合计）的URL数量上限，默认为None（不限制）
+            max_attempts (int, optional): 同一URL最多被领取的次数，超时次数达到该值后标记为失败，默认为3
+            worker_id (str, optional): 当前进程的标识，默认为'主机名-进程ID'
+        """
+        self.db_path = db_path
+        self.queue = queue
+        self.visibility_timeout = visibility_timeout
+        self.host_limit = host_limit
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None时由本类自行管理事务；timeout为其他进程持有写锁时的等待时间
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def _transaction(self, func, *args):
+        """在BEGIN IMMEDIATE事务中执行func，出错时回滚"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _host(url):
+        """URL的主机名"""
+        return (urlsplit(url).hostname or '').lower()
+
+    def _insert(self, url, depth, priority, data, key, queue=None):
+        """插入一个URL（调用方需在事务中），返回是否为新URL"""
+        key = _signed(key if key is not None else url_fingerprint(url))
+        host = self._host(url)
+        queue = queue or self.queue
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO entries (queue, key, url, host, depth, priority, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (queue, key, url, host, depth, priority, data)
+        )
+        if cur.rowcount == 0:
+            return False
+        self.conn.execute(
+            "INSERT INTO hosts (queue, host, pending) VALUES (?, ?, 1) "
+            "ON CONFLICT(queue, host) DO UPDATE SET pending = pending + 1",
+            (queue, host)
+        )
+        return True
+
+    def push(self, url, depth=0, priority=0, data=None, key=None, queue=None):
+        """
+        将URL加入队列
+
+        Args:
+            url (str): URL
+            depth (int, optional): 爬取深度，默认为0
+            priority (int, optional): 优先级，同一主机的URL中优先级高的先被领取，默认为0
+            data (bytes, optional): 附加数据，领取时原样返回，默认为None
+            key (int, optional): 64位去重键，默认为None（使用规范化URL的指纹）
+            queue (str, optional): 加入同一数据库中的其他队列（如其他分片的队列），默认为None（当前队列）
+
+        Returns:
+            bool: 是否成功入队（已在队列中或已完成时返回False）
+        """
+        return self._transaction(self._insert, url, depth, priority, data, key, queue)
+
+    def push_many(self, items):
+        """
+        在一个事务中将多个URL加入队列
+
+        Args:
+            items (iterable): (url, depth)元组
+
+        Returns:
+            int: 成功入队的URL数量
+        """
+        def insert_all():
+            return sum(self._insert(url, depth, 0, None, None) for url, depth in items)
+        return self._transaction(insert_all)
+
+    def _reclaim(self, now):
+        """将超过可见性超时的URL放回队列，领取次数达到上限的标记为失败（调用方需在事务中）"""
+        rows = self.conn.execute(
+            "SELECT id, host, attempts FROM entries WHERE queue = ? AND state = ? AND lease_until < ?",
+            (self.queue, LEASED, now)
+        ).fetchall()
+        for entry_id, host, attempts in rows:
+            failed = attempts >= self.max_attempts
+            self.conn.execute(
+                "UPDATE entries SET state = ?, worker = NULL, lease_until = NULL WHERE id = ?",
+                (FAILED if failed else PENDING, entry_id)
+            )
+            self.conn.execute(
+                "UPDATE hosts SET leased = leased - 1, pending = pending + ? WHERE queue = ? AND host = ?",
+                (0 if failed else 1, self.queue, host)
+            )
+        if rows:
+            logger.warning(f"{len(rows)} 个URL领取后超时未确认，已放回队列")
+
+    def _lease(self, n, now):
+        """领取最多n个URL（调用方需在事务中）"""
+        self._reclaim(now)
+        leases = []
+        for _ in range(n):
+            # 选择有待领取URL、最久没有被领取过的主机
+            sql = "SELECT host FROM hosts WHERE queue = ? AND pending > 0"
+            params = [self.queue]
+            if self.host_limit is not None:
+                sql += " AND leased < ?"
+                params.append(self.host_limit)
+            row = self.conn.execute(sql + " ORDER BY last_lease LIMIT 1", params).fetchone()
+            if row is None:
+                break
+            host = row[0]
+
+            entry = self.conn.execute(
+                "SELECT id, url, depth, priority, data, attempts FROM entries "
+                "WHERE queue = ? AND host = ? AND state = ? ORDER BY priority DESC, id LIMIT 1",
+                (self.queue, host, PENDING)
+            ).fetchone()
+            entry_id = entry[0]
+            self.conn.execute(
+                "UPDATE entries SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, self.worker_id, now + self.visibility_timeout, entry_id)
+            )
+            self.conn.execute(
+                "UPDATE hosts SET pending = pending - 1, leased = leased + 1, last_lease = ? "
+                "WHERE queue = ? AND host = ?",
+                (now, self.queue, host)
+            )
+            leases.append(Lease(*entry[:5], entry[5] + 1))
+        return leases
+
+    def lease(self, n=1):
+        """
+        领取URL，按主机轮流选择
+
+        Args:
+            n (int, optional): 最多领取的URL数量，默认为1
+
+        Returns:
+            list: Lease列表，没有可领取的URL时为空列表
+        """
+        return self._transaction(self._lease, n, time.time())
+
+    def _finish(self, lease_id, state):
+        """结束一次领取（调用方需在事务中），返回是否成功"""
+        row = self.conn.execute(
+            "SELECT host FROM entries WHERE id = ? AND state = ? AND worker = ?", (lease_id, LEASED, self.worker_id)
+        ).fetchone()
+        if row is None:
+            # 已超时并被放回队列（或被其他进程领取）
+            return False
+        self.conn.execute(
+            "UPDATE entries SET state = ?, worker = NULL, lease_until = NULL WHERE id = ?", (state, lease_id)
+        )
+        self.conn.execute(
+            "UPDATE hosts SET leased = leased - 1, pending = pending + ? WHERE queue = ? AND host = ?",
+            (1 if state == PENDING else 0, self.queue, row[0])
+        )
+        return True
+
+    def ack(self, lease_id):
+        """
+        确认URL处理完成
+
+        Args:
+            lease_id (int): Lease.id
+
+        Returns:
+            bool: 是否成功（领取已超时时返回False，该URL可能会被其他进程重复处理）
+        """
+        return self._transaction(self._finish, lease_id, DONE)
+
+    def nack(self, lease_id, retry=True):
+        """
+        放弃处理已领取的URL
+
+        Args:
+            lease_id (int): Lease.id
+            retry (bool, optional): 是否放回队列由其他进程领取，为False时标记为失败，默认为True
+
+        Returns:
+            bool: 是否成功
+        """
+        return self._transaction(self._finish, lease_id, PENDING if retry else FAILED)
+
+    def extend(self, lease_id, timeout=None):
+        """
+        延长领取的可见性超时（处理时间较长时调用）
+
+        Args:
+            lease_id (int): Lease.id
+            timeout (float, optional): 从现在起的超时秒数，默认为visibility_timeout
+
+        Returns:
+            bool: 是否成功
+        """
+        until = time.time() + (timeout if timeout is not None else self.visibility_timeout)
+        def update():
+            return self.conn.execute(
+                "UPDATE entries SET lease_until = ? WHERE id = ? AND state = ? AND worker = ?",
+                (until, lease_id, LEASED, self.worker_id)
+            ).rowcount > 0
+        return self._transaction(update)
+
+    def seen(self, url, key=None):
+        """
+        判断URL是否曾经入队
+
+        Args:
+            url (str): URL
+            key (int, optional): 去重键，默认为None（使用规范化URL的指纹）
+
+        Returns:
+            bool: 是否曾经入队
+        """
+        key = _signed(key if key is not None else url_fingerprint(url))
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM entries WHERE queue = ? AND key = ?", (self.queue, key)
+            ).fetchone() is not None
+
+    def counts(self):
+        """
+        获取队列中各状态的URL数量
+
+        Returns:
+            dict: 'pending'、'leased'、'done'、'failed'的数量
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM entries WHERE queue = ? GROUP BY state", (self.queue,)
+            ).fetchall()
+        counts = dict(rows)
+        return {'pending': counts.get(PENDING, 0), 'leased': counts.get(LEASED, 0),
+                'done': counts.get(DONE, 0), 'failed': counts.get(FAILED, 0)}
+
+    def pending_count(self):
+        """
+        可领取的URL数量（不含已被领取的URL）
+
+        Returns:
+            int: 数量
+        """
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COALESCE(SUM(pending), 0) FROM hosts WHERE queue = ?", (self.queue,)
+            ).fetchone()[0]
+
+    def active_count(self, include_own=True, queues=None):
+        """
+        待领取和已被领取（所有进程）的URL数量之和，为0时整个队列已处理完
+
+        Args:
+            include_own (bool, optional): 是否计入当前进程已领取的URL，默认为True
+            queues (list, optional): 统计的队列名称列表，默认为None（当前队列）
+
+        Returns:
+            int: 数量
+        """
+        queues = list(queues or [self.queue])
+        marks = ', '.join('?' * len(queues))
+        with self._lock:
+            count = self.conn.execute(
+                f"SELECT COALESCE(SUM(pending + leased), 0) FROM hosts WHERE queue IN ({marks})", queues
+            ).fetchone()[0]
+            if not include_own:
+                count -= self.conn.execute(
+                    f"SELECT COUNT(*) FROM entries WHERE queue IN ({marks}) AND state = ? AND worker = ?",
+                    queues + [LEASED, self.worker_id]
+                ).fetchone()[0]
+            return count
+
+    def release_all(self):
+        """
+        将当前进程领取但未确认的URL全部放回队列（进程正常退出前调用）
+
+        Returns:
+            int: 放回的URL数量
+        """
+        def release():
+            ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM entries WHERE queue = ? AND state = ? AND worker = ?",
+                (self.queue, LEASED, self.worker_id)
+            )]
+            return sum(self._finish(lease_id, PENDING) for lease_id in ids)
+        return self._transaction(release)
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+class SharedFrontierAdapter:
+    """
+    共享待爬取队列适配器，接口与CrawlFrontier相同，供BasicCrawler使用
+
+    pop()领取URL，done()确认。队列中暂时没有可领取的URL、但其他进程仍有未确认的URL
+    （可能还会加入新链接）时，如果当前进程也没有未确认的URL，判断队列是否为空会等待，直到有新URL或整个队列处理完。
+    asyncio中不能阻塞等待，使用pop_nowait()和waiting()，在线程池中调用，由调用方用asyncio.sleep()等待。
+    每个进程同时持有的URL不超过max_leased个，避免一个进程领走全部URL而其他进程空等。
+    """
+
+    def __init__(self, frontier, max_depth=None, poll_interval=1.0, batch_size=10, max_leased=None):
+        """
+        初始化适配器
+
+        Args:
+            frontier (SharedFrontier): 共享待爬取队列
+            max_depth (int, optional): 最大爬取深度，默认为None（不限制）
+            poll_interval (float, optional): 等待其他进程时检查队列的间隔（秒），默认为1秒
+            batch_size (int, optional): 每次最多领取的URL数量，默认为10
+            max_leased (int, optional): 本进程同时持有（已领取未确认）的最大URL数量，默认与batch_size相同
+        """
+        self.frontier = frontier
+        self.max_depth = max_depth
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_leased = max_leased or batch_size
+        self._buffer = []
+        # 已领取但尚未确认的URL -> Lease.id
+        self._leased = {}
+
+    def push(self, url, depth=0):
+        """
+        将URL加入共享队列
+
+        Args:
+            url (str): 要加入的URL
+            depth (int, optional): URL的爬取深度，默认为0
+
+        Returns:
+            bool: 是否成功入队
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        return self.frontier.push(url, depth=depth)
+
+    def _fill(self):
+        """本地缓冲区为空、且持有的URL未达到上限时从共享队列领取一批URL"""
+        if not self._buffer:
+            n = min(self.batch_size, self.max_leased - len(self._leased))
+            if n > 0:
+                # 逆序保存，pop()从末尾取出
+                self._buffer = self.frontier.lease(n)[::-1]
+        return bool(self._buffer)
+
+    def pop(self):
+        """
+        领取下一个URL
+
+        Returns:
+            tuple: (URL, 爬取深度)
+
+        Raises:
+            IndexError: 没有可领取的URL
+        """
+        if not self._fill():
+            raise IndexError("pop from an empty frontier")
+        lease = self._buffer.pop()
+        self._leased[lease.url] = lease.id
+        return lease.url, lease.depth
+
+    def pop_nowait(self):
+        """
+        领取下一个URL，没有可领取的URL时不等待其他进程
+
+        Returns:
+            tuple: (URL, 爬取深度)，没有可领取的URL时返回None
+        """
+        if not self._fill():
+            return None
+        return self.pop()
+
+    def waiting(self):
+        """
+        没有可领取的URL时，是否应该等待其他进程加入新URL
+
+        Returns:
+            bool: 当前进程没有未确认的URL、而其他进程还有时返回True
+        """
+        return not self._leased and self.frontier.active_count() > 0
+
+    def done(self, url):
+        """
+        确认URL已处理完成
+
+        Args:
+            url (str): 已处理完成的URL
+        """
+        lease_id = self._leased.pop(url, None)
+        if lease_id is not None:
+            self.frontier.ack(lease_id)
+
+    def seen(self, url):
+        """
+        判断URL是否曾经入队
+
+        Args:
+            url (str): URL
+
+        Returns:
+            bool: 是否曾经入队
+        """
+        return self.frontier.seen(url)
+
+    def close(self):
+        """将未处理的URL放回共享队列"""
+        for lease in self._buffer:
+            self.frontier.nack(lease.id)
+        self._buffer = []
+        for lease_id in self._leased.values():
+            self.frontier.nack(lease_id)
+        self._leased = {}
+
+    def __len__(self):
+        """本地缓冲区和共享队列中可领取的URL数量"""
+        return len(self._buffer) + self.frontier.pending_count()
+
+    def __bool__(self):
+        """是否还有可领取的URL，必要时等待其他进程"""
+        while True:
+            if self._fill():
+                return True
+            # 当前进程还有未确认的URL时不等待（包括已达到持有上限），由调用方继续处理
+            if not self.waiting():
+                return False
+            time.sleep(self.poll_interval)
+
+if __name__ == "__main__":
+    # 测试
+    with SharedFrontier("crawler/data/test_frontier.db", queue="test", visibility_timeout=1) as frontier:
+        frontier.push_many([("https://a.com/1", 0), ("https://a.com/2", 0), ("https://b.com/1", 0)])
+        leases = frontier.lease(3)
+        print([lease.url for lease in leases])  # 按主机轮流：a.com、b.com、a.com
+        frontier.ack(leases[0].id)
+        time.sleep(1.1)
+        print([lease.url for lease in frontier.lease(3)])  # 超时未确认的URL重新回到队列
+        print(frontier.counts())
@@ -0,0 +1,247 @@
+"""
+SQLite存储工具模块，将爬取结果按URL保存到SQLite数据库中，多次运行的结果自动合并去重
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from .logger import crawler_logger as logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    url TEXT PRIMARY KEY,
+    domain TEXT,
+    title TEXT,
+    publish_time TEXT,
+    crawl_time TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_domain ON records (domain);
+CREATE INDEX IF NOT EXISTS idx_records_crawl_time ON records (crawl_time);
+CREATE INDEX IF NOT EXISTS idx_records_publish_time ON records (publish_time);
+"""
+
+# 按URL插入或更新，同一URL只保留最新的记录
+_UPSERT = """
+INSERT INTO records (url, domain, title, publish_time, crawl_time, data, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    domain = excluded.domain,
+    title = excluded.title,
+    publish_time = excluded.publish_time,
+    crawl_time = excluded.crawl_time,
+    data = excluded.data,
+    updated_at = excluded.updated_at
+"""
+
+def _time_str(value):
+    """将datetime转换为与记录中相同格式的时间字符串"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+class SqliteStorage:
+    """
+    SQLite存储（WAL模式）
+
+    记录以URL为主键保存，重复的URL会更新为最新的记录。write()写入的记录先放在缓冲区中，
+    每batch_size条在一个事务中用executemany批量写入。url、crawl_time、publish_time和域名都有索引，
+    可以按时间或域名查询。完整的记录以JSON保存，查询时原样返回。
+    """
+
+    def __init__(self, db_path="crawler/data/crawl_results.db", batch_size=500):
+        """
+        初始化SQLite存储
+
+        Args:
+            db_path (str, optional): 数据库文件路径，默认为'crawler/data/crawl_results.db'
+            batch_size (int, optional): 每多少条记录批量写入一次，默认为500
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None时由本类自行管理事务
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row(record):
+        """将记录转换为数据库中的一行，没有url的记录返回None"""
+        url = record.get('url')
+        if not url:
+            return None
+        domain = (urlsplit(url).hostname or '').lower()
+        return (
+            url, domain, record.get('title'), _time_str(record.get('publish_time')),
+            _time_str(record.get('crawl_time')), json.dumps(dict(record), ensure_ascii=False, default=str),
+            time.time()
+        )
+
+    def upsert(self, records):
+        """
+        在一个事务中批量插入或更新记录
+
+        Args:
+            records (iterable): 记录，每个元素为一个字典
+
+        Returns:
+            int: 写入的记录数
+        """
+        rows = []
+        for record in records:
+            row = self._row(record)
+            if row is None:
+                logger.warning(f"记录没有url，不会保存到SQLite: {record}")
+                continue
+            rows.append(row)
+        if not rows:
+            return 0
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(_UPSERT, rows)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def write(self, record):
+        """
+        写入一条记录（先放入缓冲区，达到batch_size条时批量写入）
+
+        Args:
+            record (dict): 记录
+        """
+        self._pending.append(record)
+        self.count += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """将缓冲区中的记录写入数据库"""
+        records, self._pending = self._pending, []
+        self.upsert(records)
+
+    def get(self, url):
+        """
+        按URL获取记录
+
+        Args:
+            url (str): URL
+
+        Returns:
+            dict: 记录，不存在时返回None
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM records WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _query(self, sql, params):
+        """执行查询，逐条返回记录"""
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def since(self, crawl_time, field='crawl_time', limit=None):
+        """
+        查询某个时间之后（含）的记录，按时间排序
+
+        Args:
+            crawl_time (str/datetime): 起始时间，字符串格式为'YYYY-MM-DD HH:MM:SS'
+            field (str, optional): 比较的时间字段，可选值为'crawl_time', 'publish_time'，默认为'crawl_time'
+            limit (int, optional): 最多返回的记录数，默认为None（不限制）
+
+        Yields:
+            dict: 记录
+
+        Raises:
+            ValueError: field不是支持的时间字段
+        """
+        if field not in ('crawl_time', 'publish_time'):
+            raise ValueError(f"不支持的时间字段: {field}")
+        sql = f"SELECT data FROM records WHERE {field} >= ? ORDER BY {field}"
+        params = [_time_str(crawl_time)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def by_domain(self, domain, limit=None):
+        """
+        查询某个域名的记录，按爬取时间排序
+
+        Args:
+            domain (str): 域名，如'news.sina.com.cn'
+            limit (int, optional): 最多返回的记录数，默认为None（不限制）
+
+        Yields:
+            dict: 记录
+        """
+        sql = "SELECT data FROM records WHERE domain = ? ORDER BY crawl_time"
+        params = [domain.lower()]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def __contains__(self, url):
+        """判断URL是否已保存"""
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM records WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        """已保存的记录数量（不含缓冲区中的记录）"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        """
+        写入缓冲区中的记录并关闭数据库
+
+        Returns:
+            str: 数据库文件路径
+        """
+        if self.conn is None:
+            return self.db_path
+        self.flush()
+        with self._lock:
+            self.conn.close()
+            self.conn = None
+        logger.info(f"数据已保存到SQLite: {self.db_path} ({self.count} 条)")
+        return self.db_path
+
+    def __enter__(self):
+        """上下文管理器入口"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """上下文管理器出口"""
+        self.close()
+
+if __name__ == "__main__":
+    # 测试
+    with SqliteStorage("crawler/data/test_results.db") as storage:
+        storage.write({"url": "https://example.com/1", "title": "测试1", "crawl_time": "2024-01-01 10:00:00"})
+        storage.write({"url": "https://example.com/2", "title": "测试2", "crawl_time": "2024-01-02 10:00:00"})
+        storage.write({"url": "https://example.com/1", "title": "测试1（更新）", "crawl_time": "2024-01-03 10:00:00"})
+        storage.flush()
+        print("记录数:", len(storage))
+        print("2024-01-02之后:", list(storage.since("2024-01-02 00:00:00")))
+        print("example.com:", list(storage.by_domain("example.com")))
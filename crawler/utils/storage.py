@@ -2,13 +2,724 @@
 数据存储工具模块，用于保存爬取的数据
 """
 import os
+import io
 import json
 import csv
+import gzip
+import threading
 import pandas as pd
 from datetime import datetime
 
+from .sqlite_storage import SqliteStorage
+from .background_writer import BackgroundWriter
 from .logger import crawler_logger as logger
 
+class JsonSink:
+    """
+    JSON文件写入器，逐条写入记录，输出与json.dump(列表)相同格式的JSON数组
+
+    记录写入后不在内存中保留，每flush_every条刷新一次缓冲区，中断时已写入的记录仍在文件中。
+    """
+
+    def __init__(self, filepath, ensure_ascii=False, indent=2, flush_every=100):
+        """
+        初始化JSON文件写入器
+
+        Args:
+            filepath (str): 文件路径
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            indent (int, optional): 缩进空格数，默认为2
+            flush_every (int, optional): 每写入多少条记录刷新一次缓冲区，默认为100
+        """
+        self.filepath = filepath
+        self.ensure_ascii = ensure_ascii
+        self.indent = indent
+        self.flush_every = flush_every
+        self.count = 0
+        self.file = open(filepath, 'w', encoding='utf-8')
+
+    def write(self, record):
+        """
+        写入一条记录
+
+        Args:
+            record (dict): 记录
+        """
+        text = json.dumps(record, ensure_ascii=self.ensure_ascii, indent=self.indent)
+        if self.indent is not None:
+            # 数组元素比数组本身多缩进一级
+            pad = ' ' * self.indent
+            text = '\n'.join(pad + line for line in text.split('\n'))
+            self.file.write(('[\n' if self.count == 0 else ',\n') + text)
+        else:
+            self.file.write(('[' if self.count == 0 else ', ') + text)
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.file.flush()
+
+    def flush(self):
+        """将缓冲区中的内容写入文件"""
+        if self.file is not None:
+            self.file.flush()
+
+    def fsync(self):
+        """将已写入的记录同步到磁盘（数组结尾在close()时写入）"""
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        """
+        写入数组结尾并关闭文件
+
+        Returns:
+            str: 文件路径
+        """
+        if self.file is None:
+            return self.filepath
+        if self.count == 0:
+            self.file.write('[]')
+        else:
+            self.file.write('\n]' if self.indent is not None else ']')
+        # 关闭前同步到磁盘，返回后文件内容完整
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+        logger.info(f"数据已保存为JSON: {self.filepath} ({self.count} 条)")
+        return self.filepath
+
+class CsvSink:
+    """
+    CSV文件写入器，逐条写入记录
+
+    表头根据前sample_size条记录确定，字段按首次出现的顺序排列，每次运行的列顺序都相同；
+    之后的记录每batch_size条用writerows写入一次。表头确定后才出现的字段按late_fields处理：
+    'ignore'不写入并记录警告；'extra_file'写入旁边的<文件名>.extra.csv（行号、字段名、值）；
+    'rewrite'先把值追加在行末，关闭时如果出现过新字段，再把文件重写一遍补全表头和空列。
+    没有任何记录时不创建文件。
+    """
+
+    LATE_FIELD_POLICIES = ('ignore', 'extra_file', 'rewrite')
+
+    def __init__(self, filepath, encoding='utf-8', sample_size=100, batch_size=1000, late_fields='rewrite'):
+        """
+        初始化CSV文件写入器
+
+        Args:
+            filepath (str): 文件路径
+            encoding (str, optional): 文件编码，默认为'utf-8'
+            sample_size (int, optional): 根据前多少条记录确定表头，默认为100
+            batch_size (int, optional): 每多少条记录写入一次，默认为1000
+            late_fields (str, optional): 表头确定后出现的新字段的处理方式，可选值为'ignore', 'extra_file', 'rewrite'，
+                默认为'rewrite'
+
+        Raises:
+            ValueError: late_fields不是支持的处理方式
+        """
+        if late_fields not in self.LATE_FIELD_POLICIES:
+            raise ValueError(f"不支持的新字段处理方式: {late_fields}，可选值为{self.LATE_FIELD_POLICIES}")
+        self.filepath = filepath
+        self.encoding = encoding
+        self.sample_size = max(1, sample_size)
+        self.batch_size = batch_size
+        self.late_fields = late_fields
+        self.count = 0
+        self.file = None
+        self.writer = None
+        self.fieldnames = None
+        self.extra_fieldnames = []
+        self._pending = []
+        self._extra_file = None
+        self._extra_writer = None
+        self._warned_fields = set()
+
+    @property
+    def extra_filepath(self):
+        """late_fields为'extra_file'时新字段写入的文件路径"""
+        root, ext = os.path.splitext(self.filepath)
+        return f"{root}.extra{ext or '.csv'}"
+
+    def write(self, record):
+        """
+        写入一条记录
+
+        Args:
+            record (dict): 记录
+        """
+        self._pending.append(record)
+        self.count += 1
+        if self.writer is None:
+            if len(self._pending) >= self.sample_size:
+                self._open()
+        elif len(self._pending) >= self.batch_size:
+            self._write_pending()
+
+    def flush(self):
+        """将缓存的记录写入文件（表头尚未确定时不写入）"""
+        if self.writer is not None:
+            self._write_pending()
+
+    def fsync(self):
+        """
+        将缓存的记录写入文件并同步到磁盘
+
+        表头尚未确定时按已缓存的记录确定表头，之后出现的新字段按late_fields处理。
+        """
+        if self.writer is None:
+            if not self._pending:
+                return
+            self._open()
+        else:
+            self._write_pending()
+        os.fsync(self.file.fileno())
+        if self._extra_file is not None:
+            self._extra_file.flush()
+            os.fsync(self._extra_file.fileno())
+
+    def _open(self):
+        """根据已缓存的记录确定表头并打开文件"""
+        fieldnames = {}
+        for record in self._pending:
+            fieldnames.update(dict.fromkeys(record))
+        self.fieldnames = list(fieldnames)
+        self.file = open(self.filepath, 'w', encoding=self.encoding, newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.fieldnames)
+        self._write_pending()
+
+    def _write_pending(self):
+        """将缓存的记录写入文件"""
+        records, self._pending = self._pending, []
+        if not records:
+            return
+        known = set(self.fieldnames)
+        known.update(self.extra_fieldnames)
+        columns = self.fieldnames + self.extra_fieldnames
+        rows = []
+        first_row = self.count - len(records) + 1
+        for i, record in enumerate(records):
+            if record.keys() - known:
+                columns = self._handle_late_fields(record, known, first_row + i)
+            rows.append([record.get(field) for field in columns])
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def _handle_late_fields(self, record, known, row_number):
+        """
+        处理表头中没有的字段
+
+        Returns:
+            list: 之后的行要写入的列
+        """
+        extra = [field for field in record if field not in known]
+        if self.late_fields == 'rewrite':
+            self.extra_fieldnames.extend(extra)
+            known.update(extra)
+        else:
+            new_fields = set(extra) - self._warned_fields
+            if new_fields:
+                if self.late_fields == 'ignore':
+                    logger.warning(f"CSV表头中没有以下字段，将不会写入: {sorted(new_fields)}")
+                else:
+                    logger.warning(f"CSV表头中没有以下字段，将写入 {self.extra_filepath}: {sorted(new_fields)}")
+                self._warned_fields.update(new_fields)
+            if self.late_fields == 'extra_file':
+                if self._extra_writer is None:
+                    self._extra_file = open(self.extra_filepath, 'w', encoding=self.encoding, newline='')
+                    self._extra_writer = csv.writer(self._extra_file)
+                    self._extra_writer.writerow(['row', 'field', 'value'])
+                self._extra_writer.writerows([row_number, field, record[field]] for field in extra)
+        return self.fieldnames + self.extra_fieldnames
+
+    def _rewrite(self):
+        """重写文件，表头加上后出现的字段，较短的行补齐空列"""
+        header = self.fieldnames + self.extra_fieldnames
+        tmp_path = f"{self.filepath}.tmp"
+        with open(self.filepath, 'r', encoding=self.encoding, newline='') as src, \
+                open(tmp_path, 'w', encoding=self.encoding, newline='') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            next(reader)
+            writer.writerow(header)
+            padding = [''] * len(header)
+            batch = []
+            for row in reader:
+                batch.append(row + padding[len(row):])
+                if len(batch) >= self.batch_size:
+                    writer.writerows(batch)
+                    batch = []
+            writer.writerows(batch)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.filepath)
+        logger.info(f"CSV表头已补充字段: {self.extra_fieldnames}")
+
+    def close(self):
+        """
+        写入剩余记录并关闭文件
+
+        Returns:
+            str: 文件路径，没有写入任何记录时返回None
+        """
+        if self.writer is None and self._pending:
+            self._open()
+        if self.file is None:
+            if self.count == 0:
+                logger.warning("没有数据可保存")
+            return None
+        self._write_pending()
+        # 关闭前同步到磁盘，返回后文件内容完整
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+        if self._extra_file is not None:
+            self._extra_file.flush()
+            os.fsync(self._extra_file.fileno())
+            self._extra_file.close()
+            self._extra_file = None
+        if self.extra_fieldnames:
+            self._rewrite()
+        logger.info(f"数据已保存为CSV: {self.filepath} ({self.count} 条)")
+        return self.filepath
+
+class JsonlWriter:
+    """
+    JSON Lines文件写入器，每行一条JSON记录，可以追加写入
+
+    写入的文本先放在缓冲区中，每flush_every条写入文件；sync控制何时将数据同步到磁盘：
+    'never'不主动同步，由操作系统决定；'close'在关闭时调用fsync；'flush'在每次刷新缓冲区时都调用fsync，
+    最安全但最慢。
+    """
+
+    SYNC_POLICIES = ('never', 'close', 'flush')
+
+    def __init__(self, filepath, append=False, ensure_ascii=False, flush_every=100, sync='close',
+                 buffer_size=1024 * 1024):
+        """
+        初始化JSON Lines文件写入器
+
+        Args:
+            filepath (str): 文件路径
+            append (bool, optional): 是否追加到已有文件末尾，默认为False（覆盖）
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            flush_every (int, optional): 每写入多少条记录刷新一次缓冲区，默认为100
+            sync (str, optional): 同步到磁盘的策略，可选值为'never', 'close', 'flush'，默认为'close'
+            buffer_size (int, optional): 文件缓冲区大小（字节），默认为1MB
+
+        Raises:
+            ValueError: sync不是支持的策略
+        """
+        if sync not in self.SYNC_POLICIES:
+            raise ValueError(f"不支持的同步策略: {sync}，可选值为{self.SYNC_POLICIES}")
+        self.filepath = filepath
+        self.ensure_ascii = ensure_ascii
+        self.flush_every = flush_every
+        self.sync = sync
+        self.count = 0
+        self._pending = []
+        self.file = open(filepath, 'a' if append else 'w', encoding='utf-8', buffering=buffer_size)
+        # 追加到中断时留下的不完整行后面会破坏两条记录，先补一个换行
+        if append and self.file.tell() > 0 and not self._ends_with_newline(filepath):
+            self.file.write('\n')
+
+    @staticmethod
+    def _ends_with_newline(filepath):
+        """判断文件是否以换行符结尾"""
+        with open(filepath, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def write(self, record):
+        """
+        写入一条记录
+
+        Args:
+            record (dict): 记录
+        """
+        self._pending.append(json.dumps(record, ensure_ascii=self.ensure_ascii))
+        self.count += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def write_many(self, records):
+        """
+        写入多条记录
+
+        Args:
+            records (iterable): 记录
+        """
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """将缓冲区中的记录写入文件"""
+        if self._pending:
+            self.file.write('\n'.join(self._pending) + '\n')
+            self._pending = []
+        self.file.flush()
+        if self.sync == 'flush':
+            os.fsync(self.file.fileno())
+
+    def fsync(self):
+        """将缓冲区中的记录写入文件并同步到磁盘（不受sync策略限制）"""
+        self.flush()
+        if self.sync != 'flush':
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        """
+        写入剩余记录并关闭文件
+
+        Returns:
+            str: 文件路径
+        """
+        if self.file is None:
+            return self.filepath
+        self.flush()
+        if self.sync == 'close':
+            os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+        logger.info(f"数据已保存为JSON Lines: {self.filepath} ({self.count} 条)")
+        return self.filepath
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# 已知字段的Parquet类型（NewsItem和BasicCrawler记录中的字段），其他字段的类型根据第一批记录推断
+PARQUET_FIELD_TYPES = {
+    'url': 'string',
+    'title': 'string',
+    'content': 'string',
+    'content_preview': 'string',
+    'publish_time': 'string',
+    'author': 'string',
+    'category': 'string',
+    'tags': 'list<string>',
+    'crawl_time': 'string',
+}
+
+def _import_pyarrow():
+    """导入pyarrow（可选依赖，只在使用Parquet时需要）"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("保存Parquet需要安装pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+class ParquetSink:
+    """
+    Parquet文件写入器，按批写入行组（row group）
+
+    记录先在内存中积累batch_size条，然后作为一个压缩的行组写入文件，内存占用不随记录数增长。
+    文件的schema在写入第一批记录时确定：PARQUET_FIELD_TYPES中的字段使用固定类型，其他字段根据第一批记录推断，
+    之后出现的新字段不会写入并会记录警告，无法转换为列类型的值写为null。没有任何记录时不创建文件。
+    """
+
+    def __init__(self, filepath, batch_size=10000, compression='zstd', field_types=None):
+        """
+        初始化Parquet文件写入器
+
+        Args:
+            filepath (str): 文件路径
+            batch_size (int, optional): 每个行组的记录数，默认为10000
+            compression (str, optional): 压缩算法，如'zstd', 'snappy', 'gzip'，默认为'zstd'
+            field_types (dict, optional): 字段类型，会覆盖PARQUET_FIELD_TYPES中的同名字段，
+                类型为'string', 'list<string>'或pyarrow类型，默认为None
+
+        Raises:
+            ImportError: 没有安装pyarrow
+        """
+        self.pa, self.pq = _import_pyarrow()
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.compression = compression
+        self.field_types = dict(PARQUET_FIELD_TYPES, **(field_types or {}))
+        self.count = 0
+        self.schema = None
+        self.writer = None
+        self._rows = []
+        self._warned_fields = set()
+
+    def _resolve_type(self, type_name):
+        """将类型名称转换为pyarrow类型"""
+        if type_name == 'string':
+            return self.pa.string()
+        if type_name == 'list<string>':
+            return self.pa.list_(self.pa.string())
+        return type_name
+
+    def _infer_schema(self, rows):
+        """根据第一批记录确定schema，字段按首次出现的顺序排列"""
+        names = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+
+        fields = []
+        for name in names:
+            if name in self.field_types:
+                field_type = self._resolve_type(self.field_types[name])
+            else:
+                try:
+                    field_type = self.pa.array([row.get(name) for row in rows]).type
+                except (self.pa.ArrowInvalid, self.pa.ArrowTypeError, OverflowError):
+                    field_type = self.pa.string()
+                # 全部为空或类型不统一的字段按字符串保存
+                if self.pa.types.is_null(field_type):
+                    field_type = self.pa.string()
+            fields.append(self.pa.field(name, field_type))
+        return self.pa.schema(fields)
+
+    @staticmethod
+    def _to_string(value):
+        """将值转换为字符串列的值"""
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (dict, list, tuple)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+
+    @classmethod
+    def _to_string_list(cls, value):
+        """将值转换为字符串列表列的值，单个值作为只有一个元素的列表"""
+        if value is None:
+            return None
+        if isinstance(value, (list, tuple, set)):
+            return [cls._to_string(v) for v in value]
+        return [cls._to_string(value)]
+
+    def _column(self, field, values):
+        """将一列值转换为pyarrow数组"""
+        pa = self.pa
+        if field.type == pa.string():
+            values = [self._to_string(v) for v in values]
+        elif field.type == pa.list_(pa.string()):
+            values = [self._to_string_list(v) for v in values]
+        try:
+            return pa.array(values, type=field.type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            # 逐个转换，无法转换的值写为null
+            converted = []
+            for v in values:
+                try:
+                    pa.array([v], type=field.type)
+                    converted.append(v)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                    converted.append(None)
+            logger.warning(f"字段 {field.name} 中有无法转换为 {field.type} 的值，已写为null")
+            return pa.array(converted, type=field.type)
+
+    def write(self, record):
+        """
+        写入一条记录
+
+        Args:
+            record (dict): 记录
+        """
+        self._rows.append(dict(record))
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self):
+        """将积累的记录写为一个行组"""
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        if self.writer is None:
+            self.schema = self._infer_schema(rows)
+            self.writer = self.pq.ParquetWriter(self.filepath, self.schema, compression=self.compression)
+
+        names = set(self.schema.names)
+        extra = set()
+        for row in rows:
+            extra.update(row.keys() - names)
+        extra -= self._warned_fields
+        if extra:
+            logger.warning(f"Parquet schema中没有以下字段，将不会写入: {sorted(extra)}")
+            self._warned_fields.update(extra)
+
+        columns = [self._column(field, [row.get(field.name) for row in rows]) for field in self.schema]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        """
+        写入剩余记录并关闭文件
+
+        Returns:
+            str: 文件路径，没有写入任何记录时返回None
+        """
+        self._write_batch()
+        if self.writer is None:
+            if self.count == 0:
+                logger.warning("没有数据可保存")
+            return None
+        self.writer.close()
+        self.writer = None
+        logger.info(f"数据已保存为Parquet: {self.filepath} ({self.count} 条)")
+        return self.filepath
+
+def _import_zstd():
+    """导入zstandard（可选依赖），没有安装时返回None"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def _open_compressed(filepath, mode='rb'):
+    """按扩展名打开文件，.gz和.zst文件自动解压，返回二进制文件对象"""
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, mode)
+    if filepath.endswith('.zst'):
+        zstandard = _import_zstd()
+        if zstandard is None:
+            raise ImportError("读取.zst文件需要安装zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(filepath, mode))
+    return open(filepath, mode)
+
+class ShardedWriter:
+    """
+    分片JSON Lines写入器
+
+    记录以JSON Lines格式流式写入并压缩，当前分片的记录数达到max_records或未压缩大小达到max_bytes时
+    切换到新的分片文件。关闭时在目录中写入manifest.json，列出每个分片的文件名和记录数，
+    下游可以并行处理各个分片。
+    """
+
+    COMPRESSIONS = ('auto', 'zstd', 'gzip', None)
+
+    def __init__(self, directory, prefix="part", max_records=100000, max_bytes=64 * 1024 * 1024,
+                 compression='auto', ensure_ascii=False):
+        """
+        初始化分片写入器
+
+        Args:
+            directory (str): 分片文件所在目录，不存在时创建
+            prefix (str, optional): 分片文件名前缀，默认为'part'
+            max_records (int, optional): 每个分片的最大记录数，默认为100000，为None时不限制
+            max_bytes (int, optional): 每个分片的最大未压缩大小（字节），默认为64MB，为None时不限制
+            compression (str, optional): 压缩算法，可选值为'auto', 'zstd', 'gzip', None，
+                默认为'auto'（安装了zstandard时使用zstd，否则使用gzip）
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+
+        Raises:
+            ValueError: compression不是支持的压缩算法
+            ImportError: compression为'zstd'但没有安装zstandard
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"不支持的压缩算法: {compression}，可选值为{self.COMPRESSIONS}")
+        self._zstd = _import_zstd() if compression in ('auto', 'zstd') else None
+        if compression == 'zstd' and self._zstd is None:
+            raise ImportError("使用zstd压缩需要安装zstandard: pip install zstandard")
+        if compression == 'auto':
+            compression = 'zstd' if self._zstd is not None else 'gzip'
+
+        self.directory = directory
+        self.prefix = prefix
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.ensure_ascii = ensure_ascii
+        self.count = 0
+        self.shards = []
+        self._file = None
+        self._raw = None
+        self._shard_records = 0
+        self._shard_bytes = 0
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        """清单文件路径"""
+        return os.path.join(self.directory, "manifest.json")
+
+    def _open_shard(self):
+        """打开新的分片文件"""
+        ext = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}.get(self.compression, '.jsonl')
+        filename = f"{self.prefix}-{len(self.shards):05d}{ext}"
+        filepath = os.path.join(self.directory, filename)
+        if self.compression == 'zstd':
+            self._raw = open(filepath, 'wb')
+            self._file = self._zstd.ZstdCompressor(level=3).stream_writer(self._raw)
+        elif self.compression == 'gzip':
+            self._raw = None
+            self._file = gzip.open(filepath, 'wb', compresslevel=6)
+        else:
+            self._raw = None
+            self._file = open(filepath, 'wb')
+        self.shards.append({'file': filename, 'records': 0, 'bytes': 0})
+        self._shard_records = 0
+        self._shard_bytes = 0
+
+    def _close_shard(self):
+        """关闭当前分片，在清单中记录它的记录数和大小"""
+        if self._file is None:
+            return
+        self._file.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+        self._file = None
+        self._raw = None
+        shard = self.shards[-1]
+        shard['records'] = self._shard_records
+        shard['bytes'] = self._shard_bytes
+        shard['compressed_bytes'] = os.path.getsize(os.path.join(self.directory, shard['file']))
+        logger.debug(f"分片已写入: {shard['file']} ({shard['records']} 条)")
+
+    def write(self, record):
+        """
+        写入一条记录
+
+        Args:
+            record (dict): 记录
+        """
+        if self._file is None:
+            self._open_shard()
+        line = (json.dumps(record, ensure_ascii=self.ensure_ascii) + '\n').encode('utf-8')
+        self._file.write(line)
+        self._shard_records += 1
+        self._shard_bytes += len(line)
+        self.count += 1
+        if ((self.max_records is not None and self._shard_records >= self.max_records)
+                or (self.max_bytes is not None and self._shard_bytes >= self.max_bytes)):
+            self._close_shard()
+
+    def close(self):
+        """
+        关闭当前分片并写入清单
+
+        Returns:
+            str: 清单文件路径
+        """
+        if self.closed:
+            return self.manifest_path
+        self._close_shard()
+        self.closed = True
+        manifest = {
+            'format': 'jsonl',
+            'compression': self.compression,
+            'records': self.count,
+            'shards': self.shards,
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        logger.info(f"数据已保存为 {len(self.shards)} 个分片: {self.directory} ({self.count} 条)")
+        return self.manifest_path
+
+# 本进程已分配的带时间戳的文件路径（有些写入器在写入第一条记录时才创建文件）
+_reserved_paths = set()
+_reserved_lock = threading.Lock()
+
 class DataStorage:
     """数据存储类，提供多种数据存储方法"""
     
@@ -37,29 +748,171 @@ class DataStorage:
         """
         生成文件名
         
+        带时间戳的文件名同一秒内可能重复，此时在末尾加上序号，不会覆盖已有的文件。
+        
         Args:
             name (str): 文件名前缀
-            ext (str): 文件扩展名
+            ext (str): 文件扩展名，为None时不添加扩展名（用于目录）
             timestamp (bool, optional): 是否添加时间戳，默认为True
             
         Returns:
             str: 完整的文件路径
         """
-        if timestamp:
-            # 添加时间戳，格式为：name_YYYYMMDD_HHMMSS.ext
-            time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{name}_{time_str}.{ext}"
-        else:
-            filename = f"{name}.{ext}"
+        suffix = f".{ext}" if ext else ""
+        if not timestamp:
+            return os.path.join(self.data_dir, f"{name}{suffix}")
         
-        return os.path.join(self.data_dir, filename)
+        # 添加时间戳，格式为：name_YYYYMMDD_HHMMSS.ext，重复时为name_YYYYMMDD_HHMMSS_1.ext
+        time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.data_dir, f"{name}_{time_str}")
+        with _reserved_lock:
+            filepath = f"{base}{suffix}"
+            n = 0
+            while filepath in _reserved_paths or os.path.exists(filepath):
+                n += 1
+                filepath = f"{base}_{n}{suffix}"
+            _reserved_paths.add(filepath)
+        return filepath
+    
+    def open_json_sink(self, name="data", timestamp=True, ensure_ascii=False, indent=2):
+        """
+        创建逐条写入的JSON文件写入器
+        
+        Args:
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            indent (int, optional): 缩进空格数，默认为2
+            
+        Returns:
+            JsonSink: JSON文件写入器，写入完成后需调用close()
+        """
+        return JsonSink(self._get_filename(name, "json", timestamp), ensure_ascii=ensure_ascii, indent=indent)
+    
+    def open_csv_sink(self, name="data", timestamp=True, encoding='utf-8', sample_size=100, late_fields='rewrite'):
+        """
+        创建逐条写入的CSV文件写入器
+        
+        Args:
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            encoding (str, optional): 文件编码，默认为'utf-8'
+            sample_size (int, optional): 根据前多少条记录确定表头，默认为100
+            late_fields (str, optional): 表头确定后出现的新字段的处理方式，可选值为'ignore', 'extra_file', 'rewrite'，
+                默认为'rewrite'
+            
+        Returns:
+            CsvSink: CSV文件写入器，写入完成后需调用close()
+        """
+        return CsvSink(self._get_filename(name, "csv", timestamp), encoding=encoding, sample_size=sample_size,
+                       late_fields=late_fields)
+    
+    def open_jsonl_sink(self, name="data", timestamp=True, append=False, ensure_ascii=False, flush_every=100,
+                        sync='close'):
+        """
+        创建JSON Lines文件写入器
+        
+        Args:
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            append (bool, optional): 是否追加到已有文件末尾，默认为False
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            flush_every (int, optional): 每写入多少条记录刷新一次缓冲区，默认为100
+            sync (str, optional): 同步到磁盘的策略，可选值为'never', 'close', 'flush'，默认为'close'
+            
+        Returns:
+            JsonlWriter: JSON Lines文件写入器，写入完成后需调用close()
+        """
+        return JsonlWriter(self._get_filename(name, "jsonl", timestamp), append=append, ensure_ascii=ensure_ascii,
+                           flush_every=flush_every, sync=sync)
+    
+    def open_parquet_sink(self, name="data", timestamp=True, batch_size=10000, compression='zstd'):
+        """
+        创建按行组写入的Parquet文件写入器
+        
+        Args:
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            batch_size (int, optional): 每个行组的记录数，默认为10000
+            compression (str, optional): 压缩算法，默认为'zstd'
+            
+        Returns:
+            ParquetSink: Parquet文件写入器，写入完成后需调用close()
+        """
+        return ParquetSink(self._get_filename(name, "parquet", timestamp), batch_size=batch_size,
+                           compression=compression)
+    
+    def open_sqlite_sink(self, name="crawl_results", batch_size=500):
+        """
+        打开数据目录下的SQLite数据库，按URL插入或更新记录
+        
+        与其他格式不同，数据库文件名不添加时间戳，多次运行的结果保存在同一个数据库中。
+        
+        Args:
+            name (str, optional): 数据库文件名前缀，默认为'crawl_results'
+            batch_size (int, optional): 每多少条记录批量写入一次，默认为500
+            
+        Returns:
+            SqliteStorage: SQLite存储，写入完成后需调用close()
+        """
+        return SqliteStorage(self._get_filename(name, "db", timestamp=False), batch_size=batch_size)
+    
+    def open_sharded_writer(self, name="data", timestamp=True, max_records=100000, max_bytes=64 * 1024 * 1024,
+                            compression='auto'):
+        """
+        创建分片JSON Lines写入器，分片文件保存在数据目录下以name命名的子目录中
+        
+        Args:
+            name (str, optional): 子目录名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            max_records (int, optional): 每个分片的最大记录数，默认为100000
+            max_bytes (int, optional): 每个分片的最大未压缩大小（字节），默认为64MB
+            compression (str, optional): 压缩算法，可选值为'auto', 'zstd', 'gzip', None，默认为'auto'
+            
+        Returns:
+            ShardedWriter: 分片写入器，写入完成后需调用close()
+        """
+        return ShardedWriter(self._get_filename(name, None, timestamp), max_records=max_records,
+                             max_bytes=max_bytes, compression=compression)
+    
+    def background_writer(self, sink, max_queue=10000, batch_size=500):
+        """
+        用后台线程包装写入器，调用方线程的write()只把记录放入队列，不等待磁盘写入
+        
+        Args:
+            sink: open_*_sink()等方法返回的写入器
+            max_queue (int, optional): 队列中最多等待写入的记录数，队列满时write()阻塞，默认为10000
+            batch_size (int, optional): 后台线程每批最多写入的记录数，默认为500
+            
+        Returns:
+            BackgroundWriter: 后台写入器，接口与写入器相同，写入完成后需调用close()
+        """
+        return BackgroundWriter(sink, max_queue=max_queue, batch_size=batch_size)
+    
+    def _save_stream(self, sink, data):
+        """
+        将可迭代对象中的记录逐条写入写入器
+        
+        Args:
+            sink (JsonSink/CsvSink/JsonlWriter/ParquetSink/SqliteStorage/ShardedWriter): 写入器
+            data (iterable): 记录
+            
+        Returns:
+            str: 保存的文件路径
+        """
+        try:
+            for record in data:
+                sink.write(record)
+        finally:
+            filepath = sink.close()
+        return filepath
     
     def save_json(self, data, name="data", timestamp=True, ensure_ascii=False, indent=2):
         """
         保存数据为JSON文件
         
         Args:
-            data (dict/list): 要保存的数据
+            data (dict/list/iterable): 要保存的数据，为生成器等其他可迭代对象时逐条写入JSON数组
             name (str, optional): 文件名前缀，默认为'data'
             timestamp (bool, optional): 是否添加时间戳，默认为True
             ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
@@ -68,6 +921,14 @@ class DataStorage:
         Returns:
             str: 保存的文件路径
         """
+        if not isinstance(data, (dict, list)):
+            try:
+                sink = self.open_json_sink(name, timestamp, ensure_ascii=ensure_ascii, indent=indent)
+                return self._save_stream(sink, data)
+            except Exception as e:
+                logger.error(f"保存JSON失败: {str(e)}")
+                raise
+        
         filepath = self._get_filename(name, "json", timestamp)
         
         try:
@@ -80,44 +941,171 @@ class DataStorage:
             logger.error(f"保存JSON失败: {str(e)}")
             raise
     
-    def save_csv(self, data, name="data", timestamp=True, encoding='utf-8'):
+    def save_csv(self, data, name="data", timestamp=True, encoding='utf-8', sample_size=100, late_fields='rewrite'):
         """
-        保存数据为CSV文件
+        保存数据为CSV文件，逐条写入，只遍历一次数据
         
         Args:
-            data (list): 要保存的数据列表，每个元素为一个字典
+            data (iterable): 要保存的数据，每个元素为一个字典，可以是列表或生成器
             name (str, optional): 文件名前缀，默认为'data'
             timestamp (bool, optional): 是否添加时间戳，默认为True
             encoding (str, optional): 文件编码，默认为'utf-8'
+            sample_size (int, optional): 根据前多少条记录确定表头，默认为100
+            late_fields (str, optional): 表头确定后出现的新字段的处理方式，可选值为'ignore', 'extra_file', 'rewrite'，
+                默认为'rewrite'（保留所有字段）
             
         Returns:
-            str: 保存的文件路径
+            str: 保存的文件路径，没有数据时返回None
+        """
+        try:
+            sink = self.open_csv_sink(name, timestamp, encoding=encoding, sample_size=sample_size,
+                                      late_fields=late_fields)
+            return self._save_stream(sink, data)
+        except Exception as e:
+            logger.error(f"保存CSV失败: {str(e)}")
+            raise
+    
+    def save_jsonl(self, data, name="data", timestamp=True, ensure_ascii=False, flush_every=100, sync='close'):
         """
-        filepath = self._get_filename(name, "csv", timestamp)
+        保存数据为JSON Lines文件（每行一条记录），逐条写入，不需要将全部数据放在内存中
         
+        Args:
+            data (iterable): 要保存的记录，可以是列表或生成器
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            flush_every (int, optional): 每写入多少条记录刷新一次缓冲区，默认为100
+            sync (str, optional): 同步到磁盘的策略，可选值为'never', 'close', 'flush'，默认为'close'
+            
+        Returns:
+            str: 保存的文件路径
+        """
         try:
-            # 如果数据为空，返回
-            if not data:
-                logger.warning("没有数据可保存")
-                return None
+            sink = self.open_jsonl_sink(name, timestamp, ensure_ascii=ensure_ascii, flush_every=flush_every,
+                                        sync=sync)
+            return self._save_stream(sink, data)
+        except Exception as e:
+            logger.error(f"保存JSON Lines失败: {str(e)}")
+            raise
+    
+    def append_jsonl(self, data, name="data", ensure_ascii=False, sync='close'):
+        """
+        将记录追加到JSON Lines文件末尾，文件不存在时创建
+        
+        Args:
+            data (dict/iterable): 一条记录，或多条记录的可迭代对象
+            name (str, optional): 文件名前缀（不添加时间戳），默认为'data'
+            ensure_ascii (bool, optional): 是否确保ASCII编码，默认为False
+            sync (str, optional): 同步到磁盘的策略，可选值为'never', 'close', 'flush'，默认为'close'
             
-            # 获取所有字段名
-            fieldnames = set()
-            for item in data:
-                fieldnames.update(item.keys())
-            fieldnames = list(fieldnames)
+        Returns:
+            str: 文件路径
+        """
+        if isinstance(data, dict):
+            data = [data]
+        try:
+            sink = self.open_jsonl_sink(name, timestamp=False, append=True, ensure_ascii=ensure_ascii, sync=sync)
+            return self._save_stream(sink, data)
+        except Exception as e:
+            logger.error(f"追加JSON Lines失败: {str(e)}")
+            raise
+    
+    def save_parquet(self, data, name="data", timestamp=True, batch_size=10000, compression='zstd'):
+        """
+        保存数据为Parquet文件，按行组逐批写入
+        
+        Args:
+            data (iterable): 要保存的记录，可以是列表或生成器
+            name (str, optional): 文件名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            batch_size (int, optional): 每个行组的记录数，默认为10000
+            compression (str, optional): 压缩算法，默认为'zstd'
             
-            with open(filepath, 'w', encoding=encoding, newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data)
+        Returns:
+            str: 保存的文件路径，没有数据时返回None
+        """
+        try:
+            sink = self.open_parquet_sink(name, timestamp, batch_size=batch_size, compression=compression)
+            return self._save_stream(sink, data)
+        except Exception as e:
+            logger.error(f"保存Parquet失败: {str(e)}")
+            raise
+    
+    def save_sharded(self, data, name="data", timestamp=True, max_records=100000, max_bytes=64 * 1024 * 1024,
+                     compression='auto'):
+        """
+        保存数据为压缩的JSON Lines分片
+        
+        Args:
+            data (iterable): 要保存的记录，可以是列表或生成器
+            name (str, optional): 子目录名前缀，默认为'data'
+            timestamp (bool, optional): 是否添加时间戳，默认为True
+            max_records (int, optional): 每个分片的最大记录数，默认为100000
+            max_bytes (int, optional): 每个分片的最大未压缩大小（字节），默认为64MB
+            compression (str, optional): 压缩算法，可选值为'auto', 'zstd', 'gzip', None，默认为'auto'
             
-            logger.info(f"数据已保存为CSV: {filepath}")
-            return filepath
+        Returns:
+            str: 清单文件（manifest.json）路径
+        """
+        try:
+            writer = self.open_sharded_writer(name, timestamp, max_records=max_records, max_bytes=max_bytes,
+                                              compression=compression)
+            return self._save_stream(writer, data)
         except Exception as e:
-            logger.error(f"保存CSV失败: {str(e)}")
+            logger.error(f"保存分片失败: {str(e)}")
             raise
     
+    def save_formats(self, data, formats=None, name="data"):
+        """
+        将数据同时保存为多种格式
+        
+        data只遍历一次，逐条分发给各格式的写入器，写入在后台线程中进行，data为生成器时生产记录不会因为磁盘写入而等待；
+        只有需要保存Excel时才在内存中保留全部记录。
+        
+        Args:
+            data (iterable): 要保存的记录，可以是列表或生成器
+            formats (list, optional): 保存格式列表，可选值为'json', 'jsonl', 'csv', 'parquet', 'sqlite', 'sharded',
+                'excel'，默认为['json']；'sqlite'按URL插入或更新到<name>.db中，'sharded'保存为压缩的JSON Lines分片
+            name (str, optional): 文件名前缀，默认为'data'
+            
+        Returns:
+            dict: 保存的文件路径字典
+        """
+        if not formats:
+            formats = ['json']
+        
+        openers = {
+            'json': self.open_json_sink,
+            'jsonl': self.open_jsonl_sink,
+            'csv': self.open_csv_sink,
+            'parquet': self.open_parquet_sink,
+            'sqlite': self.open_sqlite_sink,
+            'sharded': self.open_sharded_writer,
+        }
+        unknown = set(formats) - set(openers) - {'excel'}
+        if unknown:
+            raise ValueError(f"不支持的保存格式: {sorted(unknown)}")
+        
+        result_files = {}
+        
+        # Excel需要全部数据才能写入，只有这种情况才在内存中保留记录
+        if 'excel' in formats and not isinstance(data, list):
+            data = list(data)
+        
+        sinks = {fmt: self.background_writer(openers[fmt](name=name)) for fmt in formats if fmt in openers}
+        try:
+            for record in data:
+                for sink in sinks.values():
+                    sink.write(record)
+        finally:
+            for fmt, sink in sinks.items():
+                result_files[fmt] = sink.close()
+        
+        if 'excel' in formats:
+            result_files['excel'] = self.save_excel(data, name=name)
+        
+        return result_files
+    
     def save_excel(self, data, name="data", timestamp=True, sheet_name="Sheet1"):
         """
         保存数据为Excel文件
@@ -169,6 +1157,72 @@ class DataStorage:
             logger.error(f"加载JSON失败: {str(e)}")
             raise
     
+    def iter_jsonl(self, filepath, skip_invalid=True):
+        """
+        逐条读取JSON Lines文件，不将整个文件加载到内存中
+        
+        Args:
+            filepath (str): 文件路径，.gz和.zst文件自动解压
+            skip_invalid (bool, optional): 是否跳过无法解析的行（如中断时写了一半的最后一行），默认为True
+            
+        Yields:
+            dict: 记录
+            
+        Raises:
+            ValueError: skip_invalid为False且遇到无法解析的行
+        """
+        with io.TextIOWrapper(_open_compressed(filepath), encoding='utf-8') as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    if not skip_invalid:
+                        raise ValueError(f"{filepath} 第 {lineno} 行不是有效的JSON")
+                    logger.warning(f"跳过无效的JSON行: {filepath}:{lineno}")
+    
+    def iter_shards(self, manifest_path, skip_invalid=True):
+        """
+        按清单顺序逐条读取所有分片中的记录
+        
+        Args:
+            manifest_path (str): 清单文件（manifest.json）路径，也可以是分片所在目录
+            skip_invalid (bool, optional): 是否跳过无法解析的行，默认为True
+            
+        Yields:
+            dict: 记录
+        """
+        if os.path.isdir(manifest_path):
+            manifest_path = os.path.join(manifest_path, "manifest.json")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        directory = os.path.dirname(manifest_path)
+        for shard in manifest['shards']:
+            yield from self.iter_jsonl(os.path.join(directory, shard['file']), skip_invalid=skip_invalid)
+    
+    def load_parquet(self, filepath, columns=None):
+        """
+        加载Parquet文件
+        
+        Args:
+            filepath (str): 文件路径
+            columns (list, optional): 只读取这些列，默认为None（读取全部列）
+            
+        Returns:
+            list: 加载的数据列表，每个元素为一个字典
+        """
+        try:
+            _, pq = _import_pyarrow()
+            data = pq.read_table(filepath, columns=columns).to_pylist()
+            
+            logger.info(f"已加载Parquet数据: {filepath}")
+            return data
+        except Exception as e:
+            logger.error(f"加载Parquet失败: {str(e)}")
+            raise
+    
     def load_csv(self, filepath, encoding='utf-8'):
         """
         加载CSV文件
@@ -210,6 +1264,10 @@ if __name__ == "__main__":
     # 测试保存CSV
     csv_file = storage.save_csv(test_data, name="test_data")
     
+    # 测试保存JSON Lines
+    jsonl_file = storage.save_jsonl(test_data, name="test_data")
+    storage.append_jsonl({"id": 4, "name": "测试4", "url": "https://example.com/4"}, name="test_data_log")
+    
     # 测试保存Excel
     excel_file = storage.save_excel(test_data, name="test_data")
     
@@ -217,6 +1275,10 @@ if __name__ == "__main__":
     loaded_json = storage.load_json(json_file)
     print("加载的JSON数据:", loaded_json)
     
+    # 测试逐条读取JSON Lines
+    for record in storage.iter_jsonl(jsonl_file):
+        print("JSON Lines记录:", record)
+    
     # 测试加载CSV
     loaded_csv = storage.load_csv(csv_file)
     print("加载的CSV数据:", loaded_csv) 
\ No newline at end of file
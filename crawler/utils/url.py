@@ -0,0 +1,140 @@
+"""
+URL工具模块，提供URL规范化和URL指纹功能
+"""
+import re
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, quote
+
+# 各协议的默认端口
+DEFAULT_PORTS = {
+    'http': 80,
+    'https': 443,
+}
+
+# 路径中保持原样的字符（包括已有的百分号编码）
+_PATH_SAFE = "%/:@!$&'()*+,;=-._~"
+
+# 查询参数中保持原样的字符（包括已有的百分号编码）
+_QUERY_SAFE = "%/:@!$'()*+,;=?-._~"
+
+_PERCENT_ESCAPE_RE = re.compile(r'%[0-9a-fA-F]{2}')
+
+def _upper_escapes(text):
+    """将百分号编码统一为大写，如%2f转为%2F"""
+    return _PERCENT_ESCAPE_RE.sub(lambda m: m.group(0).upper(), text)
+
+def canonicalize_url(url, keep_fragment=False, strip_trailing_slash=True):
+    """
+    规范化URL，使指向同一页面的不同写法得到相同的结果
+
+    处理内容：协议和主机名转为小写、去掉默认端口、去掉片段（#...）、查询参数排序、
+    空路径补为'/'、去掉路径末尾的'/'（根路径除外）、统一百分号编码。
+    查询参数不解码，按原始的'key=value'字符串排序，只统一百分号编码的大小写，
+    GBK等非UTF-8编码的参数值不会被改写成相同的结果。
+
+    Args:
+        url (str): 原始URL
+        keep_fragment (bool, optional): 是否保留片段，默认为False
+        strip_trailing_slash (bool, optional): 是否去掉路径末尾的'/'，默认为True
+
+    Returns:
+        str: 规范化后的URL，不是字符串或无法解析时原样返回
+    """
+    if not isinstance(url, str):
+        return url
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+
+    netloc = host
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    path = _upper_escapes(quote(parts.path, safe=_PATH_SAFE)) or '/'
+    if strip_trailing_slash and len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = ''
+    if parts.query:
+        params = [_upper_escapes(quote(param, safe=_QUERY_SAFE)) for param in parts.query.split('&') if param]
+        query = '&'.join(sorted(params))
+
+    fragment = parts.fragment if keep_fragment else ''
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+def url_fingerprint(url, canonicalize=True):
+    """
+    计算URL的64位指纹
+
+    使用blake2b哈希，结果在不同进程和不同运行之间保持一致。
+
+    Args:
+        url (str): URL
+        canonicalize (bool, optional): 是否先规范化URL，默认为True
+
+    Returns:
+        int: 64位无符号整数指纹
+
+    Raises:
+        TypeError: url不是字符串
+    """
+    if not isinstance(url, str):
+        raise TypeError(f"URL必须是字符串: {url!r}")
+    if canonicalize:
+        url = canonicalize_url(url)
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def shard_for(url, shards, by='domain'):
+    """
+    计算URL所属的分片，结果在不同进程之间保持一致
+
+    Args:
+        url (str): URL
+        shards (int): 分片数量
+        by (str, optional): 分片依据，'domain'按主机名（同一主机的URL在同一分片），'url'按规范化URL，默认为'domain'
+
+    Returns:
+        int: 分片序号，范围为0到shards-1
+
+    Raises:
+        ValueError: by不是支持的分片依据
+    """
+    if by == 'domain':
+        host = (urlsplit(url).hostname or '').lower()
+        digest = hashlib.blake2b(host.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % shards
+    if by == 'url':
+        return url_fingerprint(url) % shards
+    raise ValueError(f"不支持的分片依据: {by}")
+
+if __name__ == "__main__":
+    # 测试
+    for u in [
+        "HTTP://Example.com:80/a/?b=2&a=1#top",
+        "http://example.com/a?a=1&b=2",
+        "https://example.com:443",
+        "https://example.com/%e4%b8%ad/",
+        "https://example.com/s?q=%d6%d0",  # GBK编码的"中"
+        "https://example.com/s?q=%B9%FA",  # GBK编码的"国"
+    ]:
+        print(u, "->", canonicalize_url(u), hex(url_fingerprint(u)))
+    print(canonicalize_url(None))  # None，非字符串原样返回
+    try:
+        url_fingerprint(None)
+    except TypeError as e:
+        print("TypeError:", e)
@@ -2,6 +2,9 @@
 用户代理工具模块，提供随机用户代理功能
 """
 import random
+import timeit
+import threading
+from itertools import accumulate
 from fake_useragent import UserAgent
 
 # 预定义的一些常用User-Agent
@@ -16,6 +19,96 @@ DEFAULT_USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15",
 ]
 
+class UserAgentPool:
+    """
+    进程内共享的用户代理池
+
+    首次使用时从fake-useragent加载一次浏览器数据，之后按使用占比加权随机抽取，
+    不再为每个请求创建UserAgent对象。fake-useragent不可用时使用预定义的用户代理。
+    sticky=True时同一主机始终使用同一个用户代理。
+    """
+    
+    def __init__(self, sticky=False):
+        """
+        初始化用户代理池
+        
+        Args:
+            sticky (bool, optional): for_host()是否为每个主机固定一个用户代理，默认为False
+        """
+        self.sticky = sticky
+        self._agents = None
+        self._cum_weights = None
+        self._by_browser = {}
+        self._host_agents = {}
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        """加载用户代理数据（只执行一次）"""
+        with self._lock:
+            if self._agents is not None:
+                return
+            agents, weights, by_browser = [], [], {}
+            try:
+                for entry in UserAgent().data_browsers:
+                    agents.append(entry['useragent'])
+                    weights.append(max(float(entry.get('percent') or 0), 0.01))
+                    by_browser.setdefault(str(entry.get('browser', '')).lower(), []).append(entry['useragent'])
+            except Exception:
+                # 如果fake-useragent库出现问题，使用预定义的用户代理
+                agents, weights, by_browser = list(DEFAULT_USER_AGENTS), [1.0] * len(DEFAULT_USER_AGENTS), {}
+            if not agents:
+                agents, weights = list(DEFAULT_USER_AGENTS), [1.0] * len(DEFAULT_USER_AGENTS)
+            self._cum_weights = list(accumulate(weights))
+            self._by_browser = by_browser
+            self._agents = agents
+    
+    def random(self):
+        """
+        随机获取一个用户代理（按浏览器使用占比加权）
+        
+        Returns:
+            str: 用户代理字符串
+        """
+        if self._agents is None:
+            self._load()
+        return random.choices(self._agents, cum_weights=self._cum_weights)[0]
+    
+    def for_browser(self, browser_type):
+        """
+        获取特定浏览器的用户代理
+        
+        Args:
+            browser_type (str): 浏览器类型，如'chrome', 'firefox', 'safari', 'edge'
+            
+        Returns:
+            str: 用户代理字符串，没有该浏览器的数据时随机返回一个
+        """
+        if self._agents is None:
+            self._load()
+        agents = self._by_browser.get(browser_type.lower())
+        return random.choice(agents) if agents else self.random()
+    
+    def for_host(self, host, sticky=None):
+        """
+        获取访问某个主机时使用的用户代理
+        
+        Args:
+            host (str): 主机名
+            sticky (bool, optional): 是否为同一主机固定使用同一个用户代理，默认为None（使用池的sticky设置）
+            
+        Returns:
+            str: 用户代理字符串，sticky为True时同一主机总是相同
+        """
+        if not (self.sticky if sticky is None else sticky):
+            return self.random()
+        agent = self._host_agents.get(host)
+        if agent is None:
+            agent = self._host_agents.setdefault(host, self.random())
+        return agent
+
+# 进程内共享的用户代理池
+user_agent_pool = UserAgentPool()
+
 def get_random_user_agent():
     """
     获取随机用户代理
@@ -23,12 +116,7 @@ def get_random_user_agent():
     Returns:
         str: 随机用户代理字符串
     """
-    try:
-        ua = UserAgent()
-        return ua.random
-    except Exception:
-        # 如果fake-useragent库出现问题，使用预定义的用户代理
-        return random.choice(DEFAULT_USER_AGENTS)
+    return user_agent_pool.random()
 
 def get_specific_user_agent(browser_type):
     """
@@ -40,24 +128,51 @@ def get_specific_user_agent(browser_type):
     Returns:
         str: 特定类型的用户代理字符串
     """
-    try:
-        ua = UserAgent()
-        if browser_type.lower() == 'chrome':
-            return ua.chrome
-        elif browser_type.lower() == 'firefox':
-            return ua.firefox
-        elif browser_type.lower() == 'safari':
-            return ua.safari
-        elif browser_type.lower() == 'edge':
-            return ua.edge
-        else:
-            return ua.random
-    except Exception:
-        # 如果出现问题，返回预定义的用户代理
-        return random.choice(DEFAULT_USER_AGENTS)
+    return user_agent_pool.for_browser(browser_type)
+
+def get_user_agent_for_host(host, sticky=True):
+    """
+    获取访问某个主机时使用的用户代理
+    
+    Args:
+        host (str): 主机名
+        sticky (bool, optional): 是否为同一主机固定使用同一个用户代理，默认为True
+        
+    Returns:
+        str: 用户代理字符串
+    """
+    return user_agent_pool.for_host(host, sticky=sticky)
+
+def benchmark(number=200):
+    """
+    比较每次创建UserAgent对象与使用用户代理池的单次耗时
+    
+    Args:
+        number (int, optional): 每种方式的调用次数，默认为200
+        
+    Returns:
+        dict: 每种方式的单次耗时（微秒）
+    """
+    def per_request():
+        try:
+            return UserAgent().random
+        except Exception:
+            return random.choice(DEFAULT_USER_AGENTS)
+    
+    pool = UserAgentPool()
+    pool.random()  # 预先加载，只统计抽取的耗时
+    return {
+        "UserAgent() per request": timeit.timeit(per_request, number=number) / number * 1e6,
+        "UserAgentPool.random()": timeit.timeit(pool.random, number=number * 100) / (number * 100) * 1e6,
+    }
 
 if __name__ == "__main__":
     # 测试
     print("随机用户代理:", get_random_user_agent())
     print("Chrome用户代理:", get_specific_user_agent("chrome"))
-    print("Firefox用户代理:", get_specific_user_agent("firefox")) 
\ No newline at end of file
+    print("Firefox用户代理:", get_specific_user_agent("firefox"))
+    print("example.com用户代理:", get_user_agent_for_host("example.com"))
+    
+    # 性能对比
+    for name, cost in benchmark().items():
+        print(f"{name}: {cost:.2f} 微秒/次")